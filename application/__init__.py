@@ -9,5 +9,6 @@ from .services.cache_service import CacheService
 from .services.update_manager import UpdateManager
 from .services.telegraph_service import TelegraphService
 from .services.alerts_service import AlertsService
+from .services.maintenance_service import MaintenanceService
 
-__all__ = ["MessageService", "MetroService", "BusService", "TramService", "RodaliesService", "CacheService", "UpdateManager", "BicingService", "FgcService", "TelegraphService", "AlertsService"]
\ No newline at end of file
+__all__ = ["MessageService", "MetroService", "BusService", "TramService", "RodaliesService", "CacheService", "UpdateManager", "BicingService", "FgcService", "TelegraphService", "AlertsService", "MaintenanceService"]
\ No newline at end of file
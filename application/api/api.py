@@ -1,7 +1,7 @@
 
 import math
 from typing import List
-from fastapi import APIRouter, HTTPException, Query, status
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
 from fastapi.params import Body
 from pydantic import BaseModel
 
@@ -14,8 +14,13 @@ from application.services.transport.tram_service import TramService
 from domain.api.favorite_model import FavoriteItem
 from domain.clients import ClientType
 from domain.common.location import Location
+from providers.database.database import spawn_background_write
 from providers.helpers.distance_helper import DistanceHelper
-from providers.helpers.utils import Utils
+from providers.helpers.station_catalogue import STATION_CATALOGUE_ENABLED, get_station_catalogue
+from providers.helpers.station_tiles import (
+    TILE_LAYER_BICING, TILE_LAYER_STATIONS, TILE_MAX_AGE,
+    build_bicing_tiles, build_station_tiles, is_valid_tile, station_tiles_cache
+)
 from providers.manager.user_data_manager import UserDataManager
 
 
@@ -36,7 +41,7 @@ def get_metro_router(
 
     @router.get("/lines")
     async def list_metro_lines():
-        return sorted(await metro_service.get_all_lines(), key=Utils.sort_lines)
+        return await metro_service.get_all_lines()
     
     @router.get("/stations")
     async def list_metro_stations():
@@ -110,7 +115,7 @@ def get_tram_router(
 
     @router.get("/lines")
     async def list_tram_lines():
-        return sorted(await tram_service.get_all_lines(), key=Utils.sort_lines)
+        return await tram_service.get_all_lines()
     
     @router.get("/stops")
     async def list_tram_stops():
@@ -145,7 +150,7 @@ def get_rodalies_router(
 
     @router.get("/lines")
     async def list_rodalies_lines():
-        return sorted(await rodalies_service.get_all_lines(), key=Utils.sort_lines)
+        return await rodalies_service.get_all_lines()
     
     @router.get("/stations")
     async def list_rodalies_stops():
@@ -195,7 +200,7 @@ def get_fgc_router(
 
     @router.get("/lines")
     async def list_fgc_lines():
-        return sorted(await fgc_service.get_all_lines(), key=Utils.sort_lines)
+        return await fgc_service.get_all_lines()
     
     @router.get("/stations")
     async def list_fgc_stations():
@@ -240,6 +245,19 @@ def get_results_router(
 
     @router.get("/near")
     async def list_near_stations(lat: float, lon: float, radius: float = 0.5):
+        if STATION_CATALOGUE_ENABLED:
+            catalogue, bicing = await asyncio.gather(
+                get_station_catalogue(metro_service, bus_service, tram_service, rodalies_service, fgc_service),
+                bicing_service.get_all_stations()
+            )
+            return DistanceHelper.build_nearby_stops_list(
+                catalogue,
+                bicing,
+                user_location=Location(latitude=lat, longitude=lon),
+                results_to_return=999999,
+                max_distance_km=radius
+            )
+
         metro_task = metro_service.get_stations_by_name('')
         bus_task = bus_service.get_stops_by_name('')
         tram_task = tram_service.get_stops_by_name('')
@@ -264,10 +282,34 @@ def get_results_router(
         )
         return near_results
 
+    @router.get("/tiles/{layer}/{z}/{x}/{y}")
+    async def get_station_tile(layer: str, z: int, x: int, y: int, request: Request):
+        if layer not in TILE_MAX_AGE:
+            raise HTTPException(status_code=404, detail=f"Unknown tile layer '{layer}'")
+        if not is_valid_tile(z, x, y):
+            raise HTTPException(status_code=400, detail=f"Invalid tile {z}/{x}/{y}")
+
+        if layer == TILE_LAYER_BICING:
+            index = await station_tiles_cache.get(layer, await bicing_service.get_all_stations(), build_bicing_tiles)
+        else:
+            catalogue = await get_station_catalogue(metro_service, bus_service, tram_service, rodalies_service, fgc_service)
+            index = await station_tiles_cache.get(TILE_LAYER_STATIONS, catalogue, build_station_tiles)
+        tile = await index.tile(z, x, y)
+
+        # map.html se sirve desde otro origen (GitHub Pages)
+        headers = {
+            "Cache-Control": f"public, max-age={TILE_MAX_AGE[layer]}",
+            "ETag": tile.etag,
+            "Access-Control-Allow-Origin": "*",
+        }
+        if request.headers.get("if-none-match") == tile.etag:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=tile.body, media_type="application/json", headers=headers)
+
     @router.get("/search")
     async def search_stations(name: str, user_id: str = None):
         if user_id:
-             asyncio.create_task(
+             spawn_background_write(
                  user_data_manager.register_search(
                      query=name, 
                      user_id_ext=user_id
@@ -1,5 +1,6 @@
 import asyncio
 import html
+import time
 import os
 import logging
 
@@ -23,6 +24,11 @@ class AlertsService:
         
         env_interval = os.getenv("ALERTS_SERVICE_INTERVAL")
         self.interval = int(env_interval) if env_interval else interval
+
+        # Poda de user_notified_alerts: alertas terminadas hace más de N días
+        self.notified_retention_days = int(os.getenv("NOTIFIED_ALERTS_RETENTION_DAYS", 7))
+        self.prune_interval = 24 * 3600
+        self._last_prune = 0.0
         
         self._running = False
         self._task = None
@@ -75,7 +81,6 @@ class AlertsService:
     async def _notify_user(self, client_source: ClientType, user_id: str, fcm_token, alert):
         """Lógica unitaria para notificar a un usuario."""
         try:
-            await self.user_data_manager.update_notified_alerts(user_id, alert.id)
             await self.user_data_manager.register_notification(client_source, user_id, alert)
 
             if fcm_token:
@@ -108,17 +113,19 @@ class AlertsService:
             if not alerts:
                 return
 
-            users_with_favs = await self.user_data_manager.get_active_users_with_favorites()
+            alert_ids = [str(alert.id) for alert in alerts]
+            users_with_favs = await self.user_data_manager.get_active_users_with_favorites(alert_ids=alert_ids)
 
             logger.info(f"Checking {len(alerts)} alerts for {len(users_with_favs)} users (with favorites)...")
 
             notifications_tasks = []
+            notified = []
 
             for user, user_favorites in users_with_favs:        
                 fav_codes = {f.STATION_CODE for f in user_favorites}
 
                 for alert in alerts:
-                    if alert.id in user.already_notified:
+                    if str(alert.id) in user.already_notified:
                         continue
 
                     should_notify = any(
@@ -128,16 +135,27 @@ class AlertsService:
                     )
 
                     if should_notify:
+                        notified.append((user.user_id, str(alert.id)))
                         notifications_tasks.append(
                             self._notify_user(ClientType.SYSTEM.value, user.user_id, user.fcm_token, alert)
                         )
 
             if notifications_tasks:
+                # Se marcan antes de enviar: si el envío falla no se reintenta en bucle
+                await self.user_data_manager.mark_alerts_notified(notified)
                 await asyncio.gather(*notifications_tasks, return_exceptions=True)
 
         except Exception as e:
             logger.exception(f"❌ Critical error checking alerts: {e}")
 
+    async def prune_notified_alerts(self):
+        """Como mucho una vez cada `prune_interval` segundos."""
+        now = time.monotonic()
+        if self._last_prune and now - self._last_prune < self.prune_interval:
+            return
+        self._last_prune = now
+        await self.user_data_manager.prune_notified_alerts(self.notified_retention_days)
+
     async def scheduler(self):
         """Bucle infinito controlado"""
         logger.info(f"Starting Alert Scheduler loop (Interval: {self.interval}s)")
@@ -145,6 +163,7 @@ class AlertsService:
         while self._running:
             try:
                 await self.check_new_alerts()
+                await self.prune_notified_alerts()
             except Exception as e:
                 logger.error(f"Error in scheduler loop: {e}")
             
@@ -1,24 +1,48 @@
+import os
 import time
 import asyncio
 from typing import Any, Optional
 from providers.helpers import logger
 
+# Seconds between sweeps of expired entries (see CacheService.set)
+CACHE_SWEEP_INTERVAL = int(os.getenv("CACHE_SWEEP_INTERVAL", 300))
+
 class CacheService:
     """In-memory cache service with optional expiration and logging + timing."""
 
-    def __init__(self):
+    def __init__(self, sweep_interval: int = CACHE_SWEEP_INTERVAL):
         # Dictionary: key -> (value, expiration_timestamp)
         self._cache = {}
         self._lock = asyncio.Lock()
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.time() + sweep_interval
         logger.debug("[CacheService] Initialized")
 
     async def set(self, key: str, value: Any, ttl: Optional[int] = None):
         start = time.perf_counter()
-        expire_at = time.time() + ttl if ttl else None
+        now = time.time()
+        expire_at = now + ttl if ttl else None
         async with self._lock:
             self._cache[key] = (value, expire_at)
+            # get() only evicts the key it reads: keys that are no longer read (per-station
+            # realtime data, its last-known-good copy) are dropped here once they expire
+            removed = self._sweep_expired(now) if now >= self._next_sweep else 0
         duration = time.perf_counter() - start
         logger.debug(f"[CacheService] Set key '{key}' with ttl={ttl} in {duration:.4f}s")
+        if removed:
+            logger.debug(f"[CacheService] Swept {removed} expired keys")
+
+    def _sweep_expired(self, now: float) -> int:
+        """Removes every expired entry. Must be called with the lock held."""
+        expired = [key for key, (_, expire_at) in self._cache.items() if expire_at is not None and expire_at <= now]
+        for key in expired:
+            del self._cache[key]
+        self._next_sweep = now + self.sweep_interval
+        return len(expired)
+
+    async def purge_expired(self) -> int:
+        async with self._lock:
+            return self._sweep_expired(time.time())
 
     async def get(self, key: str) -> Optional[Any]:
         start = time.perf_counter()
@@ -0,0 +1,49 @@
+import asyncio
+import os
+
+from providers.database.partitions import run_partition_maintenance
+from providers.helpers import logger
+
+
+class MaintenanceService:
+    """
+    Tareas periódicas de base de datos: particiones mensuales de audit_trail y
+    search_history, retención y rollup diario de auditoría.
+    """
+
+    def __init__(self, interval: int = 6 * 3600):
+        env_interval = os.getenv("DB_MAINTENANCE_INTERVAL")
+        self.interval = int(env_interval) if env_interval else interval
+
+        self._running = False
+        self._task = None
+
+    async def start(self):
+        if self._running:
+            return
+
+        self._running = True
+        self._task = asyncio.create_task(self.scheduler())
+        logger.info(f"🧹 Maintenance Service started. Interval: {self.interval}s")
+
+    async def stop(self):
+        logger.info("🛑 Stopping Maintenance Service...")
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def scheduler(self):
+        while self._running:
+            try:
+                await run_partition_maintenance()
+            except Exception as e:
+                logger.error(f"Error in maintenance loop: {e}")
+
+            try:
+                await asyncio.sleep(self.interval)
+            except asyncio.CancelledError:
+                break
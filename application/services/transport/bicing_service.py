@@ -20,7 +20,8 @@ class BicingService(ServiceBase):
         return await self._get_from_cache_or_api(
             f"bicing_stations",
             lambda: self.bicing_api_service.get_stations(),
-            cache_ttl=10
+            cache_ttl=10,
+            realtime=True
         )
     
     async def get_stations_by_name(self, station_name) -> List[BicingStation]:
@@ -28,7 +29,7 @@ class BicingService(ServiceBase):
         logger.debug(f"[{self.__class__.__name__}] get_stations_by_name({station_name})")
         if station_name == '':
             return stations
-        return self.fuzzy_search(
+        return await self.fuzzy_search(
             query=station_name,
             items=stations,
             key=lambda stop: stop.streetName
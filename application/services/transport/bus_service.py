@@ -10,6 +10,7 @@ from providers.api.tmb_api_service import TmbApiService
 
 from domain.bus import BusLine, BusStop
 from providers.helpers import logger
+from providers.helpers.utils import Utils
 from providers.manager import UserDataManager, LanguageManager
 
 from .service_base import ServiceBase
@@ -73,8 +74,9 @@ class BusService(ServiceBase):
             line.has_alerts = any(line_alerts)
             line.alerts = line_alerts
 
-        await self._get_from_cache_or_data(static_key, lines, cache_ttl=3600*24)
+        lines = await self._get_from_cache_or_data(static_key, lines, cache_ttl=3600*24, sort_key=Utils.sort_lines)
         await self._get_from_cache_or_data(alerts_key, alerts_dict, cache_ttl=3600)
+        self._alerts_changed()
 
         elapsed = time.perf_counter() - start
         logger.info(f"[{self.__class__.__name__}] get_all_lines() -> {len(lines)} lines ({elapsed:.4f} s)")
@@ -104,7 +106,7 @@ class BusService(ServiceBase):
         logger.info(f"[{self.__class__.__name__}] get_all_stops() -> {len(static_stops)} stops ({elapsed:.4f} s)")
         return static_stops
 
-    async def get_stops_by_line(self, line_id) -> List[BusStop]:
+    async def get_stops_by_line(self, line_id, cached_only: bool = False) -> List[BusStop]:
         start = time.perf_counter()
         cache_key = f"bus_line_{line_id}_stops"
         cached_stations = await self._get_from_cache_or_data(cache_key, None, cache_ttl=3600*24)
@@ -112,6 +114,8 @@ class BusService(ServiceBase):
             elapsed = time.perf_counter() - start
             logger.info(f"[{self.__class__.__name__}] get_stops_by_line({line_id}) -> cached ({elapsed:.4f} s)")
             return cached_stations
+        if cached_only:
+            return []
 
         line = await self.get_line_by_id(line_id)
         api_stops = await self.tmb_api_service.get_bus_line_stops(line_id)
@@ -131,7 +135,8 @@ class BusService(ServiceBase):
         routes = await self._get_from_cache_or_api(
             f"bus_stop_{stop_code}_routes",
             lambda: self.tmb_api_service.get_next_bus_at_stop(stop_code),
-            cache_ttl=10
+            cache_ttl=10,
+            realtime=True
         )
 
         elapsed = time.perf_counter() - start
@@ -155,7 +160,7 @@ class BusService(ServiceBase):
         stops = await self.get_all_stops()
 
         if stop_name != '':
-            result = self.fuzzy_search(
+            result = await self.fuzzy_search(
                 query=stop_name,
                 items=stops,
                 key=lambda stop: stop.name
@@ -255,6 +260,7 @@ class BusService(ServiceBase):
 
         alerts_dict = dict(alerts_by_stop)
         await self.cache_service.set("bus_stops_alerts", alerts_dict, ttl=3600)
+        self._alerts_changed()
         elapsed = time.perf_counter() - start
         logger.info(f"[{self.__class__.__name__}] _build_and_cache_stop_alerts() -> {len(alerts_dict)} stops with alerts ({elapsed:.4f} s)")
         return alerts_dict
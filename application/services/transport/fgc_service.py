@@ -1,6 +1,8 @@
 import asyncio
+import os
 import time
-from typing import List
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 
 from domain.common.connections import Connections
 from domain.common.line import Line
@@ -9,6 +11,7 @@ from domain import NextTrip, LineRoute, normalize_to_seconds
 from providers.api import FgcApiService
 from providers.manager import LanguageManager
 from providers.helpers import logger
+from providers.helpers.utils import Utils
 
 from application.services.cache_service import CacheService
 from providers.manager.user_data_manager import UserDataManager
@@ -21,6 +24,10 @@ class FgcService(ServiceBase):
     Service to interact with Metro data via TmbApiService, with optional caching.
     """
 
+    # Una parada que se mueve más de ~10 m en el GTFS se vuelve a resolver contra MouTe
+    MOUTE_COORD_TOLERANCE = 1e-4
+    MOUTE_RETRY_DAYS = int(os.getenv("FGC_MOUTE_RETRY_DAYS", 7))
+
     def __init__(
         self,
         fgc_api_service: FgcApiService,
@@ -40,7 +47,8 @@ class FgcService(ServiceBase):
         result = await self._get_from_cache_or_api(
             "fgc_lines",
             lambda: self.fgc_api_service.get_all_lines(),
-            cache_ttl=3600 * 24
+            cache_ttl=3600 * 24,
+            sort_key=Utils.sort_lines
         )
         elapsed = (time.perf_counter() - start)
         logger.info(f"[{self.__class__.__name__}] get_all_lines ejecutado en {elapsed:.4f} s")
@@ -63,30 +71,21 @@ class FgcService(ServiceBase):
 
         # Limita concurrencia: ajusta según capacidad de la API
         semaphore_lines = asyncio.Semaphore(5)   # Para get_stations_by_line
-        semaphore_near = asyncio.Semaphore(10)   # Para get_near_stations
-
-        async def process_station(line_station, line):
-            async with semaphore_near:
-                line_station = FgcStation.update_line_info(line_station, line)
-                moute_station = await self.fgc_api_service.get_near_stations(
-                    line_station.latitude, line_station.longitude
-                )
-                if moute_station:
-                    line_station.moute_id = moute_station[0].get("id")
-                return line_station
 
         async def process_line(line: Line):
             async with semaphore_lines:
                 line_stations = await self.fgc_api_service.get_stations_by_line(line.id)
-            processed_stations = await asyncio.gather(
-                *[process_station(s, line) for s in line_stations]
-            )
-            return processed_stations
+            return [FgcStation.update_line_info(s, line) for s in line_stations]
 
         results = await asyncio.gather(*[process_line(line) for line in lines])
         for line_stations in results:
             stations.extend(line_stations)
 
+        # Una consulta a MouTe por stop_id (no por estación y línea), y solo para los que no están ya resueltos
+        moute_ids = await self._resolve_moute_ids({s.id: s for s in stations})
+        for station in stations:
+            station.moute_id = moute_ids.get(station.id)
+
         logger.warning(
             f"The following FGC stations where not found:\n "
             f"{[s for s in stations if s.moute_id is None]}"
@@ -98,6 +97,66 @@ class FgcService(ServiceBase):
         logger.info(f"[{self.__class__.__name__}] get_all_stations ejecutado en {elapsed:.4f} s")
         return result
 
+    async def _resolve_moute_ids(self, stops: Dict[str, FgcStation]) -> Dict[str, Optional[str]]:
+        """
+        stop_id -> id MouTe, persistido en fgc_moute_stops.
+        Solo se consulta nearbyotp para paradas nuevas, paradas que el GTFS ha movido
+        y, pasados MOUTE_RETRY_DAYS, las que MouTe no encontró.
+        """
+        known = {}
+        if self.user_data_manager:
+            try:
+                known = await self.user_data_manager.get_fgc_moute_stops()
+            except Exception as e:
+                logger.warning(f"[{self.__class__.__name__}] Could not load FGC -> MouTe mapping: {e}")
+
+        retry_before = datetime.now() - timedelta(days=self.MOUTE_RETRY_DAYS)
+        moute_ids: Dict[str, Optional[str]] = {}
+        pending: List[FgcStation] = []
+        for stop_id, stop in stops.items():
+            row = known.get(stop_id)
+            moved = row is None or (
+                abs(row.stop_lat - stop.latitude) > self.MOUTE_COORD_TOLERANCE
+                or abs(row.stop_lon - stop.longitude) > self.MOUTE_COORD_TOLERANCE
+            )
+            expired_miss = row is not None and row.moute_id is None and (row.updated_at is None or row.updated_at < retry_before)
+            if moved or expired_miss:
+                pending.append(stop)
+            else:
+                moute_ids[stop_id] = row.moute_id
+
+        if not pending:
+            logger.info(f"[{self.__class__.__name__}] FGC -> MouTe mapping up to date ({len(stops)} stops)")
+            return moute_ids
+
+        semaphore_near = asyncio.Semaphore(10)   # Para get_near_stations
+
+        async def resolve(stop: FgcStation):
+            async with semaphore_near:
+                try:
+                    moute_stations = await self.fgc_api_service.get_near_stations(stop.latitude, stop.longitude)
+                except Exception as e:
+                    logger.warning(f"[{self.__class__.__name__}] nearbyotp failed for {stop.id}: {e}")
+                    return None
+            moute_id = moute_stations[0].get("id") if moute_stations else None
+            return {
+                "stop_id": stop.id,
+                "stop_lat": stop.latitude,
+                "stop_lon": stop.longitude,
+                "moute_id": str(moute_id) if moute_id is not None else None,
+            }
+
+        rows = [row for row in await asyncio.gather(*[resolve(stop) for stop in pending]) if row is not None]
+        moute_ids.update({row["stop_id"]: row["moute_id"] for row in rows})
+        logger.info(f"[{self.__class__.__name__}] Resolved {len(rows)}/{len(pending)} FGC stops against MouTe ({len(stops)} unique stops)")
+
+        if self.user_data_manager and rows:
+            try:
+                await self.user_data_manager.save_fgc_moute_stops(rows)
+            except Exception as e:
+                logger.warning(f"[{self.__class__.__name__}] Could not persist FGC -> MouTe mapping: {e}")
+        return moute_ids
+
     async def get_stations_by_line(self, line_id) -> List[FgcStation]:
         start = time.perf_counter()
         stations = await self.get_all_stations()
@@ -113,7 +172,7 @@ class FgcService(ServiceBase):
             elapsed = (time.perf_counter() - start)
             logger.info(f"[{self.__class__.__name__}] get_stations_by_name(empty) ejecutado en {elapsed:.4f} s")
             return stations
-        result = self.fuzzy_search(
+        result = await self.fuzzy_search(
             query=station_name,
             items=stations,
             key=lambda station: station.name
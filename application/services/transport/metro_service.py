@@ -76,12 +76,13 @@ class MetroService(ServiceBase):
             line.has_alerts = any(line_alerts)
             line.alerts = line_alerts
 
-        await self._get_from_cache_or_data(static_key, lines, cache_ttl=3600*24*7)
+        lines = await self._get_from_cache_or_data(static_key, lines, cache_ttl=3600*24*7, sort_key=Utils.sort_lines)
         await self._get_from_cache_or_data(alerts_key, alerts_dict, cache_ttl=3600)
+        self._alerts_changed()
 
         elapsed = time.perf_counter() - start
         logger.info(f"[{self.__class__.__name__}] get_all_lines() -> {len(lines)} lines ({elapsed:.4f} s)")
-        return sorted(lines, key=Utils.sort_lines)
+        return lines
 
     async def get_all_stations(self) -> List[MetroStation]:
         start = time.perf_counter()
@@ -107,7 +108,7 @@ class MetroService(ServiceBase):
         logger.info(f"[{self.__class__.__name__}] get_all_stations() -> {len(static_stations)} stations ({elapsed:.4f} s)")
         return static_stations
 
-    async def get_stations_by_line(self, line_code) -> List[MetroStation]:
+    async def get_stations_by_line(self, line_code, cached_only: bool = False) -> List[MetroStation]:
         start = time.perf_counter()
         cache_key = f"metro_line_{line_code}_stations"
         cached_stations = await self._get_from_cache_or_data(cache_key, None, cache_ttl=3600*24*7)
@@ -115,6 +116,8 @@ class MetroService(ServiceBase):
             elapsed = time.perf_counter() - start
             logger.info(f"[{self.__class__.__name__}] get_stations_by_line({line_code}) -> cached ({elapsed:.4f} s)")
             return cached_stations
+        if cached_only:
+            return []
 
         line = await self.get_line_by_code(line_code)
         api_stations = await self.tmb_api_service.get_stations_by_metro_line(line_code)
@@ -184,7 +187,7 @@ class MetroService(ServiceBase):
         stations = await self.get_all_stations()
 
         if station_name != '':
-            result = self.fuzzy_search(
+            result = await self.fuzzy_search(
                 query=station_name,
                 items=stations,
                 key=lambda station: station.name
@@ -269,6 +272,7 @@ class MetroService(ServiceBase):
 
         alerts_dict = dict(station_alerts)
         await self.cache_service.set("metro_stations_alerts", alerts_dict, ttl=3600)
+        self._alerts_changed()
         elapsed = time.perf_counter() - start
         logger.info(f"[{self.__class__.__name__}] _build_and_cache_station_alerts() -> {len(alerts_dict)} stations with alerts ({elapsed:.4f} s)")
         return alerts_dict
@@ -9,6 +9,7 @@ from domain.transport_type import TransportType
 from providers.api import RodaliesApiService
 from providers.manager import LanguageManager, UserDataManager
 from providers.helpers import logger
+from providers.helpers.utils import Utils
 
 from application.services.cache_service import CacheService
 from .service_base import ServiceBase
@@ -63,8 +64,9 @@ class RodaliesService(ServiceBase):
             line.has_alerts = any(line_alerts)
             line.alerts = line_alerts
 
-        await self._get_from_cache_or_data(static_key, lines, cache_ttl=3600*24)
+        lines = await self._get_from_cache_or_data(static_key, lines, cache_ttl=3600*24, sort_key=Utils.sort_lines)
         await self._get_from_cache_or_data(alerts_key, alerts_dict, cache_ttl=3600)
+        self._alerts_changed()
 
         elapsed = (time.perf_counter() - start)
         logger.info(f"[{self.__class__.__name__}] get_all_lines ejecutado en {elapsed:.4f} s")
@@ -95,7 +97,8 @@ class RodaliesService(ServiceBase):
         routes = await self._get_from_cache_or_api(
             f"rodalies_station_{station_code}_routes",
             lambda: self.rodalies_api_service.get_next_trains_at_station(station.id),
-            cache_ttl=10
+            cache_ttl=10,
+            realtime=True
         )
         
         elapsed = (time.perf_counter() - start)
@@ -126,7 +129,7 @@ class RodaliesService(ServiceBase):
             elapsed = (time.perf_counter() - start)
             logger.info(f"[{self.__class__.__name__}] get_stations_by_name(empty) ejecutado en {elapsed:.4f} s")
             return stations
-        result = self.fuzzy_search(
+        result = await self.fuzzy_search(
             query=station_name,
             items=stations,
             key=lambda station: station.name
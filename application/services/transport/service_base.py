@@ -1,6 +1,8 @@
-from typing import Callable, Any, List
-from rapidfuzz import process, fuzz
-from providers.helpers import logger, HtmlHelper
+from typing import Callable, Any, List, Optional
+from providers.helpers import logger
+from providers.helpers.cpu_offload import run_cpu_bound
+from providers.helpers.fuzzy_search import fuzzy_match_indices
+from providers.helpers.resilience import ProviderUnavailableError
 from application.services.cache_service import CacheService
 import time
 
@@ -9,6 +11,17 @@ class ServiceBase:
     Base class for services that use optional caching and logging.
     """
 
+    LAST_KNOWN_GOOD_PREFIX = "lkg:"
+    LAST_KNOWN_GOOD_TTL = 3600 * 24 * 7
+    # Datos en tiempo real (llegadas, disponibilidad): last-known-good durante
+    # REALTIME_LAST_KNOWN_GOOD_FACTOR x cache_ttl como máximo
+    REALTIME_LAST_KNOWN_GOOD_FACTOR = 6
+
+    # Se incrementa cada vez que un servicio guarda alertas nuevas. Las alertas se escriben
+    # sobre objetos ya cacheados (has_alerts), así que quien memoiza por identidad de
+    # objeto (los teclados) usa este contador para enterarse del cambio.
+    alerts_version = 0
+
     def __init__(self, cache_service: CacheService = None):
         self.cache_service = cache_service
 
@@ -22,7 +35,7 @@ class ServiceBase:
             return result
         return wrapper
 
-    def fuzzy_search(
+    async def fuzzy_search(
         self,
         query: str,
         items: List[Any],
@@ -32,6 +45,9 @@ class ServiceBase:
         """
         Performs fuzzy search on a list of objects, returning all exact matches
         plus all fuzzy matches above the threshold.
+        Scoring runs in the CPU offload process pool: only the names extracted
+        with `key` are sent there, so thousands of stops do not hold the GIL on
+        the event loop.
 
         Args:
             query: Text to search.
@@ -42,36 +58,19 @@ class ServiceBase:
         Returns:
             List of objects matching the query exactly or approximately.
         """
-        query_lower = query.lower()
-
-        # --- Exact matches (substring, case-insensitive) ---
-        exact_matches = [item for item in items if query_lower in key(item).lower()]
-
-        # --- Matches without special chars ---
-        remaining_items = [item for item in items if item not in exact_matches]
-        normalized_matches = [item for item in remaining_items if HtmlHelper.normalize_text(query_lower) in HtmlHelper.normalize_text(key(item).lower())]
-
-        # --- Prepare fuzzy search excluding exact matches ---
-        remaining_items = [item for item in items if item not in (exact_matches + normalized_matches)]
-        item_dict = {key(item): item for item in remaining_items}
-
-        # --- Fuzzy matches ---
-        fuzzy_matches = process.extract(
-            query=query,
-            choices=item_dict.keys(),
-            scorer=fuzz.WRatio
-        )
-
-        fuzzy_filtered = [item_dict[name] for name, score, _ in fuzzy_matches if score >= threshold]
+        names = [key(item) for item in items]
+        indices = await run_cpu_bound(fuzzy_match_indices, query, names, threshold)
+        return [items[i] for i in indices]
 
-        # --- Combine exact + normalized + fuzzy ---
-        return exact_matches + normalized_matches + fuzzy_filtered
+    def _alerts_changed(self):
+        ServiceBase.alerts_version += 1
 
     async def _get_from_cache_or_data(
         self,
         cache_key: str,
         data: Any,
-        cache_ttl: int = 3600
+        cache_ttl: int = 3600,
+        sort_key: Optional[Callable[[Any], Any]] = None
     ) -> Any:
         """
         Generic method to fetch data from cache or use the provided data,
@@ -81,6 +80,8 @@ class ServiceBase:
             cache_key: Key to use for caching.
             data: Pre-fetched or pre-computed data.
             cache_ttl: Time to live for the cache in seconds.
+            sort_key: If given, the data is sorted (stable) once before being
+                cached, so readers never need to sort it again.
 
         Returns:
             The data, either from cache or the provided one.
@@ -95,6 +96,9 @@ class ServiceBase:
             else:
                 logger.debug(f"[{class_name}] Cache miss: {cache_key}")
 
+        if sort_key and data:
+            data = sorted(data, key=sort_key)
+
         # Store provided data in cache
         if self.cache_service and data is not None:
             await self.cache_service.set(cache_key, data, ttl=cache_ttl)
@@ -106,19 +110,32 @@ class ServiceBase:
         self,
         cache_key: str,
         api_call: Callable[[], Any],
-        cache_ttl: int = 3600
+        cache_ttl: int = 3600,
+        sort_key: Optional[Callable[[Any], Any]] = None,
+        realtime: bool = False
     ) -> Any:
         """
         Fetch data from cache or, if not present, call the API function
         and store the result in cache using the base helper.
 
+        Every successful response is also kept as last-known-good. If the
+        provider fails (or its circuit is open) that copy is served instead,
+        and nothing is cached so the next request tries the provider again.
+
         Args:
             cache_key: Key to use for caching.
             api_call: Async callable that fetches the data.
             cache_ttl: Time to live for the cache in seconds.
+            sort_key: If given, the API response is sorted (stable) before
+                being cached and kept as last-known-good.
+            realtime: Realtime data (arrivals, availability). Its
+                last-known-good copy only lives for
+                REALTIME_LAST_KNOWN_GOOD_FACTOR x cache_ttl instead of
+                LAST_KNOWN_GOOD_TTL; past that age [] is returned rather than
+                stale arrivals.
 
         Returns:
-            Data from cache or API.
+            Data from cache, API or last-known-good ([] if none).
         """
         class_name = self.__class__.__name__
 
@@ -135,9 +152,26 @@ class ServiceBase:
         try:
             data = await api_call()
             logger.debug(f"[{class_name}] Fetched data from API for key: {cache_key}")
+        except ProviderUnavailableError as e:
+            logger.warning(f"[{class_name}] {e}; serving last known good data for key {cache_key}")
+            return await self._get_last_known_good(cache_key)
         except Exception as e:
             logger.error(f"[{class_name}] Error fetching data for key {cache_key}: {e}")
-            data = []
+            return await self._get_last_known_good(cache_key)
+
+        if sort_key and data:
+            data = sorted(data, key=sort_key)
+
+        if self.cache_service and data:
+            lkg_ttl = cache_ttl * self.REALTIME_LAST_KNOWN_GOOD_FACTOR if realtime else self.LAST_KNOWN_GOOD_TTL
+            await self.cache_service.set(f"{self.LAST_KNOWN_GOOD_PREFIX}{cache_key}", data, ttl=lkg_ttl)
 
         # Use the generic method to cache and return
-        return await self._get_from_cache_or_data(cache_key, data, cache_ttl)
\ No newline at end of file
+        return await self._get_from_cache_or_data(cache_key, data, cache_ttl)
+
+    async def _get_last_known_good(self, cache_key: str) -> Any:
+        if self.cache_service:
+            data = await self.cache_service.get(f"{self.LAST_KNOWN_GOOD_PREFIX}{cache_key}")
+            if data is not None:
+                return data
+        return []
\ No newline at end of file
@@ -11,6 +11,7 @@ from domain.transport_type import TransportType
 from providers.api import TramApiService
 from providers.manager import LanguageManager, UserDataManager
 from providers.helpers import logger
+from providers.helpers.utils import Utils
 
 from domain.tram import TramLine, TramStation, TramConnection
 from application.services.cache_service import CacheService
@@ -83,10 +84,11 @@ class TramService(ServiceBase):
             line.has_alerts = bool(line_alerts)
             line.alerts = line_alerts
 
-        await asyncio.gather(
-            self._get_from_cache_or_data(static_key, lines, cache_ttl=3600*24),
+        lines, _ = await asyncio.gather(
+            self._get_from_cache_or_data(static_key, lines, cache_ttl=3600*24, sort_key=Utils.sort_lines),
             self._get_from_cache_or_data(alerts_key, alerts_dict, cache_ttl=3600)
         )
+        self._alerts_changed()
 
         elapsed = (time.perf_counter() - start)
         logger.info(f"[{self.__class__.__name__}] get_all_lines() -> {len(lines)} lines (tiempo: {elapsed:.4f} s)")
@@ -116,7 +118,10 @@ class TramService(ServiceBase):
         logger.info(f"[{self.__class__.__name__}] get_all_stops() -> {len(all_stops)} stops (tiempo: {elapsed:.4f} s)")
         return all_stops
 
-    async def get_stops_by_line(self, line_id: str) -> List[TramStation]:
+    async def get_stops_by_line(self, line_id: str, cached_only: bool = False) -> List[TramStation]:
+        if cached_only:
+            return await self._get_from_cache_or_data(f"tram_line_{line_id}_stops", None) or []
+
         start = time.perf_counter()
         stops = await self._get_from_cache_or_api(
             f"tram_line_{line_id}_stops",
@@ -134,6 +139,7 @@ class TramService(ServiceBase):
             f"tram_routes_{stop_code}",
             lambda: self.tram_api_service.get_next_trams_at_stop(stop.outboundCode, stop.returnCode),
             cache_ttl=30,
+            realtime=True,
         )
         lines = await self.get_all_lines()
         for route in routes:
@@ -166,7 +172,7 @@ class TramService(ServiceBase):
         stops = await self.get_all_stops()
         if stop_name == '':
             result = stops
-        result = self.fuzzy_search(query=stop_name, items=stops, key=lambda s: s.name)
+        result = await self.fuzzy_search(query=stop_name, items=stops, key=lambda s: s.name)
         elapsed = (time.perf_counter() - start)
         logger.info(f"[{self.__class__.__name__}] get_stops_by_name({stop_name}) -> {len(result)} stops (tiempo: {elapsed:.4f} s)")
         return result
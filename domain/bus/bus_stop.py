@@ -1,13 +1,31 @@
 from dataclasses import dataclass
 
 from domain.bus.bus_line import BusLine
+from domain.common.interning import get_physical_stop, intern_str
 from domain.common.station import Station
 from domain.transport_type import TransportType
 
-@dataclass
-class BusStop(Station):
+
+class _PhysicalStopRef(Station):
+    # Slot fuera de la lista de campos: no entra en __init__, asdict() ni en el JSON de la API
+    __slots__ = ("physical_stop",)
+
+
+@dataclass(slots=True)
+class BusStop(_PhysicalStopRef):
     DESTI_SENTIT: str
 
+    def __post_init__(self):
+        Station.__post_init__(self)
+        # Misma parada física para todas las líneas que pasan por ella: los slots de la parada
+        # apuntan a los objetos del registro compartido en lugar de guardar copias propias
+        self.physical_stop = get_physical_stop(self.code, self.name, self.description, self.latitude, self.longitude)
+        self.code = self.physical_stop.code
+        self.name = self.physical_stop.name
+        self.description = self.physical_stop.description
+        self.latitude = self.physical_stop.latitude
+        self.longitude = self.physical_stop.longitude
+
     @staticmethod
     def create_bus_stop(feature):
         props = feature["properties"]
@@ -23,7 +41,7 @@ class BusStop(Station):
             line_code=props.get("CODI_LINIA", ""),
             line_name=props.get("NOM_LINIA", ""),
             line_description=props.get("DESC_LINIA", ""),
-            DESTI_SENTIT=props.get("DESTI_SENTIT", ""),
+            DESTI_SENTIT=intern_str(props.get("DESTI_SENTIT", "")),
             line_color=props.get("COLOR_REC", ""),
             latitude=coords[1],
             longitude=coords[0],
@@ -42,4 +60,3 @@ class BusStop(Station):
 
         return bus_stop
 
-
@@ -0,0 +1,37 @@
+import sys
+import weakref
+from dataclasses import dataclass
+from typing import Optional
+
+
+def intern_str(value):
+    """sys.intern para str; cualquier otro valor (None, int, '') se devuelve tal cual."""
+    return sys.intern(value) if type(value) is str else value
+
+
+@dataclass(slots=True, frozen=True, weakref_slot=True)
+class PhysicalStop:
+    """
+    Datos de la parada física, compartidos por todas las entradas por línea
+    que la referencian (una parada de bus aparece una vez por cada línea que pasa).
+    """
+    code: str
+    name: str
+    description: Optional[str]
+    latitude: float
+    longitude: float
+
+
+# código -> PhysicalStop. Referencias débiles: un registro desaparece cuando ya no lo usa
+# ninguna parada (p. ej. al refrescar el catálogo), así que el registro no crece sin límite
+_physical_stops = weakref.WeakValueDictionary()
+
+
+def get_physical_stop(code, name, description, latitude, longitude) -> PhysicalStop:
+    """Registro compartido de la parada `code`; si sus datos han cambiado se crea uno nuevo."""
+    values = (intern_str(code), intern_str(name), intern_str(description), latitude, longitude)
+    stop = _physical_stops.get(code)
+    if stop is None or (stop.code, stop.name, stop.description, stop.latitude, stop.longitude) != values:
+        stop = PhysicalStop(*values)
+        _physical_stops[code] = stop
+    return stop
@@ -5,9 +5,14 @@ from typing import List, Optional
 import html
 
 from domain import NextTrip
+from domain.common.line_style import get_line_style
 from domain.transport_type import TransportType
 
-@dataclass
+NUMBER_EMOJIS = ("1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣")
+# Prefijo de cada fila de salida ya montado: en cada tick solo se añade el tiempo restante
+_TRIP_PREFIXES = tuple(f"           <i>{emoji} " for emoji in NUMBER_EMOJIS)
+
+@dataclass(slots=True)
 class LineRoute:
     route_id: str
     line_type: TransportType
@@ -20,88 +25,19 @@ class LineRoute:
     line_code: Optional[str] = ""
 
     def __post_init__(self):
-        if self.line_type == TransportType.METRO:
-            emojis = {
-                "L1": "🟥",
-                "L2": "🟪",
-                "L3": "🟩",
-                "L4": "🟨",
-                "L5": "🟦",
-                "L9S": "🟧",
-                "L9N": "🟧",
-            }
-        elif self.line_type == TransportType.TRAM:
-            emojis = {
-                "T1": "🟩",
-                "T2": "🟩",
-                "T3": "🟩",
-                "T4": "🟩",
-                "T5": "🟩",
-                "T6": "🟩"
-            }
-        elif self.line_type == TransportType.BUS:
-            emojis = {
-                "H": "🟦",
-                "D": "🟪",
-                "V": "🟩",
-                "M": "🔴",
-                "X": "🟨",
-                "N": "🟦"
-            }
-            for letter in self.line_name:
-                if letter in emojis:
-                    self.name_with_emoji = f"{emojis[letter]} {self.line_name}"
-                    break
-            else:
-                if self.line_name.isdigit():
-                    self.name_with_emoji = f"🔴 {self.line_name}"
+        style = get_line_style(self.line_type, self.line_name)
+        # Bus sin familia reconocida: se mantiene el name_with_emoji recibido
+        if self.line_type == TransportType.BUS and not style.emoji:
             return
-        elif self.line_type == TransportType.FGC:
-            emojis = {
-                #Barcelona – Vallés
-                "L1": "🟥",
-                "S1": "🟥",
-                "S2": "🟩",
-                "L6": "🟪",
-                "L7": "🟫",
-                "L12": "🟪",
-
-                #Llobregat – Anoia
-                "L8": "🟪",
-                "S3": "🟦",
-                "S4": "🟨",
-                "S8": "🟦",
-                "S9": "🟥",
-                "R5": "🟦",
-                "R50": "🟦",
-                "R6": "⬛",
-                "R60": "⬛",
-
-                #Lleida – La Pobla de Segur
-                "RL1": "🟩",
-                "RL2": "🟩"
-            }
-        elif self.line_type == TransportType.RODALIES:
-            emojis = {
-                "R1": "🟦", "R2": "🟩", "R2 Nord": "🟩", "R2 Sud": "🟩",
-                "R3": "🟥", "R4": "🟨", "R7": "⬜", "R8": "🟪",
-                "R11": "🟦", "R13": "⬛", "R14": "🟪", "R15": "🟫",
-                "R16": "🟥", "R17": "🟧", "RG1": "🟦", "RT1": "🟦",
-                "RT2": "⬜", "RL3": "🟩", "RL4": "🟨",
-            }
-
-        emoji = emojis.get(self.line_name, "")
-        self.name_with_emoji = f"{emoji} {self.line_name}"
+        self.name_with_emoji = style.name_with_emoji
 
     @staticmethod
     def simple_list(route, arriving_threshold=40, default_msg: str = '') -> str:
         header = f"     <b>{route.name_with_emoji} → {html.escape(route.destination)}</b>"
 
-        number_emojis = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣"]
-
         tren_info = "\n".join(
-            f"           <i>{number_emojis[i] if i < len(number_emojis) else f'{i+1}.'} {trip.remaining_time(arriving_threshold)}</i>"
-            for i, trip in enumerate(route.next_trips[:5])
+            f"{_TRIP_PREFIXES[i]}{trip.remaining_time(arriving_threshold)}</i>"
+            for i, trip in enumerate(route.next_trips[:len(_TRIP_PREFIXES)])
         )
         if tren_info == "":
             tren_info = default_msg
@@ -110,8 +46,6 @@ class LineRoute:
     @staticmethod
     def grouped_list(routes, default_msg: str = '') -> str:
         """Genera un string agrupado por line_name para varias rutas."""
-        number_emojis = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣"]
-
         grouped_routes = defaultdict(list)
         for route in routes:
             grouped_routes[route.line_name].append(route)
@@ -121,8 +55,8 @@ class LineRoute:
             for route in routes:
                 header = f"     <b>{route.name_with_emoji} → {html.escape(route.destination)}</b>"
                 tram_info = "\n".join(
-                    f"           <i>{number_emojis[i] if i < len(number_emojis) else f'{i+1}.'} {tram.remaining_time()}</i>"
-                    for i, tram in enumerate(route.next_trips[:5])
+                    f"{_TRIP_PREFIXES[i]}{tram.remaining_time()}</i>"
+                    for i, tram in enumerate(route.next_trips[:len(_TRIP_PREFIXES)])
                 )
                 if tram_info == "":
                     tram_info = default_msg
@@ -135,11 +69,10 @@ class LineRoute:
     @staticmethod
     def scheduled_list(route, with_arrival_date=True, default_msg: str = '') -> str:
         header = f"     <b>{route.name_with_emoji} → {html.escape(route.destination)}</b>"
-        number_emojis = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣"]
 
         trips_info = []
         for i, trip in enumerate(route.next_trips[:3]):
-            number_emoji = number_emojis[i] if i < len(number_emojis) else f"{i + 1}."
+            number_emoji = NUMBER_EMOJIS[i]
 
             # Vía y número de tren si existen
             via_text = f" | Vía {trip.platform}" if trip.platform else ""
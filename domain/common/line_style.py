@@ -0,0 +1,157 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+
+from domain.transport_type import TransportType
+
+# Tablas de estilo por tipo de transporte. Se construyen una vez al importar el módulo;
+# Line, LineRoute y MetroStation solo consultan `get_line_style`.
+_EMOJIS: Mapping[TransportType, Mapping[str, str]] = MappingProxyType({
+    TransportType.METRO: MappingProxyType({
+        "L1": "🟥",
+        "L2": "🟪",
+        "L3": "🟩",
+        "L4": "🟨",
+        "L5": "🟦",
+        "L9N": "🟧",
+        "L9S": "🟧",
+        "L10N": "🟦",
+        "L10S": "🟦",
+        "L11": "🟩",
+    }),
+    TransportType.TRAM: MappingProxyType({
+        "T1": "🟩",
+        "T2": "🟩",
+        "T3": "🟩",
+        "T4": "🟩",
+        "T5": "🟩",
+        "T6": "🟩",
+    }),
+    TransportType.FGC: MappingProxyType({
+        #Barcelona – Vallés
+        "L1": "🟥",
+        "S1": "🟥",
+        "S2": "🟩",
+        "L6": "🟪",
+        "L7": "🟫",
+        "L12": "🟪",
+
+        #Llobregat – Anoia
+        "L8": "🟪",
+        "S3": "🟦",
+        "S4": "🟨",
+        "S8": "🟦",
+        "S9": "🟥",
+        "R5": "🟦",
+        "R50": "🟦",
+        "R6": "⬛",
+        "R60": "⬛",
+        "R63": "⬛",
+
+        #Lleida – La Pobla de Segur
+        "RL1": "🟩",
+        "RL2": "🟩",
+    }),
+    TransportType.RODALIES: MappingProxyType({
+        "R1": "🟦", "R2": "🟩", "R2 Nord": "🟩", "R2 Sud": "🟩",
+        "R3": "🟥", "R4": "🟨", "R7": "⬜", "R8": "🟪",
+        "R11": "🟦", "R13": "⬛", "R14": "🟪", "R15": "🟫",
+        "R16": "🟥", "R17": "🟧", "RG1": "🟦", "RT1": "🟦",
+        "RT2": "⬜", "RL3": "🟩", "RL4": "🟨",
+    }),
+})
+
+# Bus: el emoji depende de la familia (primera letra reconocida del nombre, H12 -> H)
+_BUS_FAMILY_EMOJIS: Mapping[str, str] = MappingProxyType({
+    "H": "🟦",
+    "D": "🟪",
+    "V": "🟩",
+    "M": "🔴",
+    "X": "🟨",
+    "N": "🟦",
+})
+_BUS_NUMBERED_EMOJI = "🔴"
+
+# Colores oficiales cuando la API no trae color (solo Rodalies los necesita)
+_COLORS: Mapping[str, str] = MappingProxyType({
+    "R1": "73B0DF",
+    "R2": "009640",
+    "R2 Nord": "AACB2B",
+    "R2 Sud": "005F27",
+    "R3": "E63027",
+    "R4": "F6A22D",
+    "R7": "BC79B2",
+    "R8": "870064",
+    "R11": "0064A7",
+    "R13": "E8308A",
+    "R14": "5E4295",
+    "R15": "9A8B75",
+    "R16": "B20933",
+    "R17": "E87200",
+    "RG1": "0071CE",
+    "RT1": "00C4B3",
+    "RT2": "E577CB",
+    "RL3": "949300",
+    "RL4": "FFDD00",
+})
+DEFAULT_COLOR = "808080"
+
+_LINE_NUMBER = re.compile(r"L(\d+)([A-Z]?)")
+_BUS_NAME = re.compile(r"^([A-Z]+)(\d+)$")
+# Sin sufijo van después de N/S (L9N, L9S, L9)
+_SUFFIX_ORDER = MappingProxyType({"N": 0, "S": 1, "": 2})
+
+
+@dataclass(frozen=True, slots=True)
+class LineStyle:
+    emoji: str
+    name_with_emoji: str
+    color: str
+    sort_key: tuple
+
+
+def _bus_emoji(name: str) -> str:
+    if name.isdigit():
+        return _BUS_NUMBERED_EMOJI
+    return next((_BUS_FAMILY_EMOJIS[letter] for letter in name if letter in _BUS_FAMILY_EMOJIS), "")
+
+
+@lru_cache(maxsize=1024)
+def line_sort_key(name: str) -> Tuple[int, object]:
+    """Orden natural de líneas tipo L1, L9N, L9S, L10N... El resto va al final en su orden original."""
+    match = _LINE_NUMBER.match(name)
+    if not match:
+        return (999, "")  # Los que no encajan van al final
+    return (int(match.group(1)), _SUFFIX_ORDER.get(match.group(2) or "", 3))
+
+
+def bus_sort_key(name: str) -> Tuple[str, float]:
+    """Numéricas primero (1, 2, 10...), luego por familia y número (D20, H4, H12, V3...)."""
+    name = name.strip().upper()
+    if name.isdigit():
+        return ("", int(name))
+    match = _BUS_NAME.match(name)
+    if match:
+        prefix, number = match.groups()
+        return (prefix, int(number))
+    # Si no encaja en ninguna, lo ponemos al final
+    return (name, float('inf'))
+
+
+@lru_cache(maxsize=None)
+def get_line_style(transport_type: TransportType, name: Optional[str]) -> LineStyle:
+    """Estilo inmutable de la línea `name`, calculado una vez por (tipo, nombre)."""
+    name = name or ""
+    if transport_type == TransportType.BUS:
+        emoji = _bus_emoji(name)
+    else:
+        emoji = _EMOJIS.get(transport_type, {}).get(name, "")
+
+    return LineStyle(
+        emoji=emoji,
+        name_with_emoji=f"{emoji} {name}",
+        color=_COLORS.get(name, DEFAULT_COLOR),
+        sort_key=bus_sort_key(name) if transport_type == TransportType.BUS else line_sort_key(name),
+    )
@@ -4,7 +4,7 @@ from zoneinfo import ZoneInfo
 
 SPAIN_TZ = ZoneInfo("Europe/Madrid")
 
-@dataclass
+@dataclass(slots=True)
 class NextTrip:
     id: str
     arrival_time: int # Epoch in seconds
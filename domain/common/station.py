@@ -2,11 +2,12 @@ from dataclasses import dataclass, field
 from typing import List, Optional
 
 from domain.common.alert import Alert
+from domain.common.interning import intern_str
 from domain.common.line import Line
 from domain.transport_type import TransportType
 from providers.helpers.html_helper import HtmlHelper
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class Station:
     id: int
     code: int
@@ -26,6 +27,15 @@ class Station:
     has_alerts: Optional[bool] = False
     alerts: Optional[List[Alert]] = field(default_factory=list)
 
+    def __post_init__(self):
+        # Nombres de línea, colores y descripciones se repiten en miles de estaciones
+        self.name = intern_str(self.name)
+        self.description = intern_str(self.description)
+        self.line_name = intern_str(self.line_name)
+        self.line_color = intern_str(self.line_color)
+        self.line_description = intern_str(self.line_description)
+        self.line_name_with_emoji = intern_str(self.line_name_with_emoji)
+
     @staticmethod
     def get_alert_by_language(station, language: str):
         raw_alerts = []
@@ -1,6 +1,6 @@
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List
+from typing import Set
 
 @dataclass
 class User:
@@ -9,5 +9,5 @@ class User:
     created_at: datetime
     language: str
     receive_notifications: bool
-    already_notified: List[int] = field(default_factory=list)
+    already_notified: Set[str] = field(default_factory=set)
     fcm_token: str = ""
@@ -4,9 +4,9 @@ from domain.common.station import Station
 from domain.fgc.fgc_line import FgcLine
 from domain.transport_type import TransportType
 
-@dataclass
+@dataclass(slots=True)
 class FgcStation(Station):
-    moute_id: Optional[int] =  None
+    moute_id: Optional[str] =  None
 
     @staticmethod
     def create_fgc_station(station_data, line_name, order):
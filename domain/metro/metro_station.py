@@ -2,8 +2,9 @@ from dataclasses import dataclass
 from domain.metro import MetroLine
 from domain.transport_type import TransportType
 from domain.common.station import Station
+from domain.common.line_style import get_line_style
 
-@dataclass
+@dataclass(slots=True)
 class MetroStation(Station):
     CODI_GRUP_ESTACIO: int
     ORIGEN_SERVEI: str
@@ -49,17 +50,4 @@ class MetroStation(Station):
         return metro_station
 
 def _set_emoji_at_name(name):
-    emojis = {
-        "L1": "🟥",
-        "L2": "🟪",
-        "L3": "🟩",
-        "L4": "🟨",
-        "L5": "🟦",
-        "L9N": "🟧",
-        "L9S": "🟧",
-        "L10N": "🟦",
-        "L10S": "🟦",
-        "L11": "🟩",
-    }
-    return f"{emojis.get(name, "")} {name}"
-
+    return get_line_style(TransportType.METRO, name).name_with_emoji
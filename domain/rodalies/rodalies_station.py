@@ -3,7 +3,7 @@ from domain.common.line import Line
 from domain.common.station import Station
 from domain.transport_type import TransportType
 
-@dataclass
+@dataclass(slots=True)
 class RodaliesStation(Station):
 
     @staticmethod
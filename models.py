@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Index, Integer, String, DateTime, ForeignKey, Boolean, Float, BigInteger
+from sqlalchemy import Column, Index, Integer, String, Date, DateTime, ForeignKey, Boolean, Float, BigInteger, PrimaryKeyConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import JSONB
@@ -19,6 +19,7 @@ class User(Base):
     created_at = Column(DateTime, server_default=func.now())
     
     receive_notifications = Column(Boolean, default=True)
+    # Obsoleto: copiado a user_notified_alerts (revisión 0002). Ya no se lee ni se escribe.
     already_notified_ids = Column(JSONB, default=list) 
 
     devices = relationship("UserDevice", back_populates="user", cascade="all, delete-orphan")
@@ -26,6 +27,7 @@ class User(Base):
     subscriptions = relationship("UserSubscription", back_populates="user", cascade="all, delete-orphan")
     audit_trail = relationship("AuditLog", back_populates="user")
     search_history = relationship("SearchHistory", back_populates="user")
+    notified_alerts = relationship("UserNotifiedAlert", back_populates="user", cascade="all, delete-orphan")
 
 class UserDevice(Base):
     __tablename__ = "user_devices"
@@ -33,6 +35,10 @@ class UserDevice(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     token = Column(String, nullable=False)
     user = relationship("User", back_populates="devices")
+    __table_args__ = (
+        # user_id es la primera columna: sirve también para los JOIN por usuario
+        Index('uq_user_devices_user_token', user_id, token, unique=True),
+    )
 
 # ----------------------------
 # FAVORITOS
@@ -56,6 +62,10 @@ class Favorite(Base):
     longitude = Column(Float, nullable=True)
 
     user = relationship("User", back_populates="favorites")
+    __table_args__ = (
+        # Cubre has_favorite/remove_favorite y permite el upsert de add_favorite
+        Index('uq_favorites_user_type_station', user_id, transport_type, station_code, unique=True),
+    )
 
 # ----------------------------
 # DATOS DE SERVICIO (TMB/RODALIES)
@@ -68,7 +78,7 @@ class ServiceIncident(Base):
     __tablename__ = "service_incidents"
 
     id = Column(Integer, primary_key=True)
-    external_id = Column(String, unique=True)
+    external_id = Column(String)
     
     transport_type = Column(String)
     begin_date = Column(DateTime)
@@ -80,6 +90,30 @@ class ServiceIncident(Base):
     publications = Column(JSONB) 
     affected_entities = Column(JSONB)
 
+    __table_args__ = (
+        # El mismo id puede repetirse entre operadores: la unicidad es por (id, tipo)
+        Index('uq_service_incidents_external_type', external_id, transport_type, unique=True),
+        Index('ix_service_incidents_end_date', end_date),
+    )
+
+class UserNotifiedAlert(Base):
+    """
+    Alertas ya notificadas a cada usuario. La PK (user_id, alert_id) da semántica
+    de conjunto: insertar dos veces la misma alerta no hace nada.
+    """
+    __tablename__ = "user_notified_alerts"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    alert_id = Column(String, nullable=False)
+    notified_at = Column(DateTime, server_default=func.now())
+
+    user = relationship("User", back_populates="notified_alerts")
+    __table_args__ = (
+        PrimaryKeyConstraint(user_id, alert_id),
+        # Para la poda de alertas terminadas
+        Index('ix_user_notified_alerts_alert_id', alert_id),
+    )
+
 # ----------------------------
 # SUSCRIPCIONES DE USUARIO
 # ----------------------------
@@ -100,10 +134,13 @@ class UserSubscription(Base):
 # ----------------------------
 # AUDIT & HISTORY
 # ----------------------------
+# Tablas particionadas por mes (RANGE sobre timestamp). La clave de partición
+# tiene que formar parte de la PK, por eso es (id, timestamp). Las particiones
+# las crea/borra providers/database/partitions.py.
 class AuditLog(Base):
     __tablename__ = "audit_trail"
-    id = Column(Integer, primary_key=True)
-    timestamp = Column(DateTime, server_default=func.now())
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    timestamp = Column(DateTime, primary_key=True, server_default=func.now())
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     client_source = Column(String, index=True, nullable=False)
     
@@ -113,12 +150,44 @@ class AuditLog(Base):
     user = relationship("User", back_populates="audit_trail")
     __table_args__ = (
         Index('ix_audit_details', details, postgresql_using='gin'),
+        {'postgresql_partition_by': 'RANGE (timestamp)'},
     )
 
 class SearchHistory(Base):
     __tablename__ = "search_history"
-    id = Column(Integer, primary_key=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     query = Column(String)
-    timestamp = Column(DateTime, server_default=func.now())
-    user = relationship("User", back_populates="search_history")
\ No newline at end of file
+    timestamp = Column(DateTime, primary_key=True, server_default=func.now())
+    user = relationship("User", back_populates="search_history")
+    __table_args__ = (
+        Index('ix_search_history_user_timestamp', user_id, timestamp.desc()),
+        {'postgresql_partition_by': 'RANGE (timestamp)'},
+    )
+
+class AuditDailyRollup(Base):
+    """
+    Conteo diario por acción y cliente, para los dashboards.
+    Sobrevive a la retención de audit_trail (se rellena antes de borrar particiones).
+    """
+    __tablename__ = "audit_daily_rollup"
+    day = Column(Date, primary_key=True)
+    action = Column(String, primary_key=True)
+    client_source = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+# ----------------------------
+# CATÁLOGOS DERIVADOS
+# ----------------------------
+class FgcMouteStop(Base):
+    """
+    Correspondencia parada GTFS de FGC (stop_id) -> parada MouTe.
+    Se guardan las coordenadas con las que se resolvió: si el GTFS mueve la parada se vuelve a resolver.
+    moute_id NULL = MouTe no devolvió ninguna parada cercana.
+    """
+    __tablename__ = "fgc_moute_stops"
+    stop_id = Column(String, primary_key=True)
+    stop_lat = Column(Float, nullable=False)
+    stop_lon = Column(Float, nullable=False)
+    moute_id = Column(String, nullable=True)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
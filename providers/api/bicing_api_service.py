@@ -3,6 +3,7 @@ import inspect
 
 from domain.bicing.bicing_station import BicingStation
 from providers.helpers import logger
+from providers.helpers.resilience import resilient
 
 class BicingApiService:
     BASE_URL = "https://www.bicing.barcelona"
@@ -11,6 +12,7 @@ class BicingApiService:
     def __init__(self):
         self.logger = logger.getChild(self.__class__.__name__)
         
+    @resilient("bicing")
     async def _post(self, endpoint: str, data: dict = None):
         """Realiza una petición POST a la API de Bicing."""
         url = f"{self.BASE_URL}{endpoint}"
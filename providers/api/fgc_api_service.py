@@ -1,19 +1,21 @@
-from datetime import datetime
-from io import StringIO
+from datetime import datetime, timedelta
+import os
 import ssl
 import time
 from zoneinfo import ZoneInfo
 import aiohttp
 import inspect
 import asyncio
-from typing import Any, Dict, List
-
-import pandas as pd
+from typing import Any, Dict, List, Optional, Tuple
 
 from domain.fgc import FgcLine, FgcStation
 from domain.transport_type import TransportType
 from providers.helpers import logger
-from google.transit import gtfs_realtime_pb2
+from providers.helpers.gtfs_feed_manager import GtfsFeedManager, GtfsSnapshot
+from providers.helpers.gtfs_realtime_index import GtfsRealtimeIngester
+from providers.helpers.debug_trace import provider_trace, TraceScope
+from providers.helpers.gtfs_timetable import service_day_start
+from providers.helpers.resilience import get_provider_guard
 
 
 class FgcApiService:
@@ -23,13 +25,28 @@ class FgcApiService:
     MOUTE_BASE_URL = "https://mou-te.gencat.cat/MouteAPI/rest/infrastructure"
     GTFS_RT_URL = "https://dadesobertes.fgc.cat/api/explore/v2.1/catalog/datasets/trip-updates-gtfs_realtime/files/735985017f62fd33b2fe46e31ce53829"
 
+    # Caché en disco del GTFS compacto (ver providers/helpers/gtfs_store.py)
+    GTFS_CACHE_DIR = os.getenv("FGC_GTFS_CACHE_DIR", "cache/fgc_gtfs")
+    GTFS_REFRESH_INTERVAL = int(os.getenv("FGC_GTFS_REFRESH_INTERVAL", 6 * 3600))
+    GTFS_RT_POLL_INTERVAL = int(os.getenv("FGC_GTFS_RT_POLL_INTERVAL", 30))
+    GTFS_RT_MAX_AGE = int(os.getenv("FGC_GTFS_RT_MAX_AGE", 300))
+    GTFS_DOWNLOAD_TIMEOUT = int(os.getenv("FGC_GTFS_DOWNLOAD_TIMEOUT", 120))
+    GTFS_REQUIRED_FILES = ["routes", "stops", "trips", "stop_times"]
+    GTFS_OPTIONAL_FILES = ["calendar", "calendar_dates"]
+
 
     def __init__(self):        
-        self._routes = None
-        self._stops = None
-        self._trips = None
-        self._stop_times = None
         self.logger = logger.getChild(self.__class__.__name__)
+        self._feed = GtfsFeedManager(
+            "fgc",
+            self._get_file_urls,
+            self._conditional_get,
+            self.GTFS_REQUIRED_FILES,
+            self.GTFS_OPTIONAL_FILES,
+            self.GTFS_CACHE_DIR,
+            self.GTFS_REFRESH_INTERVAL,
+        )
+        self._realtime = GtfsRealtimeIngester("fgc", self._fetch_realtime_feed, self.GTFS_RT_POLL_INTERVAL, self.GTFS_RT_MAX_AGE)
 
     async def _request(
         self,
@@ -41,11 +58,18 @@ class FgcApiService:
         **kwargs
     ) -> Any:
         """Generic HTTP request handler supporting JSON, text and raw bytes."""
+        url = f"{self.FGC_BASE_URL}{endpoint}" if use_FGC_BASE_URL else endpoint
+        # MouTe es otro proveedor: su caída no debe abrir el circuito de FGC (ni al revés)
+        provider = "moute" if url.startswith(self.MOUTE_BASE_URL) else "fgc"
+        return await get_provider_guard(provider).call(
+            self._send_request, method, url, raw, text, endpoint=provider, **kwargs
+        )
+
+    async def _send_request(self, method: str, url: str, raw: bool, text: bool, **kwargs) -> Any:
         current_method = inspect.currentframe().f_code.co_name
         headers = kwargs.pop("headers", {})
         headers["Accept"] = "*/*" if raw or text else "application/json"
 
-        url = f"{self.FGC_BASE_URL}{endpoint}" if use_FGC_BASE_URL else endpoint
         self.logger.debug(f"[{current_method}] {method.upper()} → {url} | Params: {kwargs.get('params', {})}")
 
         ssl_context = ssl.create_default_context()
@@ -88,54 +112,54 @@ class FgcApiService:
             file_info = record.get("file", {})
             filename = file_info.get("filename")
             url = file_info.get("url")
-            if filename and url and filename in ["routes.txt", "stops.txt", "trips.txt", "stop_times.txt"]:
+            if filename and url and filename in ["routes.txt", "stops.txt", "trips.txt", "stop_times.txt", "calendar.txt", "calendar_dates.txt"]:
                 key = filename.replace(".txt", "")
                 urls[key] = url
         return urls
 
-    async def _load_csvs(self):
-        """Descargar los CSVs una sola vez y guardarlos en la clase"""
-        if self._routes is not None:
-            return
-
-        urls = await self._get_file_urls()
-        self._routes = pd.read_csv(StringIO(await self._request("GET", urls["routes"], use_FGC_BASE_URL=False, text=True)))
-        self._stops = pd.read_csv(StringIO(await self._request("GET", urls["stops"], use_FGC_BASE_URL=False, text=True)))
-        self._trips = pd.read_csv(StringIO(await self._request("GET", urls["trips"], use_FGC_BASE_URL=False, text=True)))
-        self._stop_times = pd.read_csv(StringIO(await self._request("GET", urls["stop_times"], use_FGC_BASE_URL=False, text=True)))
+    async def _conditional_get(self, url: str, headers: Dict[str, str]) -> Tuple[int, Optional[str], Dict[str, str]]:
+        """GET con validadores (If-None-Match / If-Modified-Since); en un 304 no hay cuerpo."""
+        return await get_provider_guard("fgc").call(
+            self._send_conditional_get, url, headers, endpoint="gtfs_static", timeout=self.GTFS_DOWNLOAD_TIMEOUT
+        )
 
-    async def get_stations_by_line(self, line_name: str) -> List[FgcStation]:
-        """Obtener todas las estaciones de una línea concreta con orden correcto"""
-        await self._load_csvs()
+    async def _send_conditional_get(self, url: str, headers: Dict[str, str]) -> Tuple[int, Optional[str], Dict[str, str]]:
+        ssl_context = ssl.create_default_context()
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_NONE
 
-        route = self._routes[self._routes["route_short_name"] == line_name]
-        if route.empty:
-            raise ValueError(f"No se encontró la línea {line_name}")
-        route_id = route.iloc[0]["route_id"]
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url, headers={"Accept": "*/*", **headers}, ssl=ssl_context) as resp:
+                if resp.status == 304:
+                    return resp.status, None, dict(resp.headers)
+                resp.raise_for_status()
+                return resp.status, await resp.text(), dict(resp.headers)
 
-        trips_for_route = self._trips[self._trips["route_id"] == route_id]
-        if trips_for_route.empty:
-            return []
+    async def _get_gtfs(self) -> GtfsSnapshot:
+        """Snapshot vigente del GTFS; se revalida en segundo plano cada GTFS_REFRESH_INTERVAL."""
+        return await self._feed.get_snapshot()
 
-        first_trip_id = trips_for_route.iloc[0]["trip_id"]
+    async def _fetch_realtime_feed(self) -> bytes:
+        return await self._request("GET", self.GTFS_RT_URL, use_FGC_BASE_URL=False, raw=True)
 
-        stop_times_line = self._stop_times[self._stop_times["trip_id"] == first_trip_id]
-        stop_times_line = stop_times_line.sort_values("stop_sequence")
+    async def close(self):
+        await self._feed.stop()
+        await self._realtime.stop()
 
-        stop_order_map = {stop_id: idx + 1 for idx, stop_id in enumerate(stop_times_line["stop_id"].tolist())}
+    async def get_stations_by_line(self, line_name: str) -> List[FgcStation]:
+        """Obtener todas las estaciones de una línea concreta con orden correcto"""
+        timetable = (await self._get_gtfs()).timetable
 
-        stations_df = self._stops[self._stops["stop_id"].isin(stop_order_map.keys())].copy()
-        stations_df = stations_df.dropna(subset=["stop_id"])
+        route_id = timetable.route_id_by_short_name.get(line_name)
+        if route_id is None:
+            raise ValueError(f"No se encontró la línea {line_name}")
 
-        stations = [
-            FgcStation.create_fgc_station(row, line_name=line_name, order=stop_order_map[row["stop_id"]])
-            for _, row in stations_df.iterrows()
+        # Secuencia canónica precompilada con el feed: ya viene ordenada por 'order'
+        return [
+            FgcStation.create_fgc_station(stop._asdict(), line_name=line_name, order=stop.order)
+            for stop in timetable.route_stops.get(route_id, [])
         ]
 
-        # 6. Ordenar la lista por 'order'
-        stations.sort(key=lambda x: x.order)
-        return stations
-
     async def get_moute_next_departures(self, moute_id):
         data = await self._request("GET", f"{self.MOUTE_BASE_URL}/nextdeparturesNEW?paradaId={moute_id}&useRealTime=true&language=ca_ES", params=None, use_FGC_BASE_URL=False)
         
@@ -200,189 +224,94 @@ class FgcApiService:
         
 
     async def get_next_departures(self, station_name: str, line_name: str, max_results: int = 5) -> Dict[str, List[Dict]]:
-        log_file = "realtime_departures.log"
+        with provider_trace("fgc.next_departures", station=station_name, line=line_name) as trace:
+            return await self._get_next_departures(trace, station_name, line_name, max_results)
 
+    async def _get_next_departures(self, trace: TraceScope, station_name: str, line_name: str, max_results: int) -> Dict[str, List[Dict]]:
         madrid_tz = ZoneInfo("Europe/Madrid")
 
-        def log(msg: str):
-            with open(log_file, "a", encoding="utf-8") as f:
-                f.write(f"{datetime.now(tz=madrid_tz).strftime('%Y-%m-%d %H:%M:%S')} - {msg}\n")
-
-        # Resetear log
-        with open(log_file, "w", encoding="utf-8") as f:
-            f.write("=== Nueva ejecución ===\n")
-
-        # Cargar CSVs
-        await self._load_csvs()
+        # Snapshot vigente: aunque se publique uno nuevo a mitad, esta petición usa siempre el mismo
+        timetable = (await self._get_gtfs()).timetable
 
         # 1️⃣ Buscar estación
-        stop = self._stops[self._stops["stop_name"].str.lower() == station_name.lower()]
-        if stop.empty:
-            log(f"No se encontró la estación {station_name}")
+        stop_id = timetable.stop_id_by_name.get(station_name.lower())
+        if stop_id is None:
+            trace.event("stop_not_found")
             return {}
-        stop_id = stop.iloc[0]["stop_id"]
-        log(f"STOP ({stop_id}):\n{stop}")
+        trace.event("stop_resolved", stop_id=stop_id)
 
         # 2️⃣ Buscar línea
-        route = self._routes[self._routes["route_short_name"] == line_name]
-        if route.empty:
-            log(f"No se encontró la línea {line_name}")
+        route_id = timetable.route_id_by_short_name.get(line_name)
+        if route_id is None:
+            trace.event("route_not_found")
             return {}
-        route_id = route.iloc[0]["route_id"]
-        log(f"ROUTE ({route_id}):\n{route}")
+        trace.event("route_resolved", route_id=route_id)
 
         # 3️⃣ Obtener todos los trip_id de esta línea
-        trip_ids = set(self._trips[self._trips["route_id"] == route_id]["trip_id"])
-        log(f"TRIPS_IDS for '{route_id}':\n{trip_ids}")
+        trip_ids = timetable.trip_ids_by_route.get(route_id, frozenset())
+        trace.event("route_trips", count=len(trip_ids))
 
         departures_by_direction = {}
         now_ts = time.time()
         seen_departures = set()  # (trip_instance_id, direction_id)
 
-        # 4️⃣ Procesar feed RT
-        try:
-            data = await self._request("GET", self.GTFS_RT_URL, use_FGC_BASE_URL=False, raw=True)
-            feed = gtfs_realtime_pb2.FeedMessage()
-            feed.ParseFromString(data)
-        except Exception as e:
-            log(f"No se pudo descargar/parsear feed RT: {e}")
-            feed = None
-
+        # 4️⃣ Salidas RT desde el índice compartido (sin descargar ni parsear el feed por petición)
         rt_trip_ids = set()
-
-        if feed:
-            log(f"FEED: \n{feed.entity}")
-            for entity in feed.entity:
-                if not entity.HasField("trip_update"):
-                    continue
-                trip_update = entity.trip_update
-                if trip_update.trip.trip_id not in trip_ids:
-                    continue
-                direction_id = getattr(trip_update.trip, "direction_id", 0)
-                stop_time_updates = trip_update.stop_time_update
-                if not stop_time_updates:
+        rt_index = await self._realtime.get_index()
+        if rt_index is None:
+            trace.event("realtime_unavailable")
+        else:
+            for update in rt_index.upcoming(stop_id, now_ts):
+                if update.trip_id not in trip_ids:
                     continue
 
                 # Última parada para nombre de dirección
-                last_stop_id = stop_time_updates[-1].stop_id
-                last_stop_row = self._stops[self._stops["stop_id"] == last_stop_id]
-                direction_name = f"dir_{direction_id}" if last_stop_row.empty else last_stop_row.iloc[0]["stop_name"]
-
-                for stu in stop_time_updates:
-                    if stu.stop_id != stop_id:
-                        continue
-                    if not stu.HasField("departure") or not stu.departure.HasField("time"):
-                        continue
-                    ts = stu.departure.time
-                    if ts < now_ts:
-                        continue
-
-                    trip_instance_id = trip_update.trip.trip_id.split("|")[1]
-                    key = (trip_instance_id, direction_name)
-                    if key in seen_departures:
-                        continue
-                    seen_departures.add(key)
-
-                    departures_by_direction.setdefault(direction_name, []).append({
-                        "trip_id": trip_update.trip.trip_id,
-                        "departure_time": ts,
-                        "type": "RT"
-                    })
-                    rt_trip_ids.add(trip_update.trip.trip_id)
-                    log(f"--> Coincidencia RT: trip_id={trip_update.trip.trip_id}, ts={ts}, direction={direction_name}")
-
-                    if len(departures_by_direction[direction_name]) >= max_results:
-                        break
-
-        # 5️⃣ Procesar planificados (100% vectorizado y robusto)
-        stop_times_for_stop = self._stop_times[
-            (self._stop_times["stop_id"] == stop_id) &
-            (self._stop_times["trip_id"].isin(trip_ids - rt_trip_ids))
-        ].copy()
-
-        # Si no hay datos, devolvemos lo que tengamos
-        if stop_times_for_stop.empty:
-            log(f"No hay salidas planificadas para {station_name}")
-            return departures_by_direction
-
-        # Vectorizamos el cálculo de departure_ts
-        def to_timestamp(dep_time: str) -> float:
-            try:
-                h, m, s = map(int, dep_time.split(":"))
-            except ValueError:
-                return float("inf")  # Si hay datos corruptos, los descartamos
-            extra_days = h // 24
-            h %= 24
-            ts = datetime.now(tz=madrid_tz).replace(hour=h, minute=m, second=s, microsecond=0).timestamp()
-            return ts + extra_days * 24 * 3600
-
-        stop_times_for_stop["departure_ts"] = stop_times_for_stop["departure_time"].map(to_timestamp)
-        stop_times_for_stop = stop_times_for_stop[stop_times_for_stop["departure_ts"] >= now_ts]
-
-        # Si no hay salidas futuras, devolvemos lo que tengamos
-        if stop_times_for_stop.empty:
-            return departures_by_direction
-
-        # Si falta la columna direction_id, la creamos
-        trips_df = self._trips.copy()
-        if "direction_id" not in trips_df.columns:
-            trips_df["direction_id"] = 0
-
-        # Merge para añadir direction_id
-        stop_times_for_stop = stop_times_for_stop.merge(
-            trips_df[["trip_id", "direction_id"]],
-            on="trip_id",
-            how="left"
-        )
-
-        # Calcular última parada de cada trip, renombrando explícitamente la columna
-        last_stops = (
-            self._stop_times
-            .sort_values("stop_sequence")
-            .groupby("trip_id", as_index=False)
-            .agg({"stop_id": "last"})
-            .rename(columns={"stop_id": "last_stop_id"})
-        )
-        stop_times_for_stop = stop_times_for_stop.merge(last_stops, on="trip_id", how="left")
-
-        # Merge con stops usando last_stop_id
-        stop_times_for_stop = stop_times_for_stop.merge(
-            self._stops[["stop_id", "stop_name"]],
-            left_on="last_stop_id",
-            right_on="stop_id",
-            how="left"
-        )
-
-        # Crear trip_instance_id vectorizado
-        stop_times_for_stop["trip_instance_id"] = stop_times_for_stop["trip_id"].str.split("|").str[1]
+                direction_name = timetable.direction_name(update.last_stop_id, update.direction_id)
+                if len(departures_by_direction.get(direction_name, [])) >= max_results:
+                    continue
 
-        # Crear direction_name con fallback
-        stop_times_for_stop["direction_name"] = stop_times_for_stop.apply(
-            lambda r: r["stop_name"] if pd.notna(r["stop_name"]) else f"dir_{r['direction_id']}",
-            axis=1
+                trip_instance_id = update.trip_id.split("|")[1]
+                key = (trip_instance_id, direction_name)
+                if key in seen_departures:
+                    continue
+                seen_departures.add(key)
+
+                departures_by_direction.setdefault(direction_name, []).append({
+                    "trip_id": update.trip_id,
+                    "departure_time": update.departure_ts,
+                    "type": "RT"
+                })
+                rt_trip_ids.add(update.trip_id)
+                trace.event("realtime_match", trip_id=update.trip_id, ts=update.departure_ts, delay=update.delay, direction=direction_name)
+
+        # 5️⃣ Procesar planificados: búsqueda binaria en el índice precompilado,
+        # solo con los trips que circulan hoy (y los de ayer que pasan de 24:00)
+        today = datetime.now(tz=madrid_tz).date()
+        service_days = [
+            (day, service_day_start(day, madrid_tz))
+            for day in (today - timedelta(days=1), today)
+        ]
+        scheduled = timetable.next_departures(
+            stop_id,
+            route_id,
+            now_ts=now_ts,
+            service_days=service_days,
+            max_results=max_results,
+            exclude_trip_ids=rt_trip_ids,
         )
 
-        # Eliminar duplicados usando trip_instance_id + direction_name
-        stop_times_for_stop = stop_times_for_stop.drop_duplicates(subset=["trip_instance_id", "direction_name"])
-
-        # Agrupar por dirección y coger los max_results primeros
-        departures_by_direction_df = (
-            stop_times_for_stop
-            .sort_values("departure_ts")
-            .groupby("direction_name")
-            .head(max_results)
-            [["direction_name", "trip_id", "departure_ts"]]
-        )
+        if not scheduled:
+            trace.event("no_scheduled_departures")
+            return departures_by_direction
 
-        # Convertir DataFrame a diccionario final
-        for direction_name, group in departures_by_direction_df.groupby("direction_name"):
+        for direction_name, departures in scheduled.items():
             departures_by_direction.setdefault(direction_name, []).extend([
                 {
-                    "trip_id": row.trip_id,
-                    "departure_time": row.departure_ts,
+                    "trip_id": dep.trip_id,
+                    "departure_time": dep.departure_ts,
                     "type": "Scheduled"
                 }
-                for row in group.itertuples()
+                for dep in departures
             ])
 
         # Ordenar cada lista de salidas por departure_time
@@ -392,5 +321,5 @@ class FgcApiService:
         # Ordenar las claves del dict alfabéticamente
         departures_by_direction = dict(sorted(departures_by_direction.items(), key=lambda x: x[0]))
 
-        log(f"Salidas agrupadas por dirección para {station_name} ({line_name}): {departures_by_direction}")
+        trace.event("result", departures={direction: len(trips) for direction, trips in departures_by_direction.items()})
         return departures_by_direction
\ No newline at end of file
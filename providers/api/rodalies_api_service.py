@@ -6,6 +6,7 @@ from typing import Any, List
 
 from domain.transport_type import TransportType
 from providers.helpers import logger
+from providers.helpers.resilience import resilient
 from domain.rodalies import RodaliesLine, RodaliesStation
 from domain import NextTrip, LineRoute, normalize_to_seconds
 
@@ -18,6 +19,7 @@ class RodaliesApiService:
     def __init__(self):
         self.logger = logger.getChild(self.__class__.__name__)
 
+    @resilient("rodalies")
     async def _request(self, method: str, endpoint: str, use_base_url: bool = True, **kwargs) -> Any:
         """Generic HTTP request handler with token authentication."""
         current_method = inspect.currentframe().f_code.co_name
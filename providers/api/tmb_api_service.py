@@ -2,7 +2,6 @@ from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 from typing import List
 import aiohttp
-import re
 import inspect
 
 from domain import NextTrip, LineRoute, normalize_to_seconds
@@ -17,6 +16,7 @@ from domain.rodalies.rodalies_line import RodaliesLine
 from domain.tram.tram_line import TramLine
 from domain.transport_type import TransportType
 from providers.helpers import logger
+from providers.helpers.resilience import resilient
 
 
 class TmbApiService:
@@ -29,22 +29,7 @@ class TmbApiService:
         self.app_key = app_key
         self.app_id = app_id
 
-    def _natural_key(self, line):
-        name = line.name.strip().upper()
-
-        # Si es puramente numérica: agrupar todas con prefijo "" y ordenar por número
-        if name.isdigit():
-            return ("", int(name))
-
-        # Si es alfanumérica tipo H1, X23, etc.
-        match = re.match(r'^([A-Z]+)(\d+)$', name)
-        if match:
-            prefix, number = match.groups()
-            return (prefix, int(number))
-
-        # Si no encaja en ninguna, lo ponemos al final
-        return (name, float('inf'))
-
+    @resilient("tmb")
     async def _get(self, endpoint: str, params: dict = None):
         """Realiza una petición GET a la API con app_id y app_key obligatorios."""
 
@@ -88,7 +73,7 @@ class TmbApiService:
 
         lines = []
         lines.extend(BusLine.create_bus_line(feature) for feature in features if feature['properties']['NOM_FAMILIA'] and 'Llançadores' not in feature['properties']['NOM_LINIA'])
-        lines.sort(key=self._natural_key)
+        lines.sort(key=lambda line: line.sort_key)
         return lines
 
     async def get_bus_line_stops(self, line_code) -> List[BusStop]:
@@ -10,6 +10,7 @@ from domain import NextTrip, LineRoute, normalize_to_seconds
 
 from domain.transport_type import TransportType
 from providers.helpers import logger
+from providers.helpers.resilience import resilient
 
 
 class TramApiService:
@@ -56,6 +57,7 @@ class TramApiService:
             await self._fetch_access_token()
         return self.ACCESS_TOKEN
 
+    @resilient("tram")
     async def _request(self, method: str, endpoint: str, use_base_url: bool = True, **kwargs) -> Any:
         """Método común para todas las llamadas HTTP."""
         current_method = inspect.currentframe().f_code.co_name
@@ -1,7 +1,17 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.util import queue as sqla_queue
 
 from providers.manager.secrets_manager import SecretsManager
+from providers.helpers import logger
 
 secrets = SecretsManager()
 
@@ -20,12 +30,161 @@ if DATABASE_URL.startswith("postgresql://"):
 elif DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+asyncpg://", 1)
 
+# ----------------------------
+# CONFIGURACIÓN DEL POOL
+# ----------------------------
+# Railway limita las conexiones por instancia: pool_size + max_overflow debe quedar por debajo.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 5))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))      # segundos esperando una conexión libre
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))      # segundos antes de reciclar una conexión
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 256))  # caché de asyncpg (0 si hay pgbouncer)
+
+# Escrituras en segundo plano (auditoría, historial de búsquedas)
+DB_BACKGROUND_WRITE_CONCURRENCY = int(os.getenv("DB_BACKGROUND_WRITE_CONCURRENCY", 3))
+DB_BACKGROUND_WRITE_MAX_PENDING = int(os.getenv("DB_BACKGROUND_WRITE_MAX_PENDING", 1000))
+
+
+class PoolMetrics:
+    """Contadores del pool de conexiones, actualizados desde los eventos de SQLAlchemy."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.connect_count = 0
+        self.connect_total = 0.0
+        self.connect_max = 0.0
+        self.background_writes = 0
+        self.background_dropped = 0
+        self.background_pending = 0
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_connect_time(self, seconds: float):
+        with self._lock:
+            self.connect_count += 1
+            self.connect_total += seconds
+            self.connect_max = max(self.connect_max, seconds)
+
+    def record_checkout(self):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def record_checkin(self):
+        with self._lock:
+            self.checkins += 1
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_invalidation(self):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "pool_size": DB_POOL_SIZE,
+                "max_overflow": DB_MAX_OVERFLOW,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "wait_avg_ms": (self.wait_total / self.wait_count * 1000) if self.wait_count else 0.0,
+                "wait_max_ms": self.wait_max * 1000,
+                "connect_avg_ms": (self.connect_total / self.connect_count * 1000) if self.connect_count else 0.0,
+                "connect_max_ms": self.connect_max * 1000,
+                "background_writes": self.background_writes,
+                "background_pending": self.background_pending,
+                "background_dropped": self.background_dropped,
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredAsyncAdaptedQueue(sqla_queue.AsyncAdaptedQueue):
+    """Cola de conexiones libres del pool: mide solo la espera en la cola."""
+
+    def get(self, block: bool = True, timeout: Optional[float] = None):
+        start = time.perf_counter()
+        try:
+            return super().get(block, timeout)
+        finally:
+            pool_metrics.record_wait(time.perf_counter() - start)
+
+
+class MeteredAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    Pool asíncrono con métricas. La espera por una conexión libre (contención) y el tiempo
+    de abrir una nueva (TCP + autenticación) se miden por separado.
+    """
+
+    _queue_class = MeteredAsyncAdaptedQueue
+
+    def _create_connection(self):
+        start = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            pool_metrics.record_connect_time(time.perf_counter() - start)
+
+
 engine = create_async_engine(
     DATABASE_URL,
     echo=False, # Pon True si quieres ver las queries SQL en la consola (útil para debug)
-    future=True
+    future=True,
+    poolclass=MeteredAsyncQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=True,
+    connect_args={
+        "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+    }
 )
 
+
+@event.listens_for(engine.sync_engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    pool_metrics.record_connect()
+
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_metrics.record_checkout()
+
+
+@event.listens_for(engine.sync_engine, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    pool_metrics.record_checkin()
+
+
+@event.listens_for(engine.sync_engine, "invalidate")
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    pool_metrics.record_invalidation()
+
+
 AsyncSessionLocal = sessionmaker(
     bind=engine,
     class_=AsyncSession,
@@ -34,6 +193,45 @@ AsyncSessionLocal = sessionmaker(
 
 Base = declarative_base()
 
+# ----------------------------
+# ESCRITURAS EN SEGUNDO PLANO
+# ----------------------------
+_background_semaphore = asyncio.Semaphore(DB_BACKGROUND_WRITE_CONCURRENCY)
+_background_tasks = set()
+
+
+def spawn_background_write(coro) -> Optional[asyncio.Task]:
+    """
+    Lanza una escritura en segundo plano limitando cuántas usan el pool a la vez.
+    Si hay demasiadas pendientes se descarta (la auditoría no debe tumbar el bot).
+    """
+    if pool_metrics.background_pending >= DB_BACKGROUND_WRITE_MAX_PENDING:
+        pool_metrics.background_dropped += 1
+        coro.close()
+        logger.warning(f"[Database] Background write dropped: {pool_metrics.background_pending} pending")
+        return None
+
+    async def _run():
+        try:
+            async with _background_semaphore:
+                await coro
+                pool_metrics.background_writes += 1
+        finally:
+            pool_metrics.background_pending -= 1
+
+    pool_metrics.background_pending += 1
+    task = asyncio.create_task(_run())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+def get_pool_metrics() -> dict:
+    metrics = pool_metrics.snapshot()
+    metrics["pool_status"] = engine.sync_engine.pool.status()
+    return metrics
+
+
 async def get_db():
     async with AsyncSessionLocal() as session:
         try:
@@ -44,9 +242,14 @@ async def get_db():
 async def init_db():
     async with engine.begin() as conn:
         import models
+        from providers.database.migrations import run_migrations
+        from providers.database.partitions import RETENTION_MONTHS, ensure_monthly_partitions
 
         # print("[Database] Borrando tablas existentes...")
         # await conn.run_sync(Base.metadata.drop_all)
-        
+
         await conn.run_sync(Base.metadata.create_all)
-        print("[Database] Tablas inicializadas correctamente.")
\ No newline at end of file
+        await run_migrations(conn)
+        for table in RETENTION_MONTHS:
+            await ensure_monthly_partitions(conn, table)
+        print("[Database] Tablas inicializadas correctamente.")
@@ -0,0 +1,256 @@
+"""
+Migraciones de esquema versionadas.
+
+`Base.metadata.create_all` solo crea tablas que no existen: no añade índices ni
+constraints a tablas ya creadas en producción. Cada revisión de esta lista se
+aplica una única vez (queda registrada en `schema_revisions`) dentro de la misma
+transacción que `init_db`. Las sentencias son idempotentes para que una base de
+datos nueva, creada ya con los índices de `models.py`, también pase por ellas.
+"""
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from providers.helpers import logger
+
+
+def _partition_existing_table(table: str, columns: str, copy_columns: str, indexes: List[str]) -> str:
+    """
+    Convierte `table` (si aún no lo es) en una tabla particionada por mes sobre
+    `timestamp`: renombra la original a *_legacy, crea la particionada con las
+    mismas columnas, crea las particiones que cubren los datos, copia y borra la antigua.
+    En una base de datos nueva create_all ya la crea particionada y no hace nada.
+    """
+    create_indexes = "\n".join(f"        {index};" for index in indexes)
+    return f"""
+    DO $$
+    DECLARE
+        idx record;
+    BEGIN
+        IF EXISTS (
+            SELECT 1 FROM pg_partitioned_table p
+            JOIN pg_class c ON c.oid = p.partrelid
+            WHERE c.relname = '{table}'
+        ) THEN
+            RETURN;
+        END IF;
+
+        ALTER TABLE {table} RENAME TO {table}_legacy;
+        FOR idx IN SELECT indexname FROM pg_indexes WHERE tablename = '{table}_legacy' LOOP
+            EXECUTE format('ALTER INDEX %I RENAME TO %I', idx.indexname, idx.indexname || '_legacy');
+        END LOOP;
+
+        CREATE TABLE {table} (
+            id INTEGER NOT NULL DEFAULT nextval('{table}_id_seq'),
+            {columns},
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp);
+        ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id;
+{create_indexes}
+
+        PERFORM ensure_monthly_partition('{table}', m::date)
+        FROM generate_series(
+            date_trunc('month', COALESCE((SELECT min(timestamp) FROM {table}_legacy), now())),
+            date_trunc('month', now()),
+            interval '1 month'
+        ) m;
+        CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT;
+
+        INSERT INTO {table} (id, timestamp, {copy_columns})
+        SELECT id, COALESCE(timestamp, now()), {copy_columns} FROM {table}_legacy;
+        DROP TABLE {table}_legacy;
+    END $$
+    """
+
+
+# (revision_id, sentencias SQL) en orden de aplicación
+MIGRATIONS: List[Tuple[str, List[str]]] = [
+    (
+        "0001_user_data_indexes",
+        [
+            # Favoritos: eliminar duplicados antes de exigir unicidad
+            """
+            DELETE FROM favorites f
+            USING favorites d
+            WHERE f.user_id = d.user_id
+              AND f.transport_type = d.transport_type
+              AND f.station_code = d.station_code
+              AND f.id > d.id
+            """,
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_favorites_user_type_station
+            ON favorites (user_id, transport_type, station_code)
+            """,
+
+            # Incidencias: la unicidad pasa de external_id a (external_id, transport_type)
+            "ALTER TABLE service_incidents DROP CONSTRAINT IF EXISTS service_incidents_external_id_key",
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_service_incidents_external_type
+            ON service_incidents (external_id, transport_type)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_service_incidents_end_date
+            ON service_incidents (end_date)
+            """,
+
+            # Historial de búsquedas (get_search_history ordena por timestamp desc)
+            """
+            CREATE INDEX IF NOT EXISTS ix_search_history_user_timestamp
+            ON search_history (user_id, timestamp DESC)
+            """,
+
+            # Dispositivos: un token por usuario
+            """
+            DELETE FROM user_devices u
+            USING user_devices d
+            WHERE u.user_id = d.user_id
+              AND u.token = d.token
+              AND u.id > d.id
+            """,
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_user_devices_user_token
+            ON user_devices (user_id, token)
+            """,
+        ],
+    ),
+    (
+        "0002_user_notified_alerts",
+        [
+            # La tabla la crea create_all; aquí solo se copia el histórico del JSONB
+            """
+            INSERT INTO user_notified_alerts (user_id, alert_id)
+            SELECT u.id, ids.alert_id
+            FROM users u
+            CROSS JOIN LATERAL jsonb_array_elements_text(
+                CASE WHEN jsonb_typeof(u.already_notified_ids) = 'array'
+                     THEN u.already_notified_ids ELSE '[]'::jsonb END
+            ) AS ids(alert_id)
+            ON CONFLICT DO NOTHING
+            """,
+        ],
+    ),
+    (
+        "0003_partition_audit_and_search_history",
+        [
+            """
+            CREATE OR REPLACE FUNCTION ensure_monthly_partition(parent text, month_start date) RETURNS void AS $$
+            BEGIN
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                    parent || '_' || to_char(month_start, 'YYYY_MM'),
+                    parent,
+                    month_start,
+                    (month_start + interval '1 month')::date
+                );
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+            _partition_existing_table(
+                "audit_trail",
+                columns="""timestamp TIMESTAMP NOT NULL DEFAULT now(),
+            user_id INTEGER REFERENCES users (id),
+            client_source VARCHAR NOT NULL,
+            action VARCHAR,
+            details JSONB""",
+                copy_columns="user_id, client_source, action, details",
+                indexes=[
+                    "CREATE INDEX ix_audit_trail_client_source ON audit_trail (client_source)",
+                    "CREATE INDEX ix_audit_details ON audit_trail USING gin (details)",
+                ],
+            ),
+            _partition_existing_table(
+                "search_history",
+                columns="""user_id INTEGER REFERENCES users (id),
+            query VARCHAR,
+            timestamp TIMESTAMP NOT NULL DEFAULT now()""",
+                copy_columns="user_id, query",
+                indexes=[
+                    "CREATE INDEX ix_search_history_user_timestamp ON search_history (user_id, timestamp DESC)",
+                ],
+            ),
+            # Rollup diario con todo el histórico que había antes de particionar
+            """
+            INSERT INTO audit_daily_rollup (day, action, client_source, count)
+            SELECT timestamp::date, COALESCE(action, ''), client_source, count(*)
+            FROM audit_trail
+            GROUP BY 1, 2, 3
+            ON CONFLICT (day, action, client_source) DO UPDATE SET count = EXCLUDED.count
+            """,
+        ],
+    ),
+    (
+        "0004_partition_from_default",
+        [
+            # Lo normal es que DEFAULT esté vacía (las particiones se crean meses antes) y basta
+            # con CREATE TABLE ... PARTITION OF. Si DEFAULT ya tiene filas del mes, eso falla:
+            # se crea la tabla suelta, se mueven esas filas y se adjunta después
+            """
+            CREATE OR REPLACE FUNCTION ensure_monthly_partition(parent text, month_start date) RETURNS void AS $$
+            DECLARE
+                child text := parent || '_' || to_char(month_start, 'YYYY_MM');
+                default_partition text := parent || '_default';
+                month_end date := (month_start + interval '1 month')::date;
+                has_rows boolean := false;
+            BEGIN
+                IF to_regclass(child) IS NOT NULL THEN
+                    RETURN;
+                END IF;
+
+                IF to_regclass(default_partition) IS NOT NULL THEN
+                    EXECUTE format(
+                        'SELECT EXISTS (SELECT 1 FROM %I WHERE timestamp >= %L AND timestamp < %L)',
+                        default_partition, month_start, month_end
+                    ) INTO has_rows;
+                END IF;
+
+                IF NOT has_rows THEN
+                    EXECUTE format(
+                        'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                        child, parent, month_start, month_end
+                    );
+                    RETURN;
+                END IF;
+
+                EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', child, parent);
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM %I WHERE timestamp >= %L AND timestamp < %L RETURNING *) '
+                    'INSERT INTO %I SELECT * FROM moved',
+                    default_partition, month_start, month_end, child
+                );
+                EXECUTE format(
+                    'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                    parent, child, month_start, month_end
+                );
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+        ],
+    ),
+]
+
+
+async def run_migrations(conn: AsyncConnection):
+    await conn.execute(text(
+        """
+        CREATE TABLE IF NOT EXISTS schema_revisions (
+            revision VARCHAR PRIMARY KEY,
+            applied_at TIMESTAMP NOT NULL DEFAULT now()
+        )
+        """
+    ))
+
+    result = await conn.execute(text("SELECT revision FROM schema_revisions"))
+    applied = {row[0] for row in result}
+
+    for revision, statements in MIGRATIONS:
+        if revision in applied:
+            continue
+
+        logger.info(f"[Database] Applying schema revision {revision}")
+        for statement in statements:
+            await conn.execute(text(statement))
+        await conn.execute(
+            text("INSERT INTO schema_revisions (revision) VALUES (:revision)"),
+            {"revision": revision}
+        )
@@ -0,0 +1,162 @@
+"""
+Mantenimiento de las tablas particionadas por mes (audit_trail, search_history).
+
+- Crea por adelantado las particiones del mes actual y de los siguientes, para
+  que los INSERT nunca caigan en la partición DEFAULT y crear un mes no tenga que
+  mover filas. Si aun así hay filas del mes en DEFAULT, `ensure_monthly_partition`
+  las mueve a la partición nueva.
+- Borra las particiones enteras que superan la retención (DROP TABLE es
+  instantáneo, a diferencia de un DELETE que deja el índice GIN hinchado). Las
+  filas caducadas que hayan quedado en DEFAULT se borran con DELETE.
+- Mantiene audit_daily_rollup, que conserva los conteos diarios aunque se
+  borre el detalle.
+
+La función SQL `ensure_monthly_partition` la crean las revisiones 0003 y 0004 de migrations.py.
+"""
+import os
+import re
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from providers.database.database import engine
+from providers.helpers import logger
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", 2))
+AUDIT_ROLLUP_ENABLED = os.getenv("AUDIT_ROLLUP_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# tabla -> meses de retención (0 = sin límite)
+RETENTION_MONTHS = {
+    "audit_trail": int(os.getenv("AUDIT_RETENTION_MONTHS", 6)),
+    "search_history": int(os.getenv("SEARCH_HISTORY_RETENTION_MONTHS", 12)),
+}
+
+_PARTITION_NAME = re.compile(r"_(\d{4})_(\d{2})$")
+
+
+def _add_months(month_start: date, months: int) -> date:
+    index = month_start.year * 12 + month_start.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+async def ensure_monthly_partitions(conn: AsyncConnection, table: str, months_ahead: int = PARTITION_MONTHS_AHEAD):
+    """
+    Crea la partición DEFAULT y las del mes actual y los `months_ahead` siguientes.
+    Cada mes va en su propio SAVEPOINT: si uno falla se registra y se sigue con el resto.
+    """
+    await conn.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+
+    current_month = date.today().replace(day=1)
+    for offset in range(months_ahead + 1):
+        month_start = _add_months(current_month, offset)
+        try:
+            async with conn.begin_nested():
+                await conn.execute(
+                    text("SELECT ensure_monthly_partition(:parent, :month_start)"),
+                    {"parent": table, "month_start": month_start}
+                )
+        except SQLAlchemyError as e:
+            logger.error(f"[Partitions] Could not create partition {table}_{month_start:%Y_%m}: {e}")
+
+
+async def refresh_audit_rollup(conn: AsyncConnection, start: date, end: date):
+    """Recalcula los conteos de audit_daily_rollup para los días en [start, end)."""
+    await conn.execute(
+        text(
+            """
+            INSERT INTO audit_daily_rollup (day, action, client_source, count)
+            SELECT timestamp::date, COALESCE(action, ''), client_source, count(*)
+            FROM audit_trail
+            WHERE timestamp >= :start AND timestamp < :end
+            GROUP BY 1, 2, 3
+            ON CONFLICT (day, action, client_source) DO UPDATE SET count = EXCLUDED.count
+            """
+        ),
+        {"start": datetime.combine(start, datetime.min.time()), "end": datetime.combine(end, datetime.min.time())}
+    )
+
+
+async def drop_expired_partitions(conn: AsyncConnection, table: str, retention_months: int) -> list:
+    if retention_months <= 0:
+        return []
+
+    cutoff = _add_months(date.today().replace(day=1), -retention_months)
+    result = await conn.execute(
+        text(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :table
+            """
+        ),
+        {"table": table}
+    )
+
+    # mes -> partición mensual
+    partitions = {}
+    default_partition = None
+    for (partition,) in result.all():
+        match = _PARTITION_NAME.search(partition)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = partition
+        elif partition == f"{table}_default":
+            default_partition = partition
+
+    # Meses caducados con filas en DEFAULT (normalmente ninguno: DEFAULT está vacía). Un mes
+    # solo tiene filas en DEFAULT si su partición no llegó a existir, así que el rollup de ese
+    # mes se puede recalcular entero desde DEFAULT
+    default_months = set()
+    if default_partition:
+        result = await conn.execute(
+            text(f"SELECT DISTINCT date_trunc('month', timestamp)::date FROM \"{default_partition}\" WHERE timestamp < :cutoff"),
+            {"cutoff": datetime.combine(cutoff, datetime.min.time())}
+        )
+        default_months = {row[0] for row in result}
+
+    dropped = []
+    for month_start in sorted(set(partitions) | default_months):
+        month_end = _add_months(month_start, 1)
+        if month_end > cutoff:
+            continue
+
+        if table == "audit_trail" and AUDIT_ROLLUP_ENABLED:
+            await refresh_audit_rollup(conn, month_start, month_end)
+        if month_start in default_months:
+            deleted = await conn.execute(
+                text(f'DELETE FROM "{default_partition}" WHERE timestamp >= :start AND timestamp < :end'),
+                {"start": datetime.combine(month_start, datetime.min.time()), "end": datetime.combine(month_end, datetime.min.time())}
+            )
+            dropped.append(f"{default_partition} ({month_start:%Y-%m}, {deleted.rowcount} rows)")
+        if month_start in partitions:
+            await conn.execute(text(f'DROP TABLE IF EXISTS "{partitions[month_start]}"'))
+            dropped.append(partitions[month_start])
+
+    if dropped:
+        logger.info(f"[Partitions] Dropped expired data of {table}: {', '.join(dropped)}")
+    return dropped
+
+
+async def run_partition_maintenance():
+    """
+    Crea particiones futuras, actualiza el rollup de ayer y hoy y aplica la retención.
+    Cada paso y cada tabla van en su propia transacción: un fallo no deshace los demás.
+    """
+    today = date.today()
+    steps = [(f"partitions of {table}", ensure_monthly_partitions, (table,)) for table in RETENTION_MONTHS]
+    if AUDIT_ROLLUP_ENABLED:
+        steps.append(("audit rollup", refresh_audit_rollup, (today - timedelta(days=1), today + timedelta(days=1))))
+    steps.extend(
+        (f"retention of {table}", drop_expired_partitions, (table, retention_months))
+        for table, retention_months in RETENTION_MONTHS.items()
+    )
+
+    for name, step, args in steps:
+        try:
+            async with engine.begin() as conn:
+                await step(conn, *args)
+        except SQLAlchemyError as e:
+            logger.error(f"[Partitions] Maintenance step '{name}' failed: {e}")
@@ -0,0 +1,216 @@
+"""
+Descarga del trabajo de CPU fuera del event loop.
+
+El mismo loop atiende Telegram y FastAPI: cualquier parseo pesado en él bloquea
+a todos los usuarios. Aquí hay dos pools:
+
+- `run_cpu_bound`: pool de procesos para trabajo Python puro que retiene el GIL
+  (parseo de CSV GTFS, protobuf GTFS-RT, codificación de los payloads de mapa, búsqueda
+  fuzzy). La función y sus argumentos deben poder serializarse con pickle (funciones de módulo).
+- `run_blocking`: pool de hilos para trabajo que libera el GIL (numpy, I/O) o
+  que no se puede serializar (lambdas, objetos grandes que no compensa copiar). En el
+  segundo caso el trabajo sigue compitiendo por el GIL con el event loop: el hilo solo
+  reparte el coste en intervalos cortos en lugar de un bloqueo largo, no lo elimina.
+
+`LoopLagMonitor` mide el retraso del event loop para comprobar el efecto.
+"""
+import asyncio
+import importlib
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Callable, Optional
+
+from .logger import logger
+
+CPU_PROCESS_WORKERS = int(os.getenv("CPU_PROCESS_WORKERS", min(2, os.cpu_count() or 1)))
+CPU_THREAD_WORKERS = int(os.getenv("CPU_THREAD_WORKERS", 4))
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", 0.5))
+LOOP_LAG_WARN_MS = float(os.getenv("LOOP_LAG_WARN_MS", 200))
+
+# Módulos con las funciones que se envían al pool de procesos. Cada proceso importa solo
+# estos al arrancar (main.py solo es el lanzador, importarlo como __mp_main__ no carga la aplicación)
+CPU_WORKER_MODULES = (
+    "providers.helpers.gtfs_store",
+    "providers.helpers.gtfs_realtime_index",
+    "providers.helpers.payload_codec",
+    "providers.helpers.fuzzy_search",
+)
+
+
+@dataclass
+class PoolStats:
+    calls: int = 0
+    failures: int = 0
+    in_flight: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def record(self, elapsed_ms: float):
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+
+@dataclass
+class OffloadMetrics:
+    process: PoolStats = field(default_factory=PoolStats)
+    thread: PoolStats = field(default_factory=PoolStats)
+    process_fallbacks: int = 0
+
+    def snapshot(self) -> dict:
+        data = {"process_fallbacks": self.process_fallbacks}
+        for name, stats in (("process", self.process), ("thread", self.thread)):
+            data[f"{name}_calls"] = stats.calls
+            data[f"{name}_failures"] = stats.failures
+            data[f"{name}_in_flight"] = stats.in_flight
+            data[f"{name}_avg_ms"] = stats.total_ms / stats.calls if stats.calls else 0.0
+            data[f"{name}_max_ms"] = stats.max_ms
+        return data
+
+
+offload_metrics = OffloadMetrics()
+_process_pool: Optional[ProcessPoolExecutor] = None
+_thread_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _init_worker(modules):
+    for name in modules:
+        importlib.import_module(name)
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        # spawn: el proceso principal tiene hilos (loop, listeners); fork con hilos no es seguro
+        _process_pool = ProcessPoolExecutor(
+            max_workers=CPU_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(CPU_WORKER_MODULES,),
+        )
+    return _process_pool
+
+
+def _get_thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=CPU_THREAD_WORKERS, thread_name_prefix="cpu-offload")
+    return _thread_pool
+
+
+async def _run(executor, stats: PoolStats, fn: Callable, *args, **kwargs) -> Any:
+    loop = asyncio.get_running_loop()
+    stats.in_flight += 1
+    start = time.perf_counter()
+    try:
+        return await loop.run_in_executor(executor, partial(fn, *args, **kwargs))
+    except Exception:
+        stats.failures += 1
+        raise
+    finally:
+        stats.in_flight -= 1
+        stats.record((time.perf_counter() - start) * 1000)
+
+
+async def run_blocking(fn: Callable, *args, **kwargs) -> Any:
+    """Ejecuta `fn` en el pool de hilos."""
+    return await _run(_get_thread_pool(), offload_metrics.thread, fn, *args, **kwargs)
+
+
+async def run_cpu_bound(fn: Callable, *args, **kwargs) -> Any:
+    """
+    Ejecuta `fn` en el pool de procesos. Si el pool no está disponible (proceso
+    hijo caído, entorno sin multiprocessing) se ejecuta en el pool de hilos.
+    """
+    global _process_pool
+    if CPU_PROCESS_WORKERS <= 0:
+        return await run_blocking(fn, *args, **kwargs)
+    try:
+        return await _run(_get_process_pool(), offload_metrics.process, fn, *args, **kwargs)
+    except (BrokenProcessPool, OSError) as e:
+        logger.warning(f"[cpu_offload] Process pool unavailable, running {getattr(fn, '__name__', fn)} in a thread: {e}")
+        offload_metrics.process_fallbacks += 1
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+        return await run_blocking(fn, *args, **kwargs)
+
+
+def shutdown_pools():
+    global _process_pool, _thread_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+    if _thread_pool is not None:
+        _thread_pool.shutdown(wait=False, cancel_futures=True)
+        _thread_pool = None
+
+
+class LoopLagMonitor:
+    """
+    Mide cuánto tarda el loop en despertar una tarea que duerme `interval` segundos.
+    Ese retraso es el tiempo que cualquier otra petición habría esperado.
+    """
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, warn_ms: float = LOOP_LAG_WARN_MS, window: int = 600):
+        self.interval = interval
+        self.warn_ms = warn_ms
+        self.samples = deque(maxlen=window)
+        self.max_ms = 0.0
+        self.slow_ticks = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"[{self.__class__.__name__}] Loop lag monitor started (every {self.interval}s, warn at {self.warn_ms:.0f} ms)")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (loop.time() - expected) * 1000)
+            self.samples.append(lag_ms)
+            self.max_ms = max(self.max_ms, lag_ms)
+            if lag_ms >= self.warn_ms:
+                self.slow_ticks += 1
+                logger.warning(f"[{self.__class__.__name__}] Event loop blocked for {lag_ms:.0f} ms")
+
+    def snapshot(self) -> dict:
+        ordered = sorted(self.samples)
+
+        def percentile(p: float) -> float:
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+        return {
+            "loop_lag_p50_ms": percentile(0.50),
+            "loop_lag_p99_ms": percentile(0.99),
+            "loop_lag_max_ms": self.max_ms,
+            "loop_lag_slow_ticks": self.slow_ticks,
+            "loop_lag_samples": len(ordered),
+        }
+
+
+loop_lag_monitor = LoopLagMonitor()
+
+
+def get_offload_metrics() -> dict:
+    metrics = loop_lag_monitor.snapshot()
+    metrics.update(offload_metrics.snapshot())
+    return metrics
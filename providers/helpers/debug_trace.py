@@ -0,0 +1,123 @@
+"""
+Trazas de depuración de las llamadas a proveedores.
+
+- Desactivadas por defecto (PROVIDER_TRACE_ENABLED=true para activarlas).
+- Muestreadas: solo se traza una fracción de las peticiones (PROVIDER_TRACE_SAMPLE_RATE).
+- Cada petición trazada tiene su request_id y todos sus eventos lo llevan.
+- Se escriben como JSON por líneas a través de un QueueHandler: el event loop solo
+  encola, la escritura en disco la hace el hilo del QueueListener.
+
+Uso:
+    with provider_trace("fgc.next_departures", station=station_name) as trace:
+        trace.event("stop_resolved", stop_id=stop_id)
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Iterator, Optional
+
+from providers.helpers.logger import log_dir
+
+TRACE_ENABLED = os.getenv("PROVIDER_TRACE_ENABLED", "false").lower() == "true"
+TRACE_SAMPLE_RATE = float(os.getenv("PROVIDER_TRACE_SAMPLE_RATE", 0.1))
+TRACE_FILE = os.path.join(log_dir, "provider_trace.log")
+# Límite de caracteres por valor: evita volcar DataFrames o feeds enteros
+MAX_FIELD_LENGTH = 500
+
+# request_id de la traza en curso; NOT_SAMPLED si la petición en curso no se muestreó
+NOT_SAMPLED = ""
+current_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("provider_trace_request_id", default=None)
+
+_trace_logger = logging.getLogger("BCN-Transit-Bot.trace")
+_trace_logger.setLevel(logging.DEBUG)
+_trace_logger.propagate = False
+_listener: Optional[QueueListener] = None
+
+
+def _ensure_listener():
+    global _listener
+    if _listener is not None:
+        return
+
+    file_handler = RotatingFileHandler(TRACE_FILE, maxBytes=10 * 1024 * 1024, backupCount=3, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+
+    trace_queue = queue.SimpleQueue()
+    _trace_logger.addHandler(QueueHandler(trace_queue))
+    _listener = QueueListener(trace_queue, file_handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def _compact(value):
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    text = str(value)
+    return text if len(text) <= MAX_FIELD_LENGTH else f"{text[:MAX_FIELD_LENGTH]}… ({len(text)} chars)"
+
+
+class TraceScope:
+    """Traza de una petición. Si no está muestreada, `event` no hace nada."""
+
+    def __init__(self, operation: str, request_id: Optional[str], enabled: bool):
+        self.operation = operation
+        self.request_id = request_id
+        self.enabled = enabled
+        self._start = time.perf_counter()
+
+    def event(self, name: str, **fields):
+        if not self.enabled:
+            return
+        record = {
+            "request_id": self.request_id,
+            "op": self.operation,
+            "event": name,
+            "t_ms": round((time.perf_counter() - self._start) * 1000, 2),
+        }
+        record.update({key: _compact(value) for key, value in fields.items()})
+        _trace_logger.debug(json.dumps(record, ensure_ascii=False, default=str))
+
+
+@contextmanager
+def provider_trace(operation: str, **fields) -> Iterator[TraceScope]:
+    """
+    Abre una traza para `operation`. Dentro de otra traza reutiliza su request_id
+    (y su decisión de muestreo), así que las llamadas anidadas quedan agrupadas.
+    """
+    if not TRACE_ENABLED:
+        yield TraceScope(operation, None, enabled=False)
+        return
+
+    parent_id = current_request_id.get()
+    if parent_id is None:
+        request_id = uuid.uuid4().hex[:12] if random.random() < TRACE_SAMPLE_RATE else NOT_SAMPLED
+    else:
+        request_id = parent_id
+
+    # Se publica también la decisión negativa: las llamadas anidadas no vuelven a sortear
+    token = current_request_id.set(request_id)
+    try:
+        if request_id == NOT_SAMPLED:
+            yield TraceScope(operation, None, enabled=False)
+            return
+
+        _ensure_listener()
+        scope = TraceScope(operation, request_id, enabled=True)
+        scope.event("start", **fields)
+        try:
+            yield scope
+        except Exception as e:
+            scope.event("error", error=repr(e))
+            raise
+        finally:
+            scope.event("end")
+    finally:
+        current_request_id.reset(token)
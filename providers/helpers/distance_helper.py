@@ -8,7 +8,9 @@ from domain.tram import TramStation
 from domain.rodalies import RodaliesStation
 from domain.bicing import BicingStation
 from domain.fgc import FgcStation
+from domain.transport_type import TransportType
 from .logger import logger
+from .station_catalogue import CATALOGUE_MODES, StationCatalogue
 
 class DistanceHelper:
     EARTH_RADIUS_KM = 6371.0  # Average Earth radius in kilometers
@@ -119,19 +121,7 @@ class DistanceHelper:
             ) if user_location else None
             if distance_km is not None and distance_km > max_distance_km:
                 continue
-            stops.append({
-                "type": "bicing",
-                "line_name": '',
-                "line_name_with_emoji": '',
-                "station_name": b.streetName,
-                "station_code": b.id,
-                "coordinates": (b.latitude, b.longitude),
-                "slots": b.slots,
-                "mechanical": b.mechanical_bikes,
-                "electrical": b.electrical_bikes,
-                "availability": b.disponibilidad,
-                "distance_km": distance_km
-            })
+            stops.append(DistanceHelper._bicing_stop(b, distance_km))
 
         for b in bus_stops:
             if not within_bbox(b.latitude, b.longitude):
@@ -155,3 +145,51 @@ class DistanceHelper:
         elapsed = time.perf_counter() - start
         logger.info(f"[DistanceHelper] build_stops_list ejecutado en {elapsed:.4f} s | {len(stops)} stops encontrados")
         return stops[:results_to_return]
+
+    @staticmethod
+    def build_nearby_stops_list(
+        catalogue: StationCatalogue,
+        bicing_stations: List[BicingStation],
+        user_location: Location,
+        results_to_return: int = 10,
+        max_distance_km: float = 1000
+    ) -> List[Dict]:
+        """
+        Igual que build_stops_list con ubicación, pero las estaciones estáticas salen del
+        catálogo columnar: las distancias se calculan sobre columnas enteras.
+        """
+        start = time.perf_counter()
+        bbox = DistanceHelper.bounding_box(user_location.latitude, user_location.longitude, max_distance_km)
+        min_lat, max_lat, min_lon, max_lon = bbox
+        lat, lon = user_location.latitude, user_location.longitude
+
+        # Mismo orden que build_stops_list para que el orden entre empates no cambie
+        stops = catalogue.nearby(lat, lon, max_distance_km, bbox, modes=CATALOGUE_MODES[:-1])
+        for b in bicing_stations:
+            if not (min_lat <= b.latitude <= max_lat and min_lon <= b.longitude <= max_lon):
+                continue
+            distance_km = DistanceHelper.haversine_distance(b.latitude, b.longitude, lat, lon)
+            if distance_km <= max_distance_km:
+                stops.append(DistanceHelper._bicing_stop(b, distance_km))
+        stops.extend(catalogue.nearby(lat, lon, max_distance_km, bbox, modes=(TransportType.BUS.value,)))
+
+        stops.sort(key=lambda x: x["distance_km"])
+        elapsed = time.perf_counter() - start
+        logger.info(f"[DistanceHelper] build_nearby_stops_list ejecutado en {elapsed:.4f} s | {len(stops)} stops encontrados")
+        return stops[:results_to_return]
+
+    @staticmethod
+    def _bicing_stop(b: BicingStation, distance_km: Optional[float]) -> Dict:
+        return {
+            "type": "bicing",
+            "line_name": '',
+            "line_name_with_emoji": '',
+            "station_name": b.streetName,
+            "station_code": b.id,
+            "coordinates": (b.latitude, b.longitude),
+            "slots": b.slots,
+            "mechanical": b.mechanical_bikes,
+            "electrical": b.electrical_bikes,
+            "availability": b.disponibilidad,
+            "distance_km": distance_km
+        }
@@ -0,0 +1,46 @@
+"""
+Búsqueda aproximada de nombres de estación, pensada para el pool de procesos
+(`run_cpu_bound`): recibe y devuelve solo strings e índices, que se serializan con
+pickle sin copiar los objetos de dominio.
+"""
+from typing import List
+
+from rapidfuzz import fuzz, process
+
+from .html_helper import HtmlHelper
+
+
+def fuzzy_match_indices(query: str, names: List[str], threshold: float) -> List[int]:
+    """
+    Índices de `names` que coinciden con `query`: primero los que la contienen
+    (sin distinguir mayúsculas), luego los que la contienen sin acentos ni símbolos
+    y por último los mejores resultados fuzzy con puntuación >= `threshold`.
+    """
+    query_lower = query.lower()
+
+    # --- Exact matches (substring, case-insensitive) ---
+    exact_matches = [i for i, name in enumerate(names) if query_lower in name.lower()]
+
+    # --- Matches without special chars ---
+    matched = set(exact_matches)
+    normalized_query = HtmlHelper.normalize_text(query_lower)
+    normalized_matches = [
+        i for i, name in enumerate(names)
+        if i not in matched and normalized_query in HtmlHelper.normalize_text(name.lower())
+    ]
+
+    # --- Prepare fuzzy search excluding exact matches ---
+    matched.update(normalized_matches)
+    index_by_name = {name: i for i, name in enumerate(names) if i not in matched}
+
+    # --- Fuzzy matches ---
+    fuzzy_matches = process.extract(
+        query=query,
+        choices=index_by_name.keys(),
+        scorer=fuzz.WRatio
+    )
+
+    fuzzy_filtered = [index_by_name[name] for name, score, _ in fuzzy_matches if score >= threshold]
+
+    # --- Combine exact + normalized + fuzzy ---
+    return exact_matches + normalized_matches + fuzzy_filtered
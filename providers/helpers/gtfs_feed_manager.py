@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from providers.helpers import gtfs_store
+from providers.helpers.gtfs_timetable import GtfsTimetable
+from providers.helpers import logger
+from providers.helpers.cpu_offload import run_blocking, run_cpu_bound
+
+# fetch(url, request_headers) -> (status, text | None, response_headers)
+FetchFn = Callable[[str, Dict[str, str]], Awaitable[Tuple[int, Optional[str], Dict[str, str]]]]
+# list_urls() -> {"routes": url, "stops": url, ...}
+ListUrlsFn = Callable[[], Awaitable[Dict[str, str]]]
+
+
+@dataclass
+class GtfsFileState:
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    sha256: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class GtfsSnapshot:
+    """Feed compilado e inmutable: se sustituye entero, nunca se modifica."""
+    frames: Dict[str, Optional[pd.DataFrame]]
+    timetable: GtfsTimetable
+    feed_hash: str
+    files: Dict[str, GtfsFileState] = field(default_factory=dict)
+
+
+class GtfsFeedManager:
+    """
+    Mantiene actualizado un feed GTFS estático.
+
+    - Descarga los ficheros en paralelo con peticiones condicionales
+      (If-None-Match / If-Modified-Since): un 304 no transfiere nada.
+    - Un fichero descargado cuyo hash no cambia no se vuelve a parsear.
+    - Los CSV se parsean en el pool de procesos (cpu_offload).
+    - Solo si cambia el hash del feed se recompila el horario en un hilo y se
+      publica con una única asignación (`self.snapshot`), sin bloquear a quien lee.
+    - Persiste la forma compacta y los validadores en disco (gtfs_store), así
+      que tras un reinicio se sirve la caché y se revalida en segundo plano.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        list_urls: ListUrlsFn,
+        fetch: FetchFn,
+        required_files: List[str],
+        optional_files: List[str],
+        cache_dir: str,
+        refresh_interval: int,
+    ):
+        self.name = name
+        self._list_urls = list_urls
+        self._fetch = fetch
+        self.required_files = required_files
+        self.optional_files = optional_files
+        self.cache_dir = cache_dir
+        self.refresh_interval = refresh_interval
+
+        self.snapshot: Optional[GtfsSnapshot] = None
+        self._load_lock = asyncio.Lock()
+        self._refresh_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.logger = logger.getChild(f"{self.__class__.__name__}[{name}]")
+
+    async def get_snapshot(self) -> GtfsSnapshot:
+        snapshot = self.snapshot
+        if snapshot is not None:
+            return snapshot
+
+        async with self._load_lock:
+            if self.snapshot is None:
+                loaded_from_disk = await self._load_from_disk()
+                if not loaded_from_disk:
+                    await self.refresh()
+                # La caché de disco se revalida ya; un feed recién descargado, tras el intervalo
+                self._start_background_refresh(refresh_now=loaded_from_disk)
+        return self.snapshot
+
+    async def _load_from_disk(self) -> bool:
+        cached = await run_blocking(gtfs_store.load_frames, self.cache_dir)
+        if cached is None:
+            return False
+
+        frames, meta = cached
+        files = {name: GtfsFileState(**state) for name, state in meta.get("files", {}).items()}
+        timetable = await run_blocking(self._build_timetable, frames)
+        self.snapshot = GtfsSnapshot(frames, timetable, meta.get("feed_hash", ""), files)
+        self.logger.info(f"GTFS loaded from disk cache {self.cache_dir} (hash {self.snapshot.feed_hash[:12]})")
+        return True
+
+    def _start_background_refresh(self, refresh_now: bool):
+        if self._refresh_task is None and self.refresh_interval > 0:
+            self._refresh_task = asyncio.create_task(self._refresh_loop(refresh_now))
+
+    async def _refresh_loop(self, refresh_now: bool):
+        if not refresh_now:
+            await asyncio.sleep(self.refresh_interval)
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.warning(f"GTFS refresh failed, keeping current feed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def stop(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def refresh(self) -> bool:
+        """Revalida el feed. Devuelve True si se ha publicado un snapshot nuevo."""
+        async with self._refresh_lock:
+            current = self.snapshot
+            previous_files = current.files if current else {}
+            previous_frames = current.frames if current else {}
+
+            urls = await self._list_urls()
+            missing = [name for name in self.required_files if name not in urls]
+            if missing:
+                raise ValueError(f"GTFS files not published: {missing}")
+
+            names = self.required_files + [name for name in self.optional_files if name in urls]
+            results = await asyncio.gather(
+                *[self._fetch_file(name, urls[name], previous_files.get(name)) for name in names],
+                return_exceptions=True
+            )
+
+            frames: Dict[str, Optional[pd.DataFrame]] = {name: None for name in self.required_files + self.optional_files}
+            files: Dict[str, GtfsFileState] = {}
+            changed = []
+            for name, result in zip(names, results):
+                if isinstance(result, Exception):
+                    if name in self.required_files and previous_frames.get(name) is None:
+                        raise result
+                    self.logger.warning(f"Could not fetch {name}.txt, keeping previous version: {result}")
+                    frames[name] = previous_frames.get(name)
+                    if name in previous_files:
+                        files[name] = previous_files[name]
+                    continue
+
+                state, content = result
+                files[name] = state
+                previous_state = previous_files.get(name)
+                if content is None or (previous_state and previous_state.sha256 == state.sha256 and previous_frames.get(name) is not None):
+                    frames[name] = previous_frames.get(name)
+                else:
+                    frames[name] = await run_cpu_bound(gtfs_store.read_gtfs_csv, name, content)
+                    changed.append(name)
+
+            feed_hash = hashlib.sha256(
+                "".join(f"{name}:{files[name].sha256}" for name in sorted(files)).encode()
+            ).hexdigest()
+
+            if current is not None and feed_hash == current.feed_hash:
+                # Puede que solo hayan cambiado los validadores: se guardan sin recompilar
+                if files != current.files:
+                    self.snapshot = GtfsSnapshot(current.frames, current.timetable, feed_hash, files)
+                self.logger.info("GTFS feed unchanged")
+                return False
+
+            frames = gtfs_store.compact_frames(frames)
+            timetable = await run_blocking(self._build_timetable, frames)
+            self.snapshot = GtfsSnapshot(frames, timetable, feed_hash, files)
+            self.logger.info(f"GTFS feed updated (hash {feed_hash[:12]}, changed files: {changed or 'none'})")
+
+            meta = {
+                "feed_hash": feed_hash,
+                "files": {name: state.__dict__ for name, state in files.items()},
+            }
+            try:
+                await run_blocking(gtfs_store.save_frames, self.cache_dir, frames, meta)
+            except Exception as e:
+                self.logger.warning(f"Could not persist GTFS cache: {e}")
+            return True
+
+    async def _fetch_file(self, name: str, url: str, previous: Optional[GtfsFileState]) -> Tuple[GtfsFileState, Optional[str]]:
+        headers = {}
+        if previous is not None:
+            if previous.etag:
+                headers["If-None-Match"] = previous.etag
+            if previous.last_modified:
+                headers["If-Modified-Since"] = previous.last_modified
+
+        status, text, response_headers = await self._fetch(url, headers)
+        if status == 304 and previous is not None:
+            return previous, None
+
+        return GtfsFileState(
+            etag=response_headers.get("ETag"),
+            last_modified=response_headers.get("Last-Modified"),
+            sha256=hashlib.sha256(text.encode("utf-8")).hexdigest(),
+        ), text
+
+    @staticmethod
+    def _build_timetable(frames: Dict[str, Optional[pd.DataFrame]]) -> GtfsTimetable:
+        return GtfsTimetable.build(
+            frames["routes"], frames["stops"], frames["trips"], frames["stop_times"],
+            frames.get("calendar"), frames.get("calendar_dates")
+        )
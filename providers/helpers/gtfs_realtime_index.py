@@ -0,0 +1,155 @@
+import asyncio
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from google.transit import gtfs_realtime_pb2
+
+from providers.helpers import logger
+from providers.helpers.cpu_offload import run_cpu_bound
+
+# fetch() -> bytes del FeedMessage
+FetchFeedFn = Callable[[], Awaitable[bytes]]
+
+
+@dataclass(frozen=True)
+class RealtimeStopTime:
+    trip_id: str
+    direction_id: int
+    last_stop_id: str
+    departure_ts: int
+    delay: Optional[int]
+
+
+class RealtimeStopIndex:
+    """
+    Índice inmutable de un FeedMessage: stop_id -> salidas ordenadas por hora.
+    `upcoming` hace una búsqueda binaria en lugar de recorrer el feed entero.
+    """
+
+    def __init__(self, feed_timestamp: int, by_stop: Dict[str, List[RealtimeStopTime]]):
+        self.feed_timestamp = feed_timestamp
+        self._updates = by_stop
+        self._times = {stop_id: [u.departure_ts for u in updates] for stop_id, updates in by_stop.items()}
+
+    @classmethod
+    def from_feed(cls, data: bytes) -> "RealtimeStopIndex":
+        feed = gtfs_realtime_pb2.FeedMessage()
+        feed.ParseFromString(data)
+
+        by_stop: Dict[str, List[RealtimeStopTime]] = {}
+        for entity in feed.entity:
+            if not entity.HasField("trip_update"):
+                continue
+            trip_update = entity.trip_update
+            stop_time_updates = trip_update.stop_time_update
+            if not stop_time_updates:
+                continue
+
+            trip_id = trip_update.trip.trip_id
+            direction_id = trip_update.trip.direction_id
+            last_stop_id = stop_time_updates[-1].stop_id
+            for stu in stop_time_updates:
+                if not stu.HasField("departure") or not stu.departure.HasField("time"):
+                    continue
+                by_stop.setdefault(stu.stop_id, []).append(RealtimeStopTime(
+                    trip_id=trip_id,
+                    direction_id=direction_id,
+                    last_stop_id=last_stop_id,
+                    departure_ts=stu.departure.time,
+                    delay=stu.departure.delay if stu.departure.HasField("delay") else None,
+                ))
+
+        for updates in by_stop.values():
+            updates.sort(key=lambda u: u.departure_ts)
+        return cls(feed.header.timestamp, by_stop)
+
+    @property
+    def stop_count(self) -> int:
+        return len(self._updates)
+
+    def upcoming(self, stop_id: str, now_ts: float) -> List[RealtimeStopTime]:
+        times = self._times.get(stop_id)
+        if not times:
+            return []
+        return self._updates[stop_id][bisect_left(times, now_ts):]
+
+
+class GtfsRealtimeIngester:
+    """
+    Sondea un feed GTFS-RT una vez por intervalo, compartido por todas las consultas.
+
+    - Si la cabecera del feed trae el mismo timestamp (o uno anterior) no se reindexa.
+    - El parseo y la indexación se hacen en el pool de procesos y el índice se publica con una
+      única asignación (`self.index`).
+    - Si el timestamp de cabecera del feed tiene más de `max_age` segundos se deja de
+      servir (aunque el servidor siga respondiendo con el mismo feed congelado): mejor caer a horarios planificados que mostrar tiempo real caducado.
+    """
+
+    def __init__(self, name: str, fetch: FetchFeedFn, poll_interval: int, max_age: int):
+        self.name = name
+        self._fetch = fetch
+        self.poll_interval = poll_interval
+        self.max_age = max_age
+
+        self.index: Optional[RealtimeStopIndex] = None
+        self._indexed_at: float = 0
+        self._first_poll = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.logger = logger.getChild(f"{self.__class__.__name__}[{name}]")
+
+    async def get_index(self) -> Optional[RealtimeStopIndex]:
+        """Índice vigente o None si no hay datos frescos. Solo la primera llamada espera al feed."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._poll_loop())
+        if not self._first_poll.is_set():
+            try:
+                await asyncio.wait_for(self._first_poll.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                return None
+
+        index = self.index
+        if index is None or time.time() - self._updated_at(index) > self.max_age:
+            return None
+        return index
+
+    def _updated_at(self, index: RealtimeStopIndex) -> float:
+        """Antigüedad según el propio feed (timestamp de cabecera); si no lo trae, cuándo se indexó."""
+        return index.feed_timestamp or self._indexed_at
+
+    async def _poll_loop(self):
+        while True:
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.warning(f"GTFS-RT poll failed, keeping current index: {e}")
+            finally:
+                self._first_poll.set()
+            await asyncio.sleep(self.poll_interval)
+
+    async def poll(self) -> bool:
+        """Descarga el feed y reindexa si es más nuevo. Devuelve True si se publicó un índice nuevo."""
+        data = await self._fetch()
+        index = await run_cpu_bound(RealtimeStopIndex.from_feed, data)
+
+        current = self.index
+        if current is not None and index.feed_timestamp and index.feed_timestamp <= current.feed_timestamp:
+            self.logger.debug(f"GTFS-RT feed not updated (header timestamp {index.feed_timestamp})")
+            return False
+
+        self.index = index
+        self._indexed_at = time.time()
+        self.logger.debug(f"GTFS-RT index updated: {index.stop_count} stops (header timestamp {index.feed_timestamp})")
+        return True
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,150 @@
+"""
+Almacenamiento compacto de las tablas GTFS estáticas.
+
+- Solo se leen las columnas que se usan.
+- Los ids (trip_id, stop_id, route_id, service_id) se internan como categóricos
+  con categorías compartidas entre tablas: cada fila guarda un código entero.
+- Las horas "HH:MM:SS" se convierten a segundos int32 al cargar (-1 si son inválidas).
+- La forma compacta se guarda en disco como un .npy por columna (sin pickle) y se
+  carga con mmap, de modo que un reinicio no vuelve a parsear los CSV.
+"""
+import json
+import os
+import shutil
+import time
+from io import StringIO
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from providers.helpers.gtfs_timetable import parse_gtfs_time
+
+# tabla -> columnas necesarias y su dtype de lectura
+GTFS_COLUMNS = {
+    "routes": {"route_id": "category", "route_short_name": "category"},
+    "stops": {"stop_id": "category", "stop_name": "category", "stop_lat": "float64", "stop_lon": "float64"},
+    "trips": {"route_id": "category", "service_id": "category", "trip_id": "category", "direction_id": "int8"},
+    "stop_times": {"trip_id": "category", "stop_id": "category", "stop_sequence": "uint16", "departure_time": "category"},
+    "calendar": {
+        "service_id": "category",
+        "monday": "int8", "tuesday": "int8", "wednesday": "int8", "thursday": "int8",
+        "friday": "int8", "saturday": "int8", "sunday": "int8",
+        "start_date": "int32", "end_date": "int32",
+    },
+    "calendar_dates": {"service_id": "category", "date": "int32", "exception_type": "int8"},
+}
+
+# Columnas que comparten categorías entre tablas
+SHARED_IDS = {
+    "trip_id": ["trips", "stop_times"],
+    "stop_id": ["stops", "stop_times"],
+    "route_id": ["routes", "trips"],
+    "service_id": ["trips", "calendar", "calendar_dates"],
+}
+
+MANIFEST = "manifest.json"
+
+
+def read_gtfs_csv(name: str, content: str) -> pd.DataFrame:
+    columns = GTFS_COLUMNS[name]
+    df = pd.read_csv(
+        StringIO(content),
+        usecols=lambda c: c in columns,
+        dtype={c: "category" for c, dtype in columns.items() if dtype == "category"},
+    )
+    for column, dtype in columns.items():
+        if column not in df.columns or dtype == "category":
+            continue
+        if dtype.startswith(("int", "uint")):
+            df[column] = pd.to_numeric(df[column], errors="coerce").fillna(0).astype(dtype)
+        else:
+            df[column] = df[column].astype(dtype)
+
+    if name == "stop_times" and "departure_time" in df.columns:
+        # Se parsean las categorías (unos pocos miles de horas distintas), no cada fila
+        categories = df["departure_time"].cat.categories
+        secs_by_code = parse_gtfs_time(pd.Series(categories)).fillna(-1).astype(np.int32).to_numpy()
+        codes = df["departure_time"].cat.codes.to_numpy()
+        df["departure_secs"] = np.where(codes >= 0, secs_by_code[codes], -1).astype(np.int32)
+        df = df.drop(columns=["departure_time"])
+
+    return df
+
+
+def compact_frames(frames: Dict[str, Optional[pd.DataFrame]]) -> Dict[str, Optional[pd.DataFrame]]:
+    """
+    Unifica las categorías de los ids entre tablas para que los códigos sean comparables.
+    Trabaja sobre copias superficiales: las tablas recibidas pueden pertenecer a un feed publicado.
+    """
+    frames = {name: (df.copy(deep=False) if df is not None else None) for name, df in frames.items()}
+    for column, tables in SHARED_IDS.items():
+        present = [frames[t] for t in tables if frames.get(t) is not None and column in frames[t].columns]
+        if len(present) < 2:
+            continue
+        categories = present[0][column].cat.categories
+        for df in present[1:]:
+            categories = categories.union(df[column].cat.categories)
+        shared = pd.CategoricalDtype(categories)
+        for df in present:
+            df[column] = df[column].astype(shared)
+    return frames
+
+
+def save_frames(directory: str, frames: Dict[str, Optional[pd.DataFrame]], meta: dict = None):
+    """Escribe en un directorio temporal y lo renombra: nunca queda una caché a medias."""
+    tmp_dir = f"{directory}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    manifest = {"created_at": time.time(), "meta": meta or {}, "frames": {}}
+    for name, df in frames.items():
+        if df is None:
+            continue
+        columns = {}
+        for column in df.columns:
+            series = df[column]
+            base = f"{name}.{column}"
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                np.save(os.path.join(tmp_dir, f"{base}.codes.npy"), series.cat.codes.to_numpy())
+                np.save(os.path.join(tmp_dir, f"{base}.categories.npy"), series.cat.categories.astype(str).to_numpy(dtype=str))
+                columns[column] = "category"
+            else:
+                np.save(os.path.join(tmp_dir, f"{base}.npy"), series.to_numpy())
+                columns[column] = "array"
+        manifest["frames"][name] = columns
+
+    with open(os.path.join(tmp_dir, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+
+
+def load_frames(directory: str, max_age: Optional[float] = None) -> Optional[tuple]:
+    """Devuelve (frames, meta) o None si no hay caché, está caducada o corrupta."""
+    manifest_path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return None
+
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if max_age is not None and time.time() - manifest["created_at"] > max_age:
+            return None
+
+        frames: Dict[str, Optional[pd.DataFrame]] = {name: None for name in GTFS_COLUMNS}
+        for name, columns in manifest["frames"].items():
+            data = {}
+            for column, kind in columns.items():
+                base = os.path.join(directory, f"{name}.{column}")
+                if kind == "category":
+                    codes = np.load(f"{base}.codes.npy", mmap_mode="r")
+                    categories = np.load(f"{base}.categories.npy")
+                    data[column] = pd.Categorical.from_codes(codes, categories=categories)
+                else:
+                    data[column] = np.load(f"{base}.npy", mmap_mode="r")
+            frames[name] = pd.DataFrame(data, copy=False)
+        return frames, manifest.get("meta", {})
+    except Exception:
+        return None
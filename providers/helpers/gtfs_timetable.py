@@ -0,0 +1,421 @@
+import math
+from dataclasses import dataclass
+from datetime import date, datetime, tzinfo
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def parse_gtfs_time(times: pd.Series) -> pd.Series:
+    """
+    "HH:MM:SS" -> segundos desde el inicio del día de servicio (puede pasar de 24h).
+    Los valores corruptos quedan como NaN.
+    """
+    parts = times.astype(str).str.split(":", expand=True)
+    if parts.shape[1] < 3:
+        return pd.Series(np.nan, index=times.index)
+    h = pd.to_numeric(parts[0], errors="coerce")
+    m = pd.to_numeric(parts[1], errors="coerce")
+    s = pd.to_numeric(parts[2], errors="coerce")
+    return h * 3600 + m * 60 + s
+
+
+def service_day_start(day: date, tz: tzinfo) -> float:
+    """
+    Timestamp del origen de las horas GTFS del día de servicio `day`: "mediodía menos 12h",
+    no la medianoche local. Así los días de cambio de hora una salida "08:00:00" sigue
+    siendo las 08:00 de reloj.
+    """
+    return datetime(day.year, day.month, day.day, 12, tzinfo=tz).timestamp() - 12 * 3600
+
+
+@dataclass
+class ScheduledDeparture:
+    trip_id: str
+    trip_instance_id: str
+    direction_name: str
+    service_date: date
+    departure_secs: int
+    departure_ts: float
+
+
+class RouteStop(NamedTuple):
+    stop_id: str
+    stop_name: str
+    stop_lat: float
+    stop_lon: float
+    order: int
+
+
+class ServiceCalendar:
+    """
+    calendar.txt + calendar_dates.txt compilados sobre los service_id del feed.
+
+    `active_services(d)` devuelve un array booleano indexado por código de
+    servicio (el bitset del día), cacheado por fecha. Sin calendario en el feed
+    todos los servicios se consideran activos, como antes.
+    """
+
+    MAX_CACHED_DATES = 8
+
+    def __init__(
+        self,
+        service_count: int,
+        in_calendar: np.ndarray,
+        weekday_flags: np.ndarray,
+        start_dates: np.ndarray,
+        end_dates: np.ndarray,
+        exceptions: Dict[int, Tuple[np.ndarray, np.ndarray]],
+        has_data: bool,
+    ):
+        self.service_count = service_count
+        self.in_calendar = in_calendar
+        self.weekday_flags = weekday_flags
+        self.start_dates = start_dates
+        self.end_dates = end_dates
+        self.exceptions = exceptions
+        self.has_data = has_data
+        self._cache: Dict[date, np.ndarray] = {}
+
+    @classmethod
+    def build(cls, service_ids: List[str], calendar: Optional[pd.DataFrame], calendar_dates: Optional[pd.DataFrame]) -> "ServiceCalendar":
+        count = len(service_ids)
+        code_by_service = {service_id: code for code, service_id in enumerate(service_ids)}
+
+        in_calendar = np.zeros(count, dtype=bool)
+        weekday_flags = np.zeros((count, 7), dtype=bool)
+        start_dates = np.zeros(count, dtype=np.int32)
+        end_dates = np.zeros(count, dtype=np.int32)
+
+        has_calendar = calendar is not None and not calendar.empty
+        if has_calendar:
+            codes = calendar["service_id"].astype(str).map(code_by_service)
+            known = codes.notna().to_numpy()
+            rows = calendar[known]
+            codes = codes[known].astype(int).to_numpy()
+            in_calendar[codes] = True
+            for weekday, column in enumerate(["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]):
+                weekday_flags[codes, weekday] = rows[column].fillna(0).astype(int).to_numpy() == 1
+            start_dates[codes] = rows["start_date"].astype(int).to_numpy()
+            end_dates[codes] = rows["end_date"].astype(int).to_numpy()
+
+        exceptions: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        has_dates = calendar_dates is not None and not calendar_dates.empty
+        if has_dates:
+            dates = calendar_dates.assign(code=calendar_dates["service_id"].astype(str).map(code_by_service))
+            dates = dates.dropna(subset=["code"])
+            for day, group in dates.groupby(dates["date"].astype(int)):
+                exception_type = group["exception_type"].astype(int)
+                exceptions[int(day)] = (
+                    group.loc[exception_type == 1, "code"].astype(np.int32).to_numpy(),
+                    group.loc[exception_type == 2, "code"].astype(np.int32).to_numpy(),
+                )
+
+        return cls(count, in_calendar, weekday_flags, start_dates, end_dates, exceptions, has_calendar or has_dates)
+
+    def active_services(self, day: date) -> np.ndarray:
+        cached = self._cache.get(day)
+        if cached is not None:
+            return cached
+
+        if not self.has_data:
+            active = np.ones(self.service_count, dtype=bool)
+        else:
+            key = day.year * 10000 + day.month * 100 + day.day
+            active = (
+                self.in_calendar
+                & self.weekday_flags[:, day.weekday()]
+                & (self.start_dates <= key)
+                & (self.end_dates >= key)
+            )
+            added, removed = self.exceptions.get(key, (None, None))
+            if added is not None:
+                active[added] = True
+                active[removed] = False
+
+        if len(self._cache) >= self.MAX_CACHED_DATES:
+            self._cache.clear()
+        self._cache[day] = active
+        return active
+
+
+class GtfsTimetable:
+    """
+    Índice precompilado del GTFS estático de FGC.
+
+    Se construye una vez por descarga del feed. Para cada (stop_id, route_id)
+    guarda las salidas ordenadas en segundos desde el inicio del día de servicio
+    (int32), de modo que las próximas salidas son un `searchsorted` y un slice.
+    También precalcula trip -> última parada, trip -> nombre de dirección y
+    trip -> código de servicio, que se cruza con el bitset de `ServiceCalendar`
+    para quedarse solo con los trips que circulan ese día.
+
+    `route_stops` guarda la secuencia canónica de paradas de cada ruta (la del
+    primer trip del feed), de modo que las estaciones de todas las líneas salen
+    de una sola pasada al compilar.
+    """
+
+    def __init__(
+        self,
+        departure_secs: np.ndarray,
+        trip_codes: np.ndarray,
+        slices: Dict[Tuple[str, str], Tuple[int, int]],
+        directions_per_slice: Dict[Tuple[str, str], int],
+        trip_ids: List[str],
+        trip_instance_ids: List[str],
+        trip_direction_names: List[str],
+        trip_last_stop: Dict[str, str],
+        trip_ids_by_route: Dict[str, frozenset],
+        stop_id_by_name: Dict[str, str],
+        stop_name_by_id: Dict[str, str],
+        route_id_by_short_name: Dict[str, str],
+        trip_service_codes: np.ndarray,
+        calendar: ServiceCalendar,
+        route_stops: Dict[str, List[RouteStop]],
+    ):
+        self.departure_secs = departure_secs
+        self.trip_codes = trip_codes
+        self.slices = slices
+        self.directions_per_slice = directions_per_slice
+        self.trip_ids = trip_ids
+        self.trip_instance_ids = trip_instance_ids
+        self.trip_direction_names = trip_direction_names
+        self.trip_last_stop = trip_last_stop
+        self.trip_ids_by_route = trip_ids_by_route
+        self.stop_id_by_name = stop_id_by_name
+        self.stop_name_by_id = stop_name_by_id
+        self.route_id_by_short_name = route_id_by_short_name
+        self.trip_service_codes = trip_service_codes
+        self.calendar = calendar
+        self.route_stops = route_stops
+
+    @classmethod
+    def build(
+        cls,
+        routes: pd.DataFrame,
+        stops: pd.DataFrame,
+        trips: pd.DataFrame,
+        stop_times: pd.DataFrame,
+        calendar: Optional[pd.DataFrame] = None,
+        calendar_dates: Optional[pd.DataFrame] = None,
+    ) -> "GtfsTimetable":
+        # Lookups de nombres (se queda con la primera aparición, como hacía iloc[0])
+        stops_named = stops.dropna(subset=["stop_id", "stop_name"]).drop_duplicates("stop_id")
+        stop_name_by_id = dict(zip(stops_named["stop_id"].astype(str), stops_named["stop_name"]))
+        stop_id_by_name = {}
+        for stop_id, stop_name in zip(stops_named["stop_id"].astype(str), stops_named["stop_name"]):
+            stop_id_by_name.setdefault(str(stop_name).lower(), stop_id)
+
+        route_id_by_short_name = {}
+        for short_name, route_id in zip(routes["route_short_name"].astype(str), routes["route_id"].astype(str)):
+            route_id_by_short_name.setdefault(short_name, route_id)
+
+        trips = trips.copy()
+        trips["trip_id"] = trips["trip_id"].astype(str)
+        trips["route_id"] = trips["route_id"].astype(str)
+        if "direction_id" not in trips.columns:
+            trips["direction_id"] = 0
+        if "service_id" not in trips.columns:
+            trips["service_id"] = ""
+        trips["service_id"] = trips["service_id"].astype(str)
+        trip_ids_by_route = {
+            route_id: frozenset(group)
+            for route_id, group in trips.groupby("route_id")["trip_id"]
+        }
+
+        route_stops = cls._build_route_stops(stops, trips, stop_times)
+
+        # gtfs_store ya entrega las horas en segundos; con CSV crudos se parsean aquí
+        time_column = "departure_secs" if "departure_secs" in stop_times.columns else "departure_time"
+        st = stop_times[["trip_id", "stop_id", "stop_sequence", time_column]].copy()
+        st["trip_id"] = st["trip_id"].astype(str)
+        st["stop_id"] = st["stop_id"].astype(str)
+
+        # trip -> última parada (mayor stop_sequence) y nombre de dirección
+        last_rows = st.loc[st.groupby("trip_id")["stop_sequence"].idxmax(), ["trip_id", "stop_id"]]
+        trip_last_stop = dict(zip(last_rows["trip_id"], last_rows["stop_id"]))
+
+        direction_id_by_trip = dict(zip(trips["trip_id"], trips["direction_id"]))
+
+        service_codes, service_index = pd.factorize(trips["service_id"])
+        service_code_by_trip = dict(zip(trips["trip_id"], service_codes))
+        service_calendar = ServiceCalendar.build([str(s) for s in service_index], calendar, calendar_dates)
+
+        if time_column == "departure_secs":
+            st["secs"] = st["departure_secs"].where(st["departure_secs"] >= 0)
+        else:
+            st["secs"] = parse_gtfs_time(st["departure_time"])
+        st = st.dropna(subset=["secs"])
+        st = st.merge(trips[["trip_id", "route_id"]], on="trip_id", how="inner")
+        st = st.sort_values(["stop_id", "route_id", "secs"], kind="mergesort").reset_index(drop=True)
+
+        trip_codes, trip_index = pd.factorize(st["trip_id"])
+        trip_ids = [str(t) for t in trip_index]
+        trip_instance_ids = [t.split("|")[1] if "|" in t else t for t in trip_ids]
+        trip_service_codes = np.array([service_code_by_trip[t] for t in trip_ids], dtype=np.int32)
+        trip_direction_names = []
+        for trip_id in trip_ids:
+            last_stop_name = stop_name_by_id.get(trip_last_stop.get(trip_id))
+            trip_direction_names.append(
+                last_stop_name if last_stop_name is not None else f"dir_{direction_id_by_trip.get(trip_id, 0)}"
+            )
+
+        slices = {}
+        directions_per_slice = {}
+        for key, positions in st.groupby(["stop_id", "route_id"], sort=False).indices.items():
+            start, end = int(positions[0]), int(positions[-1]) + 1
+            slices[key] = (start, end)
+            directions_per_slice[key] = len({trip_direction_names[c] for c in trip_codes[start:end]})
+
+        return cls(
+            departure_secs=st["secs"].to_numpy(dtype=np.int32),
+            trip_codes=trip_codes.astype(np.int32),
+            slices=slices,
+            directions_per_slice=directions_per_slice,
+            trip_ids=trip_ids,
+            trip_instance_ids=trip_instance_ids,
+            trip_direction_names=trip_direction_names,
+            trip_last_stop=trip_last_stop,
+            trip_ids_by_route=trip_ids_by_route,
+            stop_id_by_name=stop_id_by_name,
+            stop_name_by_id=stop_name_by_id,
+            route_id_by_short_name=route_id_by_short_name,
+            trip_service_codes=trip_service_codes,
+            calendar=service_calendar,
+            route_stops=route_stops,
+        )
+
+    @staticmethod
+    def _build_route_stops(stops: pd.DataFrame, trips: pd.DataFrame, stop_times: pd.DataFrame) -> Dict[str, List[RouteStop]]:
+        """
+        route_id -> paradas del primer trip de la ruta ordenadas por stop_sequence.
+        Si el trip pasa dos veces por una parada se queda la última posición.
+        """
+        first_trips = trips.drop_duplicates("route_id")[["trip_id", "route_id"]]
+
+        st = stop_times[["trip_id", "stop_id", "stop_sequence"]].copy()
+        st["trip_id"] = st["trip_id"].astype(str)
+        st["stop_id"] = st["stop_id"].astype(str)
+        st = st.merge(first_trips, on="trip_id", how="inner")
+        st = st.sort_values(["route_id", "stop_sequence"], kind="mergesort")
+        st["order"] = st.groupby("route_id", sort=False).cumcount() + 1
+        st = st.drop_duplicates(["route_id", "stop_id"], keep="last")
+
+        stop_info = stops.dropna(subset=["stop_id"])[["stop_id", "stop_name", "stop_lat", "stop_lon"]].copy()
+        stop_info["stop_id"] = stop_info["stop_id"].astype(str)
+        stop_info = stop_info.drop_duplicates("stop_id")
+        st = st.merge(stop_info, on="stop_id", how="inner").sort_values(["route_id", "order"], kind="mergesort")
+
+        route_stops: Dict[str, List[RouteStop]] = {}
+        for row in st[["route_id", "stop_id", "stop_name", "stop_lat", "stop_lon", "order"]].itertuples(index=False, name=None):
+            route_id, stop_id, stop_name, stop_lat, stop_lon, order = row
+            route_stops.setdefault(route_id, []).append(
+                RouteStop(stop_id, str(stop_name), float(stop_lat), float(stop_lon), int(order))
+            )
+        return route_stops
+
+    def direction_name(self, last_stop_id: str, direction_id: int = 0) -> str:
+        return self.stop_name_by_id.get(str(last_stop_id), f"dir_{direction_id}")
+
+    def next_departures(
+        self,
+        stop_id: str,
+        route_id: str,
+        now_ts: float,
+        service_days: List[Tuple[date, float]],
+        max_results: int = 5,
+        exclude_trip_ids: Optional[Iterable[str]] = None,
+    ) -> Dict[str, List[ScheduledDeparture]]:
+        """
+        Próximas salidas planificadas en `stop_id` para `route_id` a partir de
+        `now_ts`, agrupadas por dirección y ordenadas por hora.
+
+        `service_days` son pares (fecha de servicio, service_day_start de esa fecha). Se
+        suele pasar hoy y ayer: los trips de ayer con horas > 24:00 siguen
+        circulando de madrugada. Solo cuentan los trips con servicio activo esa fecha.
+        """
+        key = (str(stop_id), str(route_id))
+        bounds = self.slices.get(key)
+        if bounds is None:
+            return {}
+
+        excluded = set(exclude_trip_ids or ())
+        candidates: List[ScheduledDeparture] = []
+        for service_date, day_start_ts in service_days:
+            candidates.extend(self._walk_service_day(
+                key, bounds, service_date, day_start_ts, now_ts, max_results, excluded
+            ))
+        candidates.sort(key=lambda dep: dep.departure_ts)
+
+        result: Dict[str, List[ScheduledDeparture]] = {}
+        seen = set()
+        for dep in candidates:
+            departures = result.setdefault(dep.direction_name, [])
+            dedup_key = (dep.trip_instance_id, dep.direction_name, dep.service_date)
+            if len(departures) >= max_results or dedup_key in seen:
+                continue
+            seen.add(dedup_key)
+            departures.append(dep)
+
+        return {direction: deps for direction, deps in result.items() if deps}
+
+    def _walk_service_day(
+        self,
+        key: Tuple[str, str],
+        bounds: Tuple[int, int],
+        service_date: date,
+        day_start_ts: float,
+        now_ts: float,
+        max_results: int,
+        excluded: set,
+    ) -> List[ScheduledDeparture]:
+        start, end = bounds
+        from_secs = math.ceil(now_ts - day_start_ts)
+        first = start + int(np.searchsorted(self.departure_secs[start:end], from_secs, side="left"))
+        if first >= end:
+            return []
+
+        # Filtro vectorizado: trips cuyo servicio circula en service_date
+        active = self.calendar.active_services(service_date)
+        running = active[self.trip_service_codes[self.trip_codes[first:end]]]
+        positions = first + np.flatnonzero(running)
+
+        total_directions = self.directions_per_slice.get(key, 0)
+        per_direction: Dict[str, int] = {}
+        full_directions = 0
+        seen = set()
+        departures = []
+
+        for pos in positions:
+            code = self.trip_codes[pos]
+            trip_id = self.trip_ids[code]
+            if trip_id in excluded:
+                continue
+
+            direction_name = self.trip_direction_names[code]
+            count = per_direction.get(direction_name, 0)
+            if count >= max_results:
+                continue
+
+            dedup_key = (self.trip_instance_ids[code], direction_name)
+            if dedup_key in seen:
+                continue
+            seen.add(dedup_key)
+
+            secs = int(self.departure_secs[pos])
+            departures.append(ScheduledDeparture(
+                trip_id=trip_id,
+                trip_instance_id=self.trip_instance_ids[code],
+                direction_name=direction_name,
+                service_date=service_date,
+                departure_secs=secs,
+                departure_ts=day_start_ts + secs,
+            ))
+            per_direction[direction_name] = count + 1
+            if count + 1 == max_results:
+                full_directions += 1
+                if full_directions >= total_directions:
+                    break
+
+        return departures
@@ -1,5 +1,6 @@
 import unicodedata
 import re
+from functools import lru_cache
 
 class HtmlHelper:
 
@@ -53,6 +54,7 @@ class HtmlHelper:
         return text.strip()
     
     @staticmethod
+    @lru_cache(maxsize=1024)
     def custom_sort_key(line: str):
         # Buscar número y sufijo opcional
         match = re.match(r"L(\d+)([A-Z]?)", line)
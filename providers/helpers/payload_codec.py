@@ -0,0 +1,159 @@
+"""
+Codecs para los datos de mapa que se pasan a la web app (map.html?data=...).
+
+- `lzstring`: JSON + LZString (formato original). LZString es Python puro y es lo que
+  más CPU consume con mapas grandes (cercanas, Bicing con 500+ estaciones).
+- `binary`: esquema binario compacto + deflate (zlib, en C) + base64url. Las paradas se
+  guardan por columnas: coordenadas como enteros (1e-6 grados) codificados en delta,
+  textos en un diccionario (nombres de línea, colores, direcciones... se repiten) y
+  enteros como varint. map.html lo decodifica con DecompressionStream y sigue aceptando
+  LZString para los enlaces antiguos.
+
+Los payloads binarios empiezan por BINARY_PREFIX, que no forma parte del alfabeto de
+LZString (compressToEncodedURIComponent), así que map.html distingue ambos formatos.
+
+Formato binario v1 (todo varint sin signo salvo que se indique):
+    meta_len, meta (JSON UTF-8 del dict sin "stops")
+    n_strings, n_strings x (len, UTF-8)
+    n_stops, n_fields
+    n_fields x (índice del nombre en el diccionario, tipo)
+    por campo, n_stops valores:
+        COORD  -> zigzag(delta de round(valor * 1e6))
+        INT    -> zigzag(valor)
+        STRING -> índice en el diccionario
+        JSON   -> índice en el diccionario del JSON del valor (None, floats, mixtos)
+
+zstd no se usa: los navegadores no lo descomprimen de forma nativa y añadiría una
+dependencia; deflate sí (DecompressionStream).
+
+DecompressionStream no existe en WebViews antiguas (iOS < 16.4, Android System WebView
+< 80) y el servidor no sabe en cuál se abrirá el enlace, así que MAP_PAYLOAD_CODEC elige
+el codec con lzstring por defecto; binary queda como opción hasta que map.html tenga un
+inflate propio. Con binary, map.html avisa al usuario si la WebView no lo soporta.
+"""
+import base64
+import json
+import os
+import zlib
+from typing import Any, Callable, Dict, List
+
+import lzstring
+
+from .logger import logger
+
+MAP_PAYLOAD_CODEC = os.getenv("MAP_PAYLOAD_CODEC", "lzstring").lower()
+
+BINARY_PREFIX = "~1"
+COORD_SCALE = 1_000_000
+COORD_FIELDS = ("lat", "lon")
+
+KIND_STRING = 0
+KIND_COORD = 1
+KIND_INT = 2
+KIND_JSON = 3
+
+
+def _write_varint(out: bytearray, value: int):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+class _StringTable:
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+
+    def add(self, value: str) -> int:
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.index)
+        return code
+
+
+def _field_kind(name: str, values: List[Any]) -> int:
+    if name in COORD_FIELDS and all(type(v) in (int, float) for v in values):
+        return KIND_COORD
+    if all(type(v) is int for v in values):
+        return KIND_INT
+    if all(type(v) is str for v in values):
+        return KIND_STRING
+    return KIND_JSON
+
+
+def encode_binary(data: Dict[str, Any]) -> str:
+    stops = data.get("stops") or []
+    meta = {key: value for key, value in data.items() if key != "stops"}
+
+    fields: List[str] = []
+    for stop in stops:
+        for name in stop:
+            if name not in fields:
+                fields.append(name)
+
+    strings = _StringTable()
+    columns = bytearray()
+    header = bytearray()
+    _write_varint(header, len(stops))
+    _write_varint(header, len(fields))
+
+    for name in fields:
+        values = [stop.get(name) for stop in stops]
+        kind = _field_kind(name, values)
+        _write_varint(header, strings.add(name))
+        header.append(kind)
+
+        if kind == KIND_COORD:
+            previous = 0
+            for value in values:
+                scaled = round(value * COORD_SCALE)
+                _write_varint(columns, _zigzag(scaled - previous))
+                previous = scaled
+        elif kind == KIND_INT:
+            for value in values:
+                _write_varint(columns, _zigzag(value))
+        elif kind == KIND_STRING:
+            for value in values:
+                _write_varint(columns, strings.add(value))
+        else:
+            for value in values:
+                _write_varint(columns, strings.add(json.dumps(value)))
+
+    body = bytearray()
+    meta_bytes = json.dumps(meta).encode("utf-8")
+    _write_varint(body, len(meta_bytes))
+    body += meta_bytes
+    _write_varint(body, len(strings.index))
+    for value in strings.index:
+        encoded = value.encode("utf-8")
+        _write_varint(body, len(encoded))
+        body += encoded
+    body += header
+    body += columns
+
+    compressed = zlib.compress(bytes(body), 9)
+    return BINARY_PREFIX + base64.urlsafe_b64encode(compressed).rstrip(b"=").decode("ascii")
+
+
+def encode_lzstring(data: Dict[str, Any]) -> str:
+    return lzstring.LZString().compressToEncodedURIComponent(json.dumps(data))
+
+
+CODECS: Dict[str, Callable[[Dict[str, Any]], str]] = {
+    "binary": encode_binary,
+    "lzstring": encode_lzstring,
+}
+
+
+if MAP_PAYLOAD_CODEC not in CODECS:
+    logger.warning(f"Unknown MAP_PAYLOAD_CODEC '{MAP_PAYLOAD_CODEC}', using 'lzstring'")
+    MAP_PAYLOAD_CODEC = "lzstring"
+
+
+def encode_payload(data: Dict[str, Any], codec: str = MAP_PAYLOAD_CODEC) -> str:
+    """Codifica `data` con `codec`; función de módulo para poder ejecutarse en el pool de procesos."""
+    return CODECS[codec](data)
@@ -0,0 +1,269 @@
+"""
+Capa de resiliencia común para los proveedores externos (TMB, TRAM, Rodalies, Bicing, FGC, MouTe).
+
+Cada proveedor tiene un `ProviderGuard` con:
+- timeout por llamada (por defecto el del proveedor, sobrescribible por endpoint),
+- reintentos con backoff exponencial y jitter solo para errores transitorios
+  (timeouts, conexión, 429 y 5xx),
+- un circuit breaker: tras N fallos seguidos deja de llamar durante `reset_timeout`
+  segundos y lanza `ProviderUnavailableError` al instante (quien llama sirve la última
+  respuesta buena), luego deja pasar una llamada de prueba,
+- un semáforo que limita las llamadas concurrentes al proveedor,
+- métricas para ver la salud de cada proveedor (/providers en el panel de admin).
+
+Configuración por entorno con el prefijo del proveedor, p. ej. TMB_TIMEOUT=5,
+TMB_MAX_CONCURRENCY=10, FGC_FAILURE_THRESHOLD=3.
+"""
+import asyncio
+import os
+import random
+import time
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import aiohttp
+
+from .logger import logger
+
+
+class ProviderUnavailableError(Exception):
+    """El circuito del proveedor está abierto: no se ha llegado a llamar."""
+
+    def __init__(self, provider: str, retry_in: float):
+        super().__init__(f"Provider '{provider}' unavailable (circuit open, retry in {retry_in:.0f}s)")
+        self.provider = provider
+        self.retry_in = retry_in
+
+
+def _env(provider: str, name: str, default: float) -> float:
+    return float(os.getenv(f"{provider.upper()}_{name}", os.getenv(f"PROVIDER_{name}", default)))
+
+
+@dataclass
+class ResiliencePolicy:
+    timeout: float = 10.0
+    retries: int = 2
+    backoff_base: float = 0.3
+    backoff_max: float = 3.0
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+    max_concurrency: int = 10
+
+    @classmethod
+    def from_env(cls, provider: str, **defaults) -> "ResiliencePolicy":
+        base = cls(**defaults)
+        return cls(
+            timeout=_env(provider, "TIMEOUT", base.timeout),
+            retries=int(_env(provider, "RETRIES", base.retries)),
+            backoff_base=_env(provider, "BACKOFF_BASE", base.backoff_base),
+            backoff_max=_env(provider, "BACKOFF_MAX", base.backoff_max),
+            failure_threshold=int(_env(provider, "FAILURE_THRESHOLD", base.failure_threshold)),
+            reset_timeout=_env(provider, "RESET_TIMEOUT", base.reset_timeout),
+            max_concurrency=int(_env(provider, "MAX_CONCURRENCY", base.max_concurrency)),
+        )
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and self.retry_in() > 0:
+            return False
+        # Pasado el reset_timeout: una única llamada de prueba
+        if self._probe_in_flight:
+            return False
+        self.state = self.HALF_OPEN
+        self._probe_in_flight = True
+        return True
+
+    def release_probe(self):
+        """La llamada de prueba no llegó a completarse (cancelada): se permite otra."""
+        self._probe_in_flight = False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> bool:
+        """Devuelve True si este fallo abre el circuito."""
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            was_open = self.state == self.OPEN
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            return not was_open
+        return False
+
+
+@dataclass
+class ProviderMetrics:
+    calls: int = 0
+    successes: int = 0
+    failures: int = 0
+    retries: int = 0
+    timeouts: int = 0
+    short_circuits: int = 0
+    circuit_opens: int = 0
+    in_flight: int = 0
+    waiting: int = 0
+    total_ms: float = 0.0
+    last_error: str = ""
+
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ServerTimeoutError)):
+        return True
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status == 429 or error.status >= 500
+    return False
+
+
+class ProviderGuard:
+    def __init__(self, name: str, policy: ResiliencePolicy):
+        self.name = name
+        self.policy = policy
+        self.breaker = CircuitBreaker(policy.failure_threshold, policy.reset_timeout)
+        self.metrics = ProviderMetrics()
+        self._semaphore = asyncio.Semaphore(policy.max_concurrency)
+        self.logger = logger.getChild(f"{self.__class__.__name__}[{name}]")
+
+    @property
+    def degraded(self) -> bool:
+        return self.breaker.state != CircuitBreaker.CLOSED
+
+    async def call(self, fn: Callable, *args, endpoint: str = "", timeout: Optional[float] = None, **kwargs) -> Any:
+        """Ejecuta `fn(*args, **kwargs)` aplicando timeout, reintentos, breaker y límite de concurrencia."""
+        timeout = timeout or self.policy.timeout
+
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self.metrics.short_circuits += 1
+                raise ProviderUnavailableError(self.name, self.breaker.retry_in())
+
+            self.metrics.calls += 1
+            start = time.perf_counter()
+            try:
+                result = await self._call_limited(fn, args, kwargs, timeout)
+            except asyncio.CancelledError:
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                self.metrics.total_ms += (time.perf_counter() - start) * 1000
+                self.metrics.failures += 1
+                self.metrics.last_error = f"{endpoint or fn.__name__}: {type(e).__name__}: {e}"[:300]
+                if isinstance(e, asyncio.TimeoutError):
+                    self.metrics.timeouts += 1
+
+                if not _is_transient(e):
+                    # Un 4xx o un error de parseo: el proveedor responde, no cuenta para el breaker
+                    self.breaker.record_success()
+                    raise
+
+                if self.breaker.record_failure():
+                    self.metrics.circuit_opens += 1
+                    self.logger.warning(f"Circuit opened after {self.breaker.consecutive_failures} failures: {self.metrics.last_error}")
+
+                if attempt >= self.policy.retries or self.breaker.state == CircuitBreaker.OPEN:
+                    raise
+
+                attempt += 1
+                self.metrics.retries += 1
+                delay = min(self.policy.backoff_max, self.policy.backoff_base * (2 ** (attempt - 1)))
+                await asyncio.sleep(random.uniform(0, delay))
+                continue
+
+            self.metrics.total_ms += (time.perf_counter() - start) * 1000
+            self.metrics.successes += 1
+            if self.breaker.state != CircuitBreaker.CLOSED:
+                self.logger.info("Circuit closed, provider recovered")
+            self.breaker.record_success()
+            return result
+
+    async def _call_limited(self, fn: Callable, args: tuple, kwargs: dict, timeout: float) -> Any:
+        self.metrics.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.metrics.waiting -= 1
+
+        self.metrics.in_flight += 1
+        try:
+            return await asyncio.wait_for(fn(*args, **kwargs), timeout=timeout)
+        finally:
+            self.metrics.in_flight -= 1
+            self._semaphore.release()
+
+    def snapshot(self) -> dict:
+        m = self.metrics
+        return {
+            "state": self.breaker.state,
+            "calls": m.calls,
+            "successes": m.successes,
+            "failures": m.failures,
+            "retries": m.retries,
+            "timeouts": m.timeouts,
+            "short_circuits": m.short_circuits,
+            "circuit_opens": m.circuit_opens,
+            "in_flight": m.in_flight,
+            "waiting": m.waiting,
+            "avg_ms": m.total_ms / m.calls if m.calls else 0.0,
+            "last_error": m.last_error,
+        }
+
+
+# Valores por defecto por proveedor (sobrescribibles por entorno)
+PROVIDER_DEFAULTS: Dict[str, dict] = {
+    "tmb": {"timeout": 8.0, "max_concurrency": 20},
+    "tram": {"timeout": 8.0},
+    "rodalies": {"timeout": 10.0},
+    "bicing": {"timeout": 8.0, "max_concurrency": 5},
+    "fgc": {"timeout": 15.0},
+    "moute": {"timeout": 8.0, "max_concurrency": 10},
+}
+
+_guards: Dict[str, ProviderGuard] = {}
+
+
+def get_provider_guard(name: str) -> ProviderGuard:
+    guard = _guards.get(name)
+    if guard is None:
+        guard = ProviderGuard(name, ResiliencePolicy.from_env(name, **PROVIDER_DEFAULTS.get(name, {})))
+        _guards[name] = guard
+    return guard
+
+
+def resilient(provider: str, timeout: Optional[float] = None):
+    """Decorador para los métodos HTTP de los *ApiService: pasa la llamada por el guard del proveedor."""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await get_provider_guard(provider).call(func, *args, endpoint=func.__name__, timeout=timeout, **kwargs)
+        return wrapper
+    return decorator
+
+
+def is_degraded(providers: Iterable[str]) -> bool:
+    return any(name in _guards and _guards[name].degraded for name in providers)
+
+
+def get_provider_metrics() -> Dict[str, dict]:
+    return {name: guard.snapshot() for name, guard in sorted(_guards.items())}
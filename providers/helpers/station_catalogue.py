@@ -0,0 +1,255 @@
+"""
+Catálogo columnar (struct-of-arrays) de las estaciones estáticas de toda la red.
+
+Una tabla por modo con columnas NumPy (código, lat, lon, índice de línea, índice de
+nombre) en lugar de miles de objetos Station. Las consultas por posición (cercanía,
+bounding box) se resuelven con operaciones sobre columnas enteras y solo se crean
+`StationView` para las filas que se devuelven.
+
+Se construye a partir de `get_all_stations` / `get_all_stops` de los servicios y se
+reutiliza mientras los servicios devuelvan las mismas listas (misma caché). Bicing
+no entra: su disponibilidad cambia cada minuto y se sigue tratando como objetos.
+
+Opcional: STATION_CATALOGUE_ENABLED=false vuelve al recorrido de objetos.
+"""
+import asyncio
+import os
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from domain.transport_type import TransportType
+from .cpu_offload import run_blocking
+from .logger import logger
+
+STATION_CATALOGUE_ENABLED = os.getenv("STATION_CATALOGUE_ENABLED", "true").lower() == "true"
+EARTH_RADIUS_KM = 6371.0
+
+# Mismo orden en que DistanceHelper.build_stops_list añade cada modo
+CATALOGUE_MODES = (
+    TransportType.METRO.value,
+    TransportType.TRAM.value,
+    TransportType.RODALIES.value,
+    TransportType.FGC.value,
+    TransportType.BUS.value,
+)
+
+# (line_name, line_name_with_emoji, line_code)
+LineKey = Tuple[Optional[str], Optional[str], object]
+
+
+class ModeTable:
+    """Estaciones de un modo de transporte en columnas."""
+
+    __slots__ = ("mode", "codes", "lat", "lon", "line_idx", "name_idx", "lines", "names")
+
+    def __init__(self, mode: str, codes: np.ndarray, lat: np.ndarray, lon: np.ndarray,
+                 line_idx: np.ndarray, name_idx: np.ndarray, lines: List[LineKey], names: List[str]):
+        self.mode = mode
+        self.codes = codes
+        self.lat = lat
+        self.lon = lon
+        self.line_idx = line_idx
+        self.name_idx = name_idx
+        self.lines = lines
+        self.names = names
+
+    @classmethod
+    def from_stations(cls, mode: str, stations: Sequence) -> "ModeTable":
+        lines: Dict[LineKey, int] = {}
+        names: Dict[str, int] = {}
+        line_idx = np.empty(len(stations), dtype=np.int32)
+        name_idx = np.empty(len(stations), dtype=np.int32)
+        codes = np.empty(len(stations), dtype=object)
+
+        for i, station in enumerate(stations):
+            line = (station.line_name, station.line_name_with_emoji, station.line_code)
+            line_idx[i] = lines.setdefault(line, len(lines))
+            name_idx[i] = names.setdefault(station.name, len(names))
+            # Se conserva el tipo original del código (int en TMB, str en FGC/Rodalies)
+            codes[i] = station.code
+
+        return cls(
+            mode=mode,
+            codes=codes,
+            lat=np.fromiter((s.latitude for s in stations), dtype=np.float64, count=len(stations)),
+            lon=np.fromiter((s.longitude for s in stations), dtype=np.float64, count=len(stations)),
+            line_idx=line_idx,
+            name_idx=name_idx,
+            lines=list(lines),
+            names=list(names),
+        )
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def view(self, row: int) -> "StationView":
+        return StationView(self, row)
+
+    def entry(self, row: int) -> Dict:
+        """Fila `row` con el formato de dict de DistanceHelper.build_stops_list (sin distancia)."""
+        line_name, line_name_with_emoji, line_code = self.lines[self.line_idx[row]]
+        entry = {"type": self.mode}
+        if self.mode != TransportType.BUS.value:
+            entry["line_name"] = line_name
+            entry["line_name_with_emoji"] = line_name_with_emoji
+        entry.update({
+            "line_code": line_code,
+            "station_name": self.names[self.name_idx[row]],
+            "station_code": self.codes[row],
+            "coordinates": (float(self.lat[row]), float(self.lon[row])),
+        })
+        return entry
+
+    def unique_bus_rows(self, rows: np.ndarray) -> np.ndarray:
+        """Primera aparición de cada código (una parada física sale una vez por línea)."""
+        if self.mode != TransportType.BUS.value or not len(rows):
+            return rows
+        _, first = np.unique(self.codes[rows].astype(str), return_index=True)
+        return rows[np.sort(first)]
+
+    def distances_km(self, lat: float, lon: float) -> np.ndarray:
+        """Haversine de cada estación a (lat, lon), misma fórmula que DistanceHelper.haversine_distance."""
+        phi1 = np.radians(self.lat)
+        phi2 = np.radians(lat)
+        delta_phi = np.radians(lat - self.lat)
+        delta_lambda = np.radians(lon - self.lon)
+        a = np.sin(delta_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(delta_lambda / 2) ** 2
+        return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    def within_bbox(self, min_lat: float, max_lat: float, min_lon: float, max_lon: float) -> np.ndarray:
+        return (self.lat >= min_lat) & (self.lat <= max_lat) & (self.lon >= min_lon) & (self.lon <= max_lon)
+
+
+class StationView:
+    """Fila de un ModeTable con la misma interfaz de lectura que Station (solo campos estáticos)."""
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: ModeTable, row: int):
+        self._table = table
+        self._row = row
+
+    @property
+    def transport_type(self) -> TransportType:
+        return TransportType(self._table.mode)
+
+    @property
+    def code(self):
+        return self._table.codes[self._row]
+
+    @property
+    def name(self) -> str:
+        return self._table.names[self._table.name_idx[self._row]]
+
+    @property
+    def latitude(self) -> float:
+        return float(self._table.lat[self._row])
+
+    @property
+    def longitude(self) -> float:
+        return float(self._table.lon[self._row])
+
+    @property
+    def line_name(self) -> Optional[str]:
+        return self._table.lines[self._table.line_idx[self._row]][0]
+
+    @property
+    def line_name_with_emoji(self) -> Optional[str]:
+        return self._table.lines[self._table.line_idx[self._row]][1]
+
+    @property
+    def line_code(self):
+        return self._table.lines[self._table.line_idx[self._row]][2]
+
+    def __repr__(self):
+        return f"StationView({self._table.mode}, code={self.code!r}, name={self.name!r}, line={self.line_name!r})"
+
+
+class StationCatalogue:
+    def __init__(self, tables: Dict[str, ModeTable]):
+        self.tables = tables
+
+    @classmethod
+    def from_stations(cls, stations_by_mode: Dict[str, Sequence]) -> "StationCatalogue":
+        return cls({mode: ModeTable.from_stations(mode, stations) for mode, stations in stations_by_mode.items()})
+
+    def __len__(self) -> int:
+        return sum(len(table) for table in self.tables.values())
+
+    def __iter__(self) -> Iterator[StationView]:
+        for table in self.tables.values():
+            for row in range(len(table)):
+                yield table.view(row)
+
+    def nearby(self, lat: float, lon: float, max_distance_km: float, bbox: Tuple[float, float, float, float],
+               modes: Sequence[str] = CATALOGUE_MODES) -> List[Dict]:
+        """
+        Estaciones de `modes` dentro de `bbox` y a menos de `max_distance_km`, con el mismo
+        formato de dict que DistanceHelper.build_stops_list (sin ordenar).
+        Las paradas de bus se deduplican por código, como en la versión por objetos.
+        """
+        results = []
+        for mode in modes:
+            table = self.tables.get(mode)
+            if table is None or not len(table):
+                continue
+
+            distances = table.distances_km(lat, lon)
+            mask = table.within_bbox(*bbox) & (distances <= max_distance_km)
+            rows = table.unique_bus_rows(np.flatnonzero(mask))
+
+            for row, distance_km in zip(rows.tolist(), distances[rows].tolist()):
+                entry = table.entry(row)
+                entry["distance_km"] = distance_km
+                results.append(entry)
+        return results
+
+
+class StationCatalogueCache:
+    """
+    Guarda el último catálogo y lo reconstruye solo cuando cambia alguna de las listas
+    de origen (los servicios devuelven la misma lista mientras su caché no expira).
+    """
+
+    def __init__(self):
+        self._catalogue: Optional[StationCatalogue] = None
+        # Se guardan las propias listas (no solo su id) para que no se reutilice un id liberado
+        self._sources: Dict[str, Sequence] = {}
+        self._lock = asyncio.Lock()
+
+    def _is_current(self, stations_by_mode: Dict[str, Sequence]) -> bool:
+        return (
+            self._catalogue is not None
+            and self._sources.keys() == stations_by_mode.keys()
+            and all(self._sources[mode] is stations and len(self._catalogue.tables[mode]) == len(stations)
+                    for mode, stations in stations_by_mode.items())
+        )
+
+    async def get(self, stations_by_mode: Dict[str, Sequence]) -> StationCatalogue:
+        if self._is_current(stations_by_mode):
+            return self._catalogue
+
+        async with self._lock:
+            if not self._is_current(stations_by_mode):
+                # Recorre objetos Station (no compensa serializarlos para el pool de procesos):
+                # el hilo retiene el GIL a ratos, reparte el coste pero no lo saca del loop.
+                # Solo ocurre cuando cambian las listas de origen
+                catalogue = await run_blocking(StationCatalogue.from_stations, stations_by_mode)
+                self._catalogue, self._sources = catalogue, dict(stations_by_mode)
+                logger.info(f"[{self.__class__.__name__}] Station catalogue rebuilt: {len(catalogue)} rows")
+            return self._catalogue
+
+
+station_catalogue_cache = StationCatalogueCache()
+
+
+async def get_station_catalogue(metro_service, bus_service, tram_service, rodalies_service, fgc_service) -> StationCatalogue:
+    metro, tram, rodalies, fgc, bus = await asyncio.gather(
+        metro_service.get_all_stations(),
+        tram_service.get_all_stops(),
+        rodalies_service.get_all_stations(),
+        fgc_service.get_all_stations(),
+        bus_service.get_all_stops(),
+    )
+    return await station_catalogue_cache.get(dict(zip(CATALOGUE_MODES, (metro, tram, rodalies, fgc, bus))))
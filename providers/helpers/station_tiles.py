@@ -0,0 +1,227 @@
+"""
+Teselas z/x/y (esquema slippy map de OpenStreetMap) con las estaciones de cada zona.
+
+En lugar de meter todas las estaciones en la URL de map.html, el mapa pide solo las
+teselas visibles a /api/results/tiles/{layer}/{z}/{x}/{y}. Así el tamaño de lo que se
+descarga depende del área visible y no del total de estaciones.
+
+- Capa "stations": catálogo estático (StationCatalogue) de metro, tram, Rodalies, FGC y
+  bus, en el formato "near" de map.html. Se reconstruye cuando cambia el catálogo.
+- Capa "bicing": estaciones de Bicing en el formato de los mapas de Bicing. Se
+  reconstruye cuando el servicio refresca su caché (la disponibilidad cambia cada minuto).
+
+Las filas se agrupan una vez por tesela en STATION_TILE_ZOOM y el JSON de cada una se
+precalcula con su ETag (hash del contenido). Las teselas de otros zooms se derivan de
+esos grupos en el pool de hilos (en z13 son miles de filas) y se guardan en un LRU.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from domain.bicing import BicingStation
+from .cpu_offload import run_blocking
+from .logger import logger
+from .station_catalogue import StationCatalogue
+from .transport_data_compressor import bicing_map_stop, near_map_stop
+
+# URL pública del endpoint de teselas (…/api/results/tiles). Vacía = map.html sin teselas
+MAP_TILES_URL = os.getenv("MAP_TILES_URL", "").rstrip("/")
+STATION_TILE_ZOOM = int(os.getenv("STATION_TILE_ZOOM", 15))
+STATION_TILE_MIN_ZOOM = int(os.getenv("STATION_TILE_MIN_ZOOM", 13))
+STATION_TILE_MAX_ZOOM = 18
+STATION_TILE_CACHE_SIZE = int(os.getenv("STATION_TILE_CACHE_SIZE", 1024))
+
+TILE_LAYER_STATIONS = "stations"
+TILE_LAYER_BICING = "bicing"
+# Cache-Control max-age por capa (segundos)
+TILE_MAX_AGE = {
+    TILE_LAYER_STATIONS: int(os.getenv("STATION_TILE_MAX_AGE", 3600)),
+    TILE_LAYER_BICING: int(os.getenv("BICING_TILE_MAX_AGE", 60)),
+}
+
+
+def tile_xy(lat: np.ndarray, lon: np.ndarray, z: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Tesela (x, y) en el zoom `z` de cada coordenada."""
+    n = 2 ** z
+    lat_rad = np.radians(np.clip(lat, -85.0511, 85.0511))
+    x = np.floor((lon + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / math.pi) / 2.0 * n)
+    return np.clip(x, 0, n - 1).astype(np.int64), np.clip(y, 0, n - 1).astype(np.int64)
+
+
+def is_valid_tile(z: int, x: int, y: int) -> bool:
+    return STATION_TILE_MIN_ZOOM <= z <= STATION_TILE_MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+@dataclass(frozen=True, slots=True)
+class Tile:
+    body: bytes
+    etag: str
+
+    @classmethod
+    def from_stops(cls, stops: List[Dict]) -> "Tile":
+        body = json.dumps({"stops": stops}).encode("utf-8")
+        return cls(body=body, etag=f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"')
+
+
+EMPTY_TILE = Tile.from_stops([])
+
+
+class TileIndex:
+    """
+    Índice por teselas sobre columnas lat/lon. `render(rows)` convierte un array de filas
+    en la lista de paradas de la tesela.
+    """
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, render: Callable[[np.ndarray], List[Dict]],
+                 base_zoom: int = STATION_TILE_ZOOM, max_entries: int = STATION_TILE_CACHE_SIZE):
+        self.lat = lat
+        self.lon = lon
+        self.render = render
+        self.base_zoom = base_zoom
+        self.max_entries = max_entries
+        self._groups = self._group_rows()
+        # Teselas del zoom base: todas precalculadas
+        self._base_tiles: Dict[Tuple[int, int], Tile] = {
+            key: Tile.from_stops(render(rows)) for key, rows in self._groups.items()
+        }
+        # LRU de teselas de otros zooms; se rellena desde el pool de hilos
+        self._tiles: OrderedDict = OrderedDict()
+        self._tiles_lock = threading.Lock()
+
+    def _group_rows(self) -> Dict[Tuple[int, int], np.ndarray]:
+        if not len(self.lat):
+            return {}
+        xs, ys = tile_xy(self.lat, self.lon, self.base_zoom)
+        keys = xs * (2 ** self.base_zoom) + ys
+        order = np.argsort(keys, kind="stable")
+        unique_keys, starts = np.unique(keys[order], return_index=True)
+        groups = np.split(order, starts[1:])
+        n = 2 ** self.base_zoom
+        return {(int(key // n), int(key % n)): rows for key, rows in zip(unique_keys.tolist(), groups)}
+
+    def __len__(self) -> int:
+        return len(self._base_tiles)
+
+    def rows(self, z: int, x: int, y: int) -> np.ndarray:
+        if z == self.base_zoom:
+            return self._groups.get((x, y), np.empty(0, dtype=np.int64))
+
+        if z > self.base_zoom:
+            # Subtesela: filas de la tesela padre que caen dentro
+            shift = z - self.base_zoom
+            parent = self._groups.get((x >> shift, y >> shift))
+            if parent is None:
+                return np.empty(0, dtype=np.int64)
+            xs, ys = tile_xy(self.lat[parent], self.lon[parent], z)
+            return parent[(xs == x) & (ys == y)]
+
+        # Zoom menor: unión de las teselas base que contiene
+        shift = self.base_zoom - z
+        children = [rows for (bx, by), rows in self._groups.items() if bx >> shift == x and by >> shift == y]
+        return np.sort(np.concatenate(children)) if children else np.empty(0, dtype=np.int64)
+
+    def cached_tile(self, z: int, x: int, y: int) -> Optional[Tile]:
+        """Tesela ya calculada (todas las del zoom base) o None."""
+        if z == self.base_zoom:
+            return self._base_tiles.get((x, y), EMPTY_TILE)
+
+        key = (z, x, y)
+        with self._tiles_lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+            return tile
+
+    def render_tile(self, z: int, x: int, y: int) -> Tile:
+        """Calcula la tesela y la guarda en el LRU. Bloqueante: se ejecuta fuera del event loop."""
+        rows = self.rows(z, x, y)
+        tile = Tile.from_stops(self.render(rows)) if len(rows) else EMPTY_TILE
+        with self._tiles_lock:
+            self._tiles[(z, x, y)] = tile
+            if len(self._tiles) > self.max_entries:
+                self._tiles.popitem(last=False)
+        return tile
+
+    async def tile(self, z: int, x: int, y: int) -> Tile:
+        tile = self.cached_tile(z, x, y)
+        if tile is None:
+            tile = await run_blocking(self.render_tile, z, x, y)
+        return tile
+
+
+def build_station_tiles(catalogue: StationCatalogue) -> TileIndex:
+    """Capa "stations": todas las tablas del catálogo en un único índice."""
+    tables = [table for table in catalogue.tables.values() if len(table)]
+    offsets = np.cumsum([0] + [len(table) for table in tables])
+
+    def render(rows: np.ndarray) -> List[Dict]:
+        stops = []
+        table_of_row = np.searchsorted(offsets, rows, side="right") - 1
+        for table_idx, table in enumerate(tables):
+            local_rows = table.unique_bus_rows(rows[table_of_row == table_idx] - offsets[table_idx])
+            stops.extend(near_map_stop(table.entry(row)) for row in local_rows.tolist())
+        return stops
+
+    if not tables:
+        return TileIndex(np.empty(0), np.empty(0), render)
+    return TileIndex(
+        np.concatenate([table.lat for table in tables]),
+        np.concatenate([table.lon for table in tables]),
+        render,
+    )
+
+
+def build_bicing_tiles(stations: Sequence[BicingStation]) -> TileIndex:
+    """Capa "bicing": estaciones con su disponibilidad en el momento de construir el índice."""
+    def render(rows: np.ndarray) -> List[Dict]:
+        return [bicing_map_stop(stations[row]) for row in rows.tolist()]
+
+    return TileIndex(
+        np.fromiter((s.latitude for s in stations), dtype=np.float64, count=len(stations)),
+        np.fromiter((s.longitude for s in stations), dtype=np.float64, count=len(stations)),
+        render,
+    )
+
+
+class StationTilesCache:
+    """
+    Último índice de cada capa; se reconstruye solo cuando cambia su origen (el catálogo
+    o la lista de Bicing que devuelve el servicio mientras su caché no expira).
+    """
+
+    def __init__(self):
+        # capa -> (origen, índice). Se guarda el propio origen para comparar por identidad
+        self._indexes: Dict[str, Tuple[object, TileIndex]] = {}
+        self._lock = asyncio.Lock()
+
+    def _current(self, layer: str, source) -> Optional[TileIndex]:
+        cached = self._indexes.get(layer)
+        if cached is not None and cached[0] is source:
+            return cached[1]
+        return None
+
+    async def get(self, layer: str, source, build: Callable[[object], TileIndex]) -> TileIndex:
+        index = self._current(layer, source)
+        if index is not None:
+            return index
+
+        async with self._lock:
+            index = self._current(layer, source)
+            if index is None:
+                index = await run_blocking(build, source)
+                self._indexes[layer] = (source, index)
+                logger.info(f"[{self.__class__.__name__}] Tiles for layer '{layer}' rebuilt: {len(index)} tiles at z{index.base_zoom}")
+            return index
+
+
+station_tiles_cache = StationTilesCache()
+
@@ -1,9 +1,13 @@
+import asyncio
+import hashlib
 import json
 import html
-import lzstring
+import os
+import re
 import unicodedata
 
-from typing import List, Dict, Any
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 from domain.bus import BusStop
 from domain.common.location import Location
@@ -15,6 +19,164 @@ from domain.fgc import FgcStation, FgcLine
 from domain.transport_type import TransportType
 
 from .logger import logger
+from .cpu_offload import run_blocking, run_cpu_bound
+from .payload_codec import MAP_PAYLOAD_CODEC, encode_payload
+
+# Directorio donde persistir los mapas de línea ya comprimidos (vacío = solo en memoria)
+MAP_PAYLOAD_CACHE_DIR = os.getenv("MAP_PAYLOAD_CACHE_DIR", "")
+# Comprimir todos los mapas de línea en segundo plano al arrancar
+MAP_PAYLOAD_PRECOMPUTE = os.getenv("MAP_PAYLOAD_PRECOMPUTE", "true").lower() == "true"
+_UNSAFE_FILENAME = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+@lru_cache(maxsize=16384)
+def normalize_name(name: str) -> str:
+    """Quita acentos y diacríticos (NFKD). Los nombres se repiten en cada mapa: se calcula una vez."""
+    return ''.join(
+        c for c in unicodedata.normalize('NFKD', name)
+        if not unicodedata.combining(c)
+    )
+
+
+def bicing_map_stop(station: BicingStation) -> Dict[str, Any]:
+    """Parada de Bicing en el formato de map.html (mapas de Bicing y teselas de la capa bicing)."""
+    return {
+        "lat": station.latitude,
+        "lon": station.longitude,
+        "name": f"{station.id} - {normalize_name(html.escape(station.streetName))}",
+        "slots": station.slots,
+        "electrical_bikes": station.electrical_bikes,
+        "mechanical_bikes": station.mechanical_bikes,
+        "availability": station.disponibilidad
+    }
+
+
+def near_map_stop(station: Dict[str, Any]) -> Dict[str, Any]:
+    """Estación con el formato de DistanceHelper.build_stops_list -> formato "near" de map.html."""
+    return {
+        "lat": station.get('coordinates')[0],
+        "lon": station.get('coordinates')[1],
+        "name": f"{station.get('station_code')} - {normalize_name(station.get('station_name'))}",
+        "line": station.get('line_code') or '',
+        "line_name": station.get('line_name') or '',
+        "type": station.get('type'),
+    }
+
+
+class MapPayloadCache:
+    """
+    Mapas de línea ya comprimidos por (modo, línea).
+
+    Cada entrada guarda una versión barata de los datos de origen: la identidad de cada
+    estación (el catálogo crea objetos nuevos al reconstruirse), su indicador de alertas y
+    los datos de línea que se pintan (nombre, color, origen/destino). Si coincide, abrir el
+    mapa es una búsqueda en un dict: no se construyen las paradas ni se serializa nada.
+    La entrada mantiene viva la lista de estaciones para que sus id() no se reutilicen.
+
+    Con MAP_PAYLOAD_CACHE_DIR los payloads se guardan también en disco, versionados por el
+    hash del codec y del JSON, y sobreviven a un reinicio.
+    """
+
+    def __init__(self, cache_dir: str = MAP_PAYLOAD_CACHE_DIR, codec: str = MAP_PAYLOAD_CODEC):
+        self.cache_dir = cache_dir
+        self.codec = codec
+        self.hits = 0
+        self.misses = 0
+        # (modo, línea) -> (versión, payload, estaciones)
+        self._entries: Dict[Tuple[str, str], Tuple[Tuple, str, Sequence[Any]]] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    @staticmethod
+    def source_version(stations: Sequence[Any], line_fields: Tuple) -> Tuple:
+        return (
+            line_fields,
+            tuple(map(id, stations)),
+            tuple(bool(getattr(station, "has_alerts", False)) for station in stations),
+        )
+
+    def content_version(self, data: Dict[str, Any]) -> str:
+        serialized = json.dumps(data)
+        return hashlib.blake2b(f"{self.codec}:{serialized}".encode("utf-8"), digest_size=12).hexdigest()
+
+    def _path(self, mode: str, line_id: str) -> str:
+        return os.path.join(self.cache_dir, mode, f"{_UNSAFE_FILENAME.sub('_', line_id)}.json")
+
+    def _read(self, mode: str, line_id: str) -> Optional[Tuple[str, str]]:
+        try:
+            with open(self._path(mode, line_id), "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            return stored["version"], stored["payload"]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"[{self.__class__.__name__}] Ignoring unreadable map payload {mode}/{line_id}: {e}")
+            return None
+
+    def _write(self, mode: str, line_id: str, version: str, payload: str):
+        path = self._path(mode, line_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": version, "payload": payload}, f)
+        os.replace(tmp_path, path)
+
+    def _lookup(self, key: Tuple[str, str], version: Tuple) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1]
+        return None
+
+    async def get_or_compress(
+        self,
+        mode: str,
+        line_id: str,
+        stations: Sequence[Any],
+        line_fields: Tuple,
+        build_data: Callable[[], Dict[str, Any]]
+    ) -> str:
+        """
+        Payload del mapa de `line_id`. `build_data()` solo se llama si la versión de
+        `stations` y `line_fields` no coincide con la guardada.
+        """
+        key = (mode, str(line_id))
+        version = self.source_version(stations, line_fields)
+        payload = self._lookup(key, version)
+        if payload is not None:
+            return payload
+
+        # Un único cálculo por línea aunque varios usuarios abran el mismo mapa a la vez
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            payload = self._lookup(key, version)
+            if payload is not None:
+                return payload
+
+            data = build_data()
+            payload = None
+            if self.cache_dir:
+                content_version = self.content_version(data)
+                stored = await run_blocking(self._read, *key)
+                if stored is not None and stored[0] == content_version:
+                    self.hits += 1
+                    payload = stored[1]
+
+            if payload is None:
+                self.misses += 1
+                payload = await run_cpu_bound(encode_payload, data, self.codec)
+                if self.cache_dir:
+                    try:
+                        await run_blocking(self._write, *key, content_version, payload)
+                    except Exception as e:
+                        logger.warning(f"[{self.__class__.__name__}] Could not persist map payload {mode}/{line_id}: {e}")
+
+            self._entries[key] = (version, payload, stations)
+            return payload
+
+    def clear(self):
+        self._entries.clear()
+
+
+map_payload_cache = MapPayloadCache()
 
 
 class TransportDataCompressor:
@@ -23,9 +185,6 @@ class TransportDataCompressor:
     into a compressed JSON format that can be easily shared or stored.
     """
 
-    def __init__(self):
-        self.lz = lzstring.LZString()
-
     def _normalize_name(self, name: str) -> str:
         """
         Removes accents and normalizes special characters from station or stop names.
@@ -36,16 +195,12 @@ class TransportDataCompressor:
         Returns:
             str: Normalized name without accents.
         """
-        normalized = ''.join(
-            c for c in unicodedata.normalize('NFKD', name)
-            if not unicodedata.combining(c)
-        )
-        logger.debug(f"[{self.__class__.__name__}] Normalized name '{name}' -> '{normalized}'")
-        return normalized
+        return normalize_name(name)
 
-    def _compress_data(self, data: Dict[str, Any]) -> str:
+    async def _compress_data(self, data: Dict[str, Any]) -> str:
         """
-        Serializes the provided data into JSON and compresses it using LZString.
+        Encodes the provided data with the configured payload codec (MAP_PAYLOAD_CODEC).
+        It runs in the CPU offload process pool.
 
         Args:
             data (dict): Data to compress.
@@ -53,9 +208,35 @@ class TransportDataCompressor:
         Returns:
             str: Compressed JSON string.
         """
-        json_str = json.dumps(data)
-        compressed = self.lz.compressToEncodedURIComponent(json_str)
-        logger.debug(f"[{self.__class__.__name__}] Compressed data: \n{compressed}")
+        compressed = await run_cpu_bound(encode_payload, data, MAP_PAYLOAD_CODEC)
+        logger.debug(f"[{self.__class__.__name__}] Compressed data: {len(compressed)} chars")
+        return compressed
+
+    async def _compress_line_map(
+        self,
+        transport_type: str,
+        line_id: str,
+        stations: List[Any],
+        line_fields: Tuple,
+        build_data: Callable[[], Dict[str, Any]]
+    ) -> str:
+        """
+        Like `_compress_data`, but for static line maps: the result is memoized in
+        `map_payload_cache` by (type, line_id, version of `stations` and `line_fields`),
+        and `build_data` only runs when that version changes.
+
+        Args:
+            transport_type (str): Transport type of the map.
+            line_id (str): ID of the transport line.
+            stations (list): Stations painted on the map.
+            line_fields (tuple): Line values painted on the map (name, color, directions...).
+            build_data (callable): Builds the line map data to compress.
+
+        Returns:
+            str: Compressed JSON string.
+        """
+        compressed = await map_payload_cache.get_or_compress(transport_type, line_id, stations, line_fields, build_data)
+        logger.debug(f"[{self.__class__.__name__}] Line map {transport_type}/{line_id}: {len(compressed)} chars")
         return compressed
 
     def _log_mapping_start(self, transport_type: str, count: int, line_id: str, line_name: str):
@@ -109,128 +290,133 @@ class TransportDataCompressor:
         ]
         return forward + reverse
 
-    def map_metro_stations(self, stations: List[MetroStation], line_id: str, line_name: str) -> str:
+    async def map_metro_stations(self, stations: List[MetroStation], line_id: str, line_name: str) -> str:
         self._log_mapping_start(TransportType.METRO.value, len(stations), line_id, line_name)
-        
-        stops_base = [
-            {
-                "lat": station.latitude,
-                "lon": station.longitude,
-                "name": f"{station.code} - {self._normalize_name(station.name)}",
-                "color": station.line_color,
-                "alert": '⚠️' if station.has_alerts else '',
-                "connections": "".join(connection for connection in []) #TODO: Fix this
-            }
-            for station in stations
-        ]
 
-        stops = self._map_stops_bidirectional(
-            stops_base,
-            direction_forward=stations[0].DESTI_SERVEI,
-            direction_reverse=stations[0].ORIGEN_SERVEI
-        )
+        def build_data():
+            stops_base = [
+                {
+                    "lat": station.latitude,
+                    "lon": station.longitude,
+                    "name": f"{station.code} - {self._normalize_name(station.name)}",
+                    "color": station.line_color,
+                    "alert": '⚠️' if station.has_alerts else '',
+                    "connections": "".join(connection for connection in []) #TODO: Fix this
+                }
+                for station in stations
+            ]
 
-        data = {
-            "type": TransportType.METRO.value,
-            "line_id": line_id,
-            "line_name": html.escape(line_name),
-            "stops": stops
-        }
+            stops = self._map_stops_bidirectional(
+                stops_base,
+                direction_forward=stations[0].DESTI_SERVEI,
+                direction_reverse=stations[0].ORIGEN_SERVEI
+            )
+
+            return {
+                "type": TransportType.METRO.value,
+                "line_id": line_id,
+                "line_name": html.escape(line_name),
+                "stops": stops
+            }
 
-        compressed = self._compress_data(data)
+        compressed = await self._compress_line_map(TransportType.METRO.value, line_id, stations, (line_name,), build_data)
         self._log_mapping_end(TransportType.METRO.value, line_id)
         return compressed
 
-    def map_bus_stops(self, stops: List[BusStop], line_id: str, line_name: str) -> str:
+    async def map_bus_stops(self, stops: List[BusStop], line_id: str, line_name: str) -> str:
         self._log_mapping_start(TransportType.BUS.value, len(stops), line_id, line_name)
 
-        data = {
-            "type": TransportType.BUS.value,
-            "line_id": line_id,
-            "line_name": html.escape(line_name),
-            "stops": [
+        def build_data():
+            return {
+                "type": TransportType.BUS.value,
+                "line_id": line_id,
+                "line_name": html.escape(line_name),
+                "stops": [
+                    {
+                        "lat": stop.latitude,
+                        "lon": stop.longitude,
+                        "name": f"{stop.code} - {self._normalize_name(stop.name)}",
+                        "color": stop.line_color,
+                        "alert": '⚠️' if stop.has_alerts else '',
+                        "direction": stop.DESTI_SENTIT
+                    }
+                    for stop in stops
+                ]
+            }
+
+        compressed = await self._compress_line_map(TransportType.BUS.value, line_id, stops, (line_name,), build_data)
+        self._log_mapping_end(TransportType.BUS.value, line_id)
+        return compressed
+
+    async def map_tram_stops(self, stops: List[TramStation], line_id: str, line_name: str) -> str:
+        self._log_mapping_start(TransportType.TRAM.value, len(stops), line_id, line_name)
+
+        def build_data():
+            origin = stops[0].name
+            destination = stops[-1].name
+
+            stops_base = [
                 {
                     "lat": stop.latitude,
                     "lon": stop.longitude,
-                    "name": f"{stop.code} - {self._normalize_name(stop.name)}",
+                    "name": f"{stop.id} - {self._normalize_name(stop.name)}",
+                    "alert": '',
                     "color": stop.line_color,
-                    "alert": '⚠️' if stop.has_alerts else '',
-                    "direction": stop.DESTI_SENTIT
                 }
                 for stop in stops
             ]
-        }
-
-        compressed = self._compress_data(data)
-        self._log_mapping_end(TransportType.BUS.value, line_id)
-        return compressed
-
-    def map_tram_stops(self, stops: List[TramStation], line_id: str, line_name: str) -> str:
-        self._log_mapping_start(TransportType.TRAM.value, len(stops), line_id, line_name)
 
-        origin = stops[0].name
-        destination = stops[-1].name
-
-        stops_base = [
-            {
-                "lat": stop.latitude,
-                "lon": stop.longitude,
-                "name": f"{stop.id} - {self._normalize_name(stop.name)}",
-                "alert": '',
-                "color": stop.line_color,
+            tram_stops = self._map_stops_bidirectional(
+                stops_base,
+                direction_forward=destination,
+                direction_reverse=origin
+            )
+
+            return {
+                "type": TransportType.TRAM.value,
+                "line_id": line_id,
+                "line_name": html.escape(line_name),
+                "stops": tram_stops
             }
-            for stop in stops
-        ]
-
-        tram_stops = self._map_stops_bidirectional(
-            stops_base,
-            direction_forward=destination,
-            direction_reverse=origin
-        )
-
-        data = {
-            "type": TransportType.TRAM.value,
-            "line_id": line_id,
-            "line_name": html.escape(line_name),
-            "stops": tram_stops
-        }
 
-        compressed = self._compress_data(data)
+        compressed = await self._compress_line_map(TransportType.TRAM.value, line_id, stops, (line_name,), build_data)
         self._log_mapping_end(TransportType.TRAM.value, line_id)
         return compressed
     
-    def map_rodalies_stations(self, stations: List[RodaliesStation], line: RodaliesLine):
+    async def map_rodalies_stations(self, stations: List[RodaliesStation], line: RodaliesLine):
         self._log_mapping_start(TransportType.RODALIES.value, len(stations), line.id, line.name)
 
-        stops_base = [
-            {
-                "lat": station.latitude,
-                "lon": station.longitude,
-                "name": f"{station.id} - {self._normalize_name(station.name)}",
-                "alert": '',
-                "color": line.color,
-            }
-            for station in stations
-        ]
-
-        stops = self._map_stops_bidirectional(
-            stops_base,
-            direction_forward=line.origin,
-            direction_reverse=line.destination
-        )
+        def build_data():
+            stops_base = [
+                {
+                    "lat": station.latitude,
+                    "lon": station.longitude,
+                    "name": f"{station.id} - {self._normalize_name(station.name)}",
+                    "alert": '',
+                    "color": line.color,
+                }
+                for station in stations
+            ]
 
-        data = {
-            "type": TransportType.RODALIES.value,
-            "line_id": line.id,
-            "line_name": html.escape(line.name),
-            "stops": stops
-        }
+            stops = self._map_stops_bidirectional(
+                stops_base,
+                direction_forward=line.origin,
+                direction_reverse=line.destination
+            )
+
+            return {
+                "type": TransportType.RODALIES.value,
+                "line_id": line.id,
+                "line_name": html.escape(line.name),
+                "stops": stops
+            }
 
-        compressed = self._compress_data(data)
+        line_fields = (line.name, line.color, line.origin, line.destination)
+        compressed = await self._compress_line_map(TransportType.RODALIES.value, line.id, stations, line_fields, build_data)
         self._log_mapping_end(TransportType.RODALIES.value, line.id)
         return compressed
     
-    def map_bicing_stations(self, stations: List[BicingStation], user_location: Location):
+    async def map_bicing_stations(self, stations: List[BicingStation], user_location: Location):
         self._log_mapping_start(TransportType.BICING.value, len(stations), '', '')
 
         data = {
@@ -239,70 +425,51 @@ class TransportDataCompressor:
                 "latitude": user_location.latitude,
                 "longitude": user_location.longitude
             },
-            "stops": [
-                {
-                    "lat": station.latitude,
-                    "lon": station.longitude,
-                    "name": f"{station.id} - {self._normalize_name(html.escape(station.streetName))}",
-                    "slots": station.slots,
-                    "electrical_bikes": station.electrical_bikes,
-                    "mechanical_bikes": station.mechanical_bikes,
-                    "availability": station.disponibilidad
-                }
-                for station in stations
-            ]
+            "stops": [bicing_map_stop(station) for station in stations]
         }
 
-        compressed = self._compress_data(data)
+        compressed = await self._compress_data(data)
         self._log_mapping_end(TransportType.BICING.value, '')
         return compressed
     
-    def map_fgc_stations(self, stations: List[FgcStation], line: FgcLine):
+    async def map_fgc_stations(self, stations: List[FgcStation], line: FgcLine):
         self._log_mapping_start(TransportType.FGC.value, len(stations), line.id, line.name)
 
-        stops_base = [
-            {
-                "lat": station.latitude,
-                "lon": station.longitude,
-                "name": f"{station.id} - {self._normalize_name(station.name)}",
-                "alert": '',
-                "color": line.color,
-            }
-            for station in stations
-        ]
-
-        stops = self._map_stops_bidirectional(
-            stops_base,
-            direction_forward=line.origin,
-            direction_reverse=line.destination
-        )
+        def build_data():
+            stops_base = [
+                {
+                    "lat": station.latitude,
+                    "lon": station.longitude,
+                    "name": f"{station.id} - {self._normalize_name(station.name)}",
+                    "alert": '',
+                    "color": line.color,
+                }
+                for station in stations
+            ]
 
-        data = {
-            "type": TransportType.FGC.value,
-            "line_id": line.id,
-            "line_name": html.escape(line.name),
-            "stops": stops
-        }
+            stops = self._map_stops_bidirectional(
+                stops_base,
+                direction_forward=line.origin,
+                direction_reverse=line.destination
+            )
+
+            return {
+                "type": TransportType.FGC.value,
+                "line_id": line.id,
+                "line_name": html.escape(line.name),
+                "stops": stops
+            }
 
-        compressed = self._compress_data(data)
+        line_fields = (line.name, line.color, line.origin, line.destination)
+        compressed = await self._compress_line_map(TransportType.FGC.value, line.id, stations, line_fields, build_data)
         self._log_mapping_end(TransportType.FGC.value, line.id)
         return compressed
     
-    def map_near_stations(self, near_stations, user_location: Location):
+    async def map_near_stations(self, near_stations, user_location: Location):
         self._log_mapping_start("NEAR_STATIONS", len(near_stations), '', '')
 
-        stops = [
-            {
-                "lat": station.get('coordinates')[0],
-                "lon": station.get('coordinates')[1],
-                "name": f"{station.get('station_code')} - {self._normalize_name(station.get('station_name'))}",
-                "line": station.get('line_code') or '',
-                "line_name": station.get('line_name') or '',
-                "type": station.get('type'),
-            }
-            for station in near_stations
-        ]
-        
+        stops = [near_map_stop(station) for station in near_stations]
+
         data = {
             "type": "near",
             "user_location": {
@@ -312,6 +479,44 @@ class TransportDataCompressor:
             "stops": stops
         }
 
-        compressed = self._compress_data(data)
+        compressed = await self._compress_data(data)
         self._log_mapping_end("NEAR_STATIONS", '')
-        return compressed
\ No newline at end of file
+        return compressed
+
+    async def precompute_line_maps(self, metro_service, bus_service, tram_service, rodalies_service, fgc_service):
+        """
+        Compresses every line map in the background (after the seeder), with the same
+        arguments the handlers use, so the first "map" tap is already a cache hit.
+        Only data already in the services' cache is used: lines whose stops have not
+        been fetched yet are skipped, so a restart makes no extra provider calls.
+        """
+        jobs = []
+        for line in await metro_service.get_all_lines():
+            jobs.append((partial(metro_service.get_stations_by_line, cached_only=True), self.map_metro_stations, line.code, (str(line.code), line.name)))
+        for line in await bus_service.get_all_lines():
+            jobs.append((partial(bus_service.get_stops_by_line, cached_only=True), self.map_bus_stops, line.code, (str(line.code), line.name)))
+        for line in await tram_service.get_all_lines():
+            jobs.append((partial(tram_service.get_stops_by_line, cached_only=True), self.map_tram_stops, line.id, (str(line.id), line.name)))
+        # Rodalies y FGC se sirven del catálogo que ya ha cargado el seeder
+        for line in await rodalies_service.get_all_lines():
+            jobs.append((rodalies_service.get_stations_by_line, self.map_rodalies_stations, line.id, (line,)))
+        for line in await fgc_service.get_all_lines():
+            jobs.append((fgc_service.get_stations_by_line, self.map_fgc_stations, line.id, (line,)))
+
+        failed = 0
+        skipped = 0
+        for get_stations, mapper_method, line_id, mapper_args in jobs:
+            try:
+                stations = await get_stations(line_id)
+                if stations:
+                    await mapper_method(stations, *mapper_args)
+                else:
+                    skipped += 1
+            except Exception as e:
+                failed += 1
+                logger.warning(f"[{self.__class__.__name__}] Could not precompute map for line {line_id}: {e}")
+
+        logger.info(
+            f"[{self.__class__.__name__}] Precomputed {len(jobs) - failed - skipped}/{len(jobs)} line maps "
+            f"({skipped} not cached yet, {map_payload_cache.misses} compressed, {map_payload_cache.hits} already cached)"
+        )
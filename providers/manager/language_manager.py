@@ -1,7 +1,38 @@
 import json
 import os
+from contextvars import ContextVar
+from typing import Optional
+
 from providers.helpers import logger
 
+# Idioma del update en curso. Cada tarea de asyncio tiene su propia copia del contexto,
+# así que dos usuarios atendidos a la vez no se pisan el idioma (antes era un atributo global).
+_current_language: ContextVar[Optional[str]] = ContextVar("current_language", default=None)
+
+
+class CompiledTemplate:
+    """
+    Traducción preparada una sola vez: las variantes singular/plural de "{s}" ya resueltas
+    y el `format` ya enlazado. Las que no tienen campos se devuelven tal cual.
+    """
+
+    __slots__ = ("text", "_singular", "_plural", "_has_fields")
+
+    def __init__(self, template: str):
+        self.text = template
+        if "{s}" in template:
+            self._singular = template.replace("{s}", "")
+            self._plural = template.replace("{s}", "s")
+        else:
+            self._singular = self._plural = template
+        # También "{{" / "}}": format los desescapa aunque no haya campos
+        self._has_fields = "{" in self._plural or "}" in self._plural
+
+    def render(self, **kwargs) -> str:
+        template = self._plural if kwargs.get("count", 0) != 1 else self._singular
+        return template.format(**kwargs) if self._has_fields else template
+
+
 class LanguageManager:
     """
     Manages application translations by loading JSON language files
@@ -19,6 +50,7 @@ class LanguageManager:
         self.locales_path = locales_path
         self.default_lang = default_lang
         self.locales = {}
+        self._compiled = {}
         logger.info(f"[{self.__class__.__name__}] Initializing LanguageManager with default language '{default_lang}'")
         self._load_locales()
 
@@ -34,6 +66,7 @@ class LanguageManager:
                 try:
                     with open(os.path.join(self.locales_path, filename), "r", encoding="utf-8") as f:
                         self.locales[lang_code] = json.load(f)
+                        self._compiled[lang_code] = {key: CompiledTemplate(value) for key, value in self.locales[lang_code].items()}
                         logger.info(f"[{self.__class__.__name__}] Loaded translations for language '{lang_code}'")
                 except Exception as e:
                     logger.error(f"[{self.__class__.__name__}] Failed to load '{filename}': {e}")   
@@ -44,30 +77,41 @@ class LanguageManager:
 
         Args:
             key (str): Translation key.
-            lang (str, optional): Language code. Defaults to default_lang.
+            lang (str, optional): Language code. Defaults to the current update's language.
             **kwargs: Optional variables for string formatting.
 
         Returns:
             str: Translated and formatted string.
         """
-        lang = lang or self.default_lang
-        template = self.locales.get(lang, {}).get(key) or self.locales[self.default_lang].get(key)
+        template = self.compiled(key, lang)
         if template is None:
             return key
-        if "{s}" in template:
-            plural_suffix = "s" if kwargs.get("count", 0) != 1 else ""
-            template = template.replace("{s}", plural_suffix)
-        return template.format(**kwargs)
+        return template.render(**kwargs)
+
+    def compiled(self, key: str, lang: str = None):
+        """CompiledTemplate de `key` (con fallback al idioma por defecto) o None si no existe."""
+        lang = lang or self.current_language()
+        template = self._compiled.get(lang, {}).get(key)
+        if template is None or not template.text:
+            template = self._compiled[self.default_lang].get(key)
+        return template
     
-    def set_language(self, new_language: str):
+    def current_language(self) -> str:
+        """Idioma del update en curso, o default_lang fuera de un update (tareas de sistema, API)."""
+        return _current_language.get() or self.default_lang
+
+    def set_language(self, new_language: Optional[str]):
         """
-        Set the default language for translations.
+        Set the language for the current update (context-local, default_lang is not modified).
 
         Args:
-            new_language (str): New default language code.
+            new_language (str): Language code for the current context, or None for default_lang.
+
+        Returns:
+            Token: contextvars token of the previous value.
         """
-        logger.info(f"[{self.__class__.__name__}] Changing default language from '{self.default_lang}' to '{new_language}'")
-        self.default_lang = new_language
+        logger.debug(f"[{self.__class__.__name__}] Using language '{new_language}' for the current context")
+        return _current_language.set(new_language)
 
     def get_available_languages(self):
         """
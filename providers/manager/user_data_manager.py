@@ -1,23 +1,27 @@
-import asyncio
 import inspect
 import json
 import logging
-from typing import Dict, List, Optional
-from datetime import datetime
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import datetime, timedelta
 from functools import wraps
 
 # SQLAlchemy & DB
-from sqlalchemy import select, delete, update, and_, func
+from sqlalchemy import select, delete, update, insert, and_, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from domain.clients import ClientType
-from providers.database.database import AsyncSessionLocal
+from providers.database.database import AsyncSessionLocal, spawn_background_write
 from models import (
     User as DBUser, 
     Favorite as DBFavorite, 
     ServiceIncident as DBServiceIncident, 
     AuditLog as DBAuditLog, 
     SearchHistory as DBSearchHistory,
-    UserDevice as DBUserDevice
+    UserDevice as DBUserDevice,
+    UserNotifiedAlert as DBUserNotifiedAlert,
+    FgcMouteStop as DBFgcMouteStop
 )
 
 # Domain Models
@@ -31,6 +35,13 @@ from telegram import Update
 
 logger = logging.getLogger(__name__)
 
+
+def _chunks(values, size: int):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
 # -------------------------------------------------------------------------
 # DECORADOR DE AUDITORÍA (Debe estar definido antes de la clase)
 # -------------------------------------------------------------------------
@@ -106,7 +117,7 @@ def audit_action(action_type: str, params_args: list = None):
                 # -------------------------------------------------------
                 # Como el decorador está EN el UserDataManager, 'self' ES el manager.
                 if user_id_ext and hasattr(self, "save_audit_log_background"):
-                    asyncio.create_task(
+                    spawn_background_write(
                         self.save_audit_log_background(
                             user_id_ext=user_id_ext,
                             source=source,
@@ -147,9 +158,22 @@ class UserDataManager:
         TransportType.TRAM.value: 2,
         TransportType.RODALIES.value: 3
     }
+    # Filas por INSERT en bloque y valores por IN (...): Postgres admite como máximo 32767
+    # parámetros por sentencia
+    NOTIFIED_INSERT_CHUNK = 5000
+    IN_CLAUSE_CHUNK = 10000
+    # Usuarios con favoritos en memoria (LRU); los demás se recargan de BD en su siguiente acceso
+    FAVORITES_CACHE_SIZE = int(os.getenv("FAVORITES_CACHE_SIZE", 5000))
 
     def __init__(self):
         logger.info("Initializing UserDataManager with PostgreSQL...")
+        # LRU de favoritos por usuario (external_id -> (set de (type, code), lista ordenada))
+        self._favorites_cache: OrderedDict = OrderedDict()
+        # Contador global de escrituras: una carga que se solape con cualquier escritura no se
+        # guarda, así no hace falta un contador por usuario que crezca sin límite
+        self._favorites_writes = 0
+        # Caché de idioma por usuario (external_id -> idioma): se consulta en cada update
+        self._language_cache: Dict[str, str] = {}
 
     async def save_audit_log_background(self, user_id_ext, source, action, details):
         """Tarea en segundo plano: no bloquea la respuesta al usuario"""
@@ -159,13 +183,15 @@ class UserDataManager:
                 res = await session.execute(stmt)
                 internal_id = res.scalars().first()
 
-                new_log = DBAuditLog(
-                    user_id=internal_id,
-                    client_source=source,
-                    action=action,
-                    details=details
+                # INSERT directo (sin RETURNING ni identity map): va a la partición del mes
+                await session.execute(
+                    insert(DBAuditLog).values(
+                        user_id=internal_id,
+                        client_source=source,
+                        action=action,
+                        details=details
+                    )
                 )
-                session.add(new_log)
                 await session.commit()
             except Exception as e:
                 logger.error(f"[Audit] DB Write Failed: {e}")
@@ -204,21 +230,19 @@ class UserDataManager:
                     )
                     session.add(db_user)
                     await session.flush() # Para obtener el ID generado
+                    self._language_cache[str(user_id)] = db_user.language
                 else:
                     if username:
                         db_user.username = username
 
                 # Gestionar Dispositivo (FCM)
                 if fcm_token:
-                    stmt_device = select(DBUserDevice).where(
-                        and_(DBUserDevice.user_id == db_user.id, DBUserDevice.token == fcm_token)
+                    stmt_device = (
+                        pg_insert(DBUserDevice)
+                        .values(user_id=db_user.id, token=fcm_token)
+                        .on_conflict_do_nothing(index_elements=[DBUserDevice.user_id, DBUserDevice.token])
                     )
-                    res_device = await session.execute(stmt_device)
-                    device = res_device.scalars().first()
-
-                    if not device:
-                        new_device = DBUserDevice(user_id=db_user.id, token=fcm_token)
-                        session.add(new_device)
+                    await session.execute(stmt_device)
 
                 await session.commit()
                 return is_new
@@ -233,14 +257,24 @@ class UserDataManager:
             stmt = update(DBUser).where(DBUser.external_id == str(user_id)).values(language=new_language)
             await session.execute(stmt)
             await session.commit()
+            self._language_cache[str(user_id)] = new_language
             return True
 
     async def get_user_language(self, user_id: int) -> str:
+        user_id = str(user_id)
+        cached = self._language_cache.get(user_id)
+        if cached is not None:
+            return cached
+
         async with AsyncSessionLocal() as session:
-            stmt = select(DBUser.language).where(DBUser.external_id == str(user_id))
+            stmt = select(DBUser.language).where(DBUser.external_id == user_id)
             result = await session.execute(stmt)
             lang = result.scalars().first()
-            return lang if lang else "en"
+        if not lang:
+            # Usuario aún no registrado: no se cachea, register_user guardará su idioma
+            return "en"
+        self._language_cache[user_id] = lang
+        return lang
 
     @audit_action(action_type="GET_ALL_USERS", params_args=[])
     async def get_users(self, client_source: ClientType = ClientType.SYSTEM.value) -> List[User]:
@@ -256,26 +290,74 @@ class UserDataManager:
                     created_at=u.created_at,
                     language=u.language,
                     receive_notifications=u.receive_notifications,
-                    already_notified=u.already_notified_ids if u.already_notified_ids else [], 
                     fcm_token=""
                 ) for u in db_users
             ]
 
     @audit_action(action_type="UPDATE_NOTIFIED_ALERTS", params_args=["alert_id"])
     async def update_notified_alerts(self, user_id, alert_id, client_source: ClientType = ClientType.SYSTEM.value):
+        return await self.mark_alerts_notified([(str(user_id), str(alert_id))]) > 0
+
+    async def mark_alerts_notified(self, notified: List[Tuple[str, str]]) -> int:
+        """
+        Inserta en bloque pares (external_id, alert_id) en user_notified_alerts.
+        Los ya existentes se ignoran (ON CONFLICT DO NOTHING). Devuelve cuántos eran nuevos.
+        """
+        if not notified:
+            return 0
+
+        async with AsyncSessionLocal() as session:
+            internal_ids = {}
+            for external_ids in _chunks({str(user_id) for user_id, _ in notified}, self.IN_CLAUSE_CHUNK):
+                result = await session.execute(
+                    select(DBUser.external_id, DBUser.id).where(DBUser.external_id.in_(external_ids))
+                )
+                internal_ids.update(result.all())
+
+            rows = [
+                {"user_id": internal_ids[str(user_id)], "alert_id": str(alert_id)}
+                for user_id, alert_id in set(notified)
+                if str(user_id) in internal_ids
+            ]
+
+            inserted = 0
+            for chunk in _chunks(rows, self.NOTIFIED_INSERT_CHUNK):
+                stmt = (
+                    pg_insert(DBUserNotifiedAlert)
+                    .values(chunk)
+                    .on_conflict_do_nothing(index_elements=[DBUserNotifiedAlert.user_id, DBUserNotifiedAlert.alert_id])
+                )
+                result = await session.execute(stmt)
+                inserted += result.rowcount
+            await session.commit()
+            return inserted
+
+    async def prune_notified_alerts(self, retention_days: int) -> int:
+        """
+        Borra las notificaciones de alertas que terminaron hace más de `retention_days`,
+        y las de más de `retention_days` cuya alerta ya no está activa ni en service_incidents.
+        Las alertas activas nunca se podan, así que no se vuelven a notificar.
+        """
+        cutoff = datetime.now() - timedelta(days=retention_days)
         async with AsyncSessionLocal() as session:
-            stmt = select(DBUser).where(DBUser.external_id == str(user_id))
+            ended = select(DBServiceIncident.external_id).where(DBServiceIncident.end_date < cutoff)
+            # Activas o terminadas hace poco: nunca se podan (el mismo id puede existir en otro operador)
+            recent = select(DBServiceIncident.external_id).where(
+                DBServiceIncident.external_id.isnot(None)
+                & ((DBServiceIncident.end_date == None) | (DBServiceIncident.end_date >= cutoff))
+            )
+
+            stmt = delete(DBUserNotifiedAlert).where(
+                DBUserNotifiedAlert.alert_id.not_in(recent)
+                & (
+                    DBUserNotifiedAlert.alert_id.in_(ended)
+                    | (DBUserNotifiedAlert.notified_at < cutoff)
+                )
+            )
             result = await session.execute(stmt)
-            user = result.scalars().first()
-            
-            if user:
-                current_list = list(user.already_notified_ids) if user.already_notified_ids else []
-                if alert_id not in current_list:
-                    current_list.append(alert_id)
-                    user.already_notified_ids = current_list 
-                    await session.commit()
-                    return True
-            return False
+            await session.commit()
+            logger.info(f"Pruned {result.rowcount} notified alerts older than {retention_days} days")
+            return result.rowcount
 
     @audit_action(action_type="GET_USER_RECEIVE_NOTIFICATIONS", params_args=[])
     async def get_user_receive_notifications(self, client_source: ClientType, user_id: str) -> bool:
@@ -309,7 +391,7 @@ class UserDataManager:
                 lat = item.coordinates[0] if item.coordinates and len(item.coordinates) > 0 else None
                 lon = item.coordinates[1] if item.coordinates and len(item.coordinates) > 1 else None
 
-                new_fav = DBFavorite(
+                fav_values = dict(
                     user_id=internal_id,
                     transport_type=type.lower(),
                     station_code=item.STATION_CODE,
@@ -321,8 +403,22 @@ class UserDataManager:
                     latitude=lat,
                     longitude=lon
                 )
-                session.add(new_fav)
+                # Upsert sobre uq_favorites_user_type_station: repetir un favorito solo refresca sus datos
+                stmt = (
+                    pg_insert(DBFavorite)
+                    .values(**fav_values)
+                    .on_conflict_do_update(
+                        index_elements=[DBFavorite.user_id, DBFavorite.transport_type, DBFavorite.station_code],
+                        set_={
+                            key: value for key, value in fav_values.items()
+                            if key not in ("user_id", "transport_type", "station_code")
+                        }
+                    )
+                    .returning(DBFavorite)
+                )
+                new_fav = (await session.scalars(stmt)).one()
                 await session.commit()
+                self._cache_add_favorite(str(user_id), self._to_domain_favorite(new_fav, str(user_id)))
                 return True
             except Exception as e:
                 logger.error(f"Error adding favorite: {e}")
@@ -343,56 +439,88 @@ class UserDataManager:
             )
             result = await session.execute(stmt)
             await session.commit()
+            if result.rowcount > 0:
+                self._cache_remove_favorite(str(user_id), type.lower(), str(item_id))
             return result.rowcount > 0
 
     @audit_action(action_type="GET_FAVORITES", params_args=[])
     async def get_favorites_by_user(self, client_source: ClientType, user_id: int) -> List[FavoriteItem]:
-        async with AsyncSessionLocal() as session:
-            internal_id = await self._get_user_internal_id(session, user_id)
-            if not internal_id: return []
-
-            stmt = select(DBFavorite).where(DBFavorite.user_id == internal_id)
-            result = await session.execute(stmt)
-            db_favs = result.scalars().all()
-
-            fav_items = []
-            for f in db_favs:
-                fav_items.append(FavoriteItem(
-                    USER_ID=str(user_id),
-                    TYPE=f.transport_type,
-                    STATION_CODE=f.station_code,
-                    STATION_NAME=f.station_name,
-                    STATION_GROUP_CODE=f.station_group_code or "",
-                    LINE_NAME=f.line_name or "",
-                    LINE_NAME_WITH_EMOJI=f.line_name_with_emoji or "",
-                    LINE_CODE=f.line_code or "",
-                    coordinates=[f.latitude or 0, f.longitude or 0] # Revisa el orden aquí también
-                ))
-            
-            return sorted(
-                fav_items,
-                key=lambda f: self.FAVORITE_TYPE_ORDER.get(f.TYPE, 999)
-            )
+        _, fav_items = await self._get_cached_favorites(str(user_id))
+        return list(fav_items)
 
     async def has_favorite(self, user_id, type, item_id) -> bool:
+        fav_keys, _ = await self._get_cached_favorites(str(user_id))
+        return (str(type).lower(), str(item_id)) in fav_keys
+
+    def invalidate_favorites(self, user_id: str = None):
+        """Descarta la caché de favoritos de un usuario (o de todos si no se indica)."""
+        self._favorites_writes += 1
+        if user_id is None:
+            self._favorites_cache.clear()
+            return
+        self._favorites_cache.pop(str(user_id), None)
+
+    async def _get_cached_favorites(self, user_id: str) -> Tuple[Set[Tuple[str, str]], List[FavoriteItem]]:
+        """Devuelve (claves, favoritos ordenados) desde memoria, cargando de BD solo en el primer acceso."""
+        cached = self._favorites_cache.get(user_id)
+        if cached is not None:
+            self._favorites_cache.move_to_end(user_id)
+            return cached
+
+        writes = self._favorites_writes
         async with AsyncSessionLocal() as session:
-            internal_id = await self._get_user_internal_id(session, user_id)
-            if not internal_id: return False
-            
-            stmt = select(DBFavorite).where(
-                and_(
-                    DBFavorite.user_id == internal_id,
-                    DBFavorite.transport_type == str(type).lower(),
-                    DBFavorite.station_code == str(item_id)
-                )
+            stmt = (
+                select(DBFavorite)
+                .join(DBUser, DBUser.id == DBFavorite.user_id)
+                .where(DBUser.external_id == user_id)
             )
             result = await session.execute(stmt)
-            return result.scalars().first() is not None
+            db_favs = result.scalars().all()
+
+        fav_items = self._sort_favorites([self._to_domain_favorite(f, user_id) for f in db_favs])
+        entry = ({(f.TYPE, f.STATION_CODE) for f in fav_items}, fav_items)
+
+        # Si hubo una escritura mientras leíamos, no guardamos un estado posiblemente obsoleto
+        if self._favorites_writes == writes:
+            self._favorites_cache[user_id] = entry
+            if len(self._favorites_cache) > self.FAVORITES_CACHE_SIZE:
+                self._favorites_cache.popitem(last=False)
+        return entry
+
+    def _cache_add_favorite(self, user_id: str, fav_item: FavoriteItem):
+        self._favorites_writes += 1
+        cached = self._favorites_cache.get(user_id)
+        if cached is None:
+            return
+        fav_keys, fav_items = cached
+        key = (fav_item.TYPE, fav_item.STATION_CODE)
+        fav_keys.add(key)
+        others = [f for f in fav_items if (f.TYPE, f.STATION_CODE) != key]
+        self._favorites_cache[user_id] = (fav_keys, self._sort_favorites(others + [fav_item]))
+
+    def _cache_remove_favorite(self, user_id: str, type: str, item_id: str):
+        self._favorites_writes += 1
+        cached = self._favorites_cache.get(user_id)
+        if cached is None:
+            return
+        fav_keys, fav_items = cached
+        fav_keys.discard((type, item_id))
+        self._favorites_cache[user_id] = (
+            fav_keys,
+            [f for f in fav_items if (f.TYPE, f.STATION_CODE) != (type, item_id)]
+        )
+
+    def _sort_favorites(self, fav_items: List[FavoriteItem]) -> List[FavoriteItem]:
+        return sorted(
+            fav_items,
+            key=lambda f: self.FAVORITE_TYPE_ORDER.get(f.TYPE, 999)
+        )
         
-    async def get_active_users_with_favorites(self) -> List[tuple[User, List[FavoriteItem]]]:
+    async def get_active_users_with_favorites(self, alert_ids: Optional[List[str]] = None) -> List[tuple[User, List[FavoriteItem]]]:
         """
         Obtiene usuarios que tienen notificaciones activas Y tienen favoritos.
         Incluye el FCM Token haciendo JOIN con DBUserDevice.
+        `already_notified` se rellena desde user_notified_alerts, limitado a `alert_ids` si se indican.
         """
         async with AsyncSessionLocal() as session:
             # 1. MODIFICAMOS LA CONSULTA
@@ -424,6 +552,7 @@ class UserDataManager:
                         domain_user.fcm_token = token
 
                     grouped_data[user_id_ext] = {
+                        "pk": db_user.id,
                         "user": domain_user,
                         "favorites": {}, # Usamos un DICT para evitar duplicados temporalmente
                         "seen_favs": set() # Set auxiliar para control
@@ -445,7 +574,22 @@ class UserDataManager:
                     grouped_data[user_id_ext]["favorites"][fav_unique_key] = domain_fav
                     grouped_data[user_id_ext]["seen_favs"].add(fav_unique_key)
 
-            # 4. CONVERTIR DICT DE FAVORITOS A LISTA
+            # 4. ALERTAS YA NOTIFICADAS (una sola consulta para todos los usuarios)
+            if grouped_data:
+                pk_to_user = {data["pk"]: data["user"] for data in grouped_data.values()}
+                # Sin filtro de alertas: un único bloque con None
+                alert_chunks = _chunks({str(a) for a in alert_ids}, self.IN_CLAUSE_CHUNK) if alert_ids is not None else [None]
+                for alert_chunk in alert_chunks:
+                    for user_pks in _chunks(pk_to_user.keys(), self.IN_CLAUSE_CHUNK):
+                        stmt_notified = select(DBUserNotifiedAlert.user_id, DBUserNotifiedAlert.alert_id).where(
+                            DBUserNotifiedAlert.user_id.in_(user_pks)
+                        )
+                        if alert_chunk is not None:
+                            stmt_notified = stmt_notified.where(DBUserNotifiedAlert.alert_id.in_(alert_chunk))
+                        for user_pk, alert_id in (await session.execute(stmt_notified)).all():
+                            pk_to_user[user_pk].already_notified.add(alert_id)
+
+            # 5. CONVERTIR DICT DE FAVORITOS A LISTA
             return [
                 (data["user"], list(data["favorites"].values())) 
                 for data in grouped_data.values()
@@ -460,7 +604,6 @@ class UserDataManager:
             created_at=db_user.created_at,
             language=db_user.language,
             receive_notifications=db_user.receive_notifications,
-            already_notified=db_user.already_notified_ids if db_user.already_notified_ids else [],
             fcm_token="" # Se inicializa vacío, pero el método principal lo sobreescribe
         )
 
@@ -487,11 +630,9 @@ class UserDataManager:
                 internal_id = await self._get_user_internal_id(session, user_id_ext)
             
             if internal_id:
-                new_search = DBSearchHistory(
-                    user_id=internal_id,
-                    query=query
+                await session.execute(
+                    insert(DBSearchHistory).values(user_id=internal_id, query=query)
                 )
-                session.add(new_search)
                 await session.commit()
                 return 1
             return 0
@@ -512,36 +653,65 @@ class UserDataManager:
             searches = result.scalars().all()
             return searches
 
+    # ---------------------------
+    # FGC -> MOUTE
+    # ---------------------------
+
+    async def get_fgc_moute_stops(self) -> Dict[str, DBFgcMouteStop]:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(DBFgcMouteStop))
+            return {row.stop_id: row for row in result.scalars().all()}
+
+    async def save_fgc_moute_stops(self, rows: List[dict]) -> int:
+        """Upsert de filas {stop_id, stop_lat, stop_lon, moute_id}."""
+        if not rows:
+            return 0
+
+        async with AsyncSessionLocal() as session:
+            stmt = pg_insert(DBFgcMouteStop).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[DBFgcMouteStop.stop_id],
+                set_={
+                    "stop_lat": stmt.excluded.stop_lat,
+                    "stop_lon": stmt.excluded.stop_lon,
+                    "moute_id": stmt.excluded.moute_id,
+                    "updated_at": func.now(),
+                }
+            )
+            result = await session.execute(stmt)
+            await session.commit()
+            return result.rowcount
+
     # ---------------------------
     # ALERTS (Service Incidents)
     # ---------------------------
 
     async def register_alert(self, transport_type: TransportType, api_alert: Alert):
         async with AsyncSessionLocal() as session:
-            stmt = select(DBServiceIncident).where(
-                and_(
-                    DBServiceIncident.external_id == str(api_alert.id),
-                    DBServiceIncident.transport_type == transport_type.value
+            stmt = (
+                pg_insert(DBServiceIncident)
+                .values(
+                    external_id=str(api_alert.id),
+                    transport_type=transport_type.value,
+                    begin_date=api_alert.begin_date,
+                    end_date=api_alert.end_date,
+                    status=api_alert.status,
+                    cause=api_alert.cause,
+                    publications=[pub.__dict__ for pub in api_alert.publications],
+                    affected_entities=[ent.__dict__ for ent in api_alert.affected_entities]
                 )
+                .on_conflict_do_nothing(
+                    index_elements=[DBServiceIncident.external_id, DBServiceIncident.transport_type]
+                )
+                .returning(DBServiceIncident.id)
             )
             result = await session.execute(stmt)
-            exists = result.scalars().first()
+            inserted_id = result.scalar_one_or_none()
+            await session.commit()
 
-            if exists:
+            if inserted_id is None:
                 return False
 
-            new_incident = DBServiceIncident(
-                external_id=str(api_alert.id),
-                transport_type=transport_type.value,
-                begin_date=api_alert.begin_date,
-                end_date=api_alert.end_date,
-                status=api_alert.status,
-                cause=api_alert.cause,
-                publications=[pub.__dict__ for pub in api_alert.publications],
-                affected_entities=[ent.__dict__ for ent in api_alert.affected_entities]
-            )
-            session.add(new_incident)
-            await session.commit()
             logger.info(f"New ServiceIncident registered: {api_alert.id}")
             return True
 
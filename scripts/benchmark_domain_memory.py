@@ -0,0 +1,222 @@
+"""
+Memory benchmark for the static station catalogue.
+
+Loads the bus and metro catalogue the bot seeds at startup (bus stops repeated
+once per line that serves them, metro stations repeated per line) and compares
+its retained size against "legacy" copies of the same objects: plain
+dataclasses with a per-instance __dict__, no PhysicalStop and a fresh copy of
+every string and float, which is what the models looked like before slots,
+interning and the shared physical stop.
+
+- --from-api downloads the real catalogue from the TMB API, with the same calls
+  as the seeder (needs TMB_APP_ID / TMB_APP_KEY, same as the bot).
+- Otherwise a synthetic catalogue shaped like the TMB responses is built
+  through the same factories.
+
+The size is measured by walking the object graph (each object counted once),
+so strings shared between stations are counted a single time.
+
+Usage:
+    python scripts/benchmark_domain_memory.py --from-api
+    python scripts/benchmark_domain_memory.py
+    python scripts/benchmark_domain_memory.py --bus-lines 110 --stops-per-line 120 --physical-stops 2500
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import sys
+from dataclasses import asdict, fields, make_dataclass
+from enum import Enum
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import providers.helpers  # noqa: F401 - antes que domain para evitar la importación circular
+from domain.bus.bus_stop import BusStop
+from domain.metro.metro_station import MetroStation
+from providers.api import TmbApiService
+from providers.manager import SecretsManager
+
+# Claves de asdict(BusStop) antes de slots/PhysicalStop: es el JSON que devuelven los endpoints de bus
+BUS_STOP_KEYS = [
+    "id", "code", "name", "latitude", "longitude", "order", "transport_type", "name_with_emoji",
+    "description", "line_id", "line_code", "line_description", "line_color", "line_name",
+    "line_name_with_emoji", "has_alerts", "alerts", "DESTI_SENTIT",
+]
+
+METRO_LINES = ["L1", "L2", "L3", "L4", "L5", "L9N", "L9S", "L10N", "L10S", "L11", "FM"]
+
+
+def bus_features(rng: random.Random, lines: int, stops_per_line: int, physical_stops: int) -> list:
+    physical = [
+        {
+            "CODI_PARADA": 100 + i,
+            "NOM_PARADA": f"Parada {i} - Carrer {rng.randint(1, 400)}",
+            "DESC_PARADA": f"Descripció de la parada {i}",
+            "lon": round(2.10 + rng.random() * 0.12, 6),
+            "lat": round(41.35 + rng.random() * 0.10, 6),
+        }
+        for i in range(physical_stops)
+    ]
+
+    features = []
+    for line in range(lines):
+        name = f"V{line}" if line % 3 else f"{line}"
+        for direction, destination in enumerate((f"Origen {line}", f"Destí {line}")):
+            for order, stop in enumerate(rng.sample(physical, stops_per_line // 2)):
+                features.append({
+                    "type": "Feature",
+                    "geometry": {"type": "Point", "coordinates": [stop["lon"], stop["lat"]]},
+                    "properties": {
+                        "ID_RECORREGUT": line * 10 + direction,
+                        "CODI_PARADA": stop["CODI_PARADA"],
+                        "NOM_PARADA": stop["NOM_PARADA"],
+                        "DESC_PARADA": stop["DESC_PARADA"],
+                        "ORDRE": order,
+                        "ID_LINIA": line,
+                        "CODI_LINIA": line,
+                        "NOM_LINIA": name,
+                        "DESC_LINIA": f"Origen {line} - Destí {line}",
+                        "DESTI_SENTIT": destination,
+                        "COLOR_REC": "DC0000",
+                    },
+                })
+    # Ida y vuelta por JSON: cada string es un objeto nuevo, como al parsear la respuesta de la API
+    return json.loads(json.dumps(features))
+
+
+def metro_features(rng: random.Random, stations_per_line: int) -> list:
+    features = []
+    for line_id, line in enumerate(METRO_LINES):
+        for order in range(stations_per_line):
+            code = line_id * 100 + order
+            features.append({
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [2.10 + rng.random() * 0.12, 41.35 + rng.random() * 0.10]},
+                "properties": {
+                    "CODI_GRUP_ESTACIO": 6000 + code,
+                    "ID_ESTACIO": code,
+                    "CODI_ESTACIO": code,
+                    "NOM_ESTACIO": f"Estació {code}",
+                    "ORDRE_ESTACIO": order,
+                    "ID_LINIA": line_id,
+                    "CODI_LINIA": line_id,
+                    "NOM_LINIA": line,
+                    "COLOR_LINIA": "DC241F",
+                    "DESC_SERVEI": f"Origen {line} - Destí {line}",
+                    "ORIGEN_SERVEI": f"Origen {line}",
+                    "DESTI_SERVEI": f"Destí {line}",
+                },
+            })
+    return json.loads(json.dumps(features))
+
+
+async def api_catalogue() -> dict:
+    """Catálogo real de TMB, con las mismas llamadas que el seeder de BusService y MetroService."""
+    secrets = SecretsManager()
+    app_id, app_key = secrets.get("TMB_APP_ID"), secrets.get("TMB_APP_KEY")
+    if not app_id or not app_key:
+        raise SystemExit("--from-api needs TMB_APP_ID and TMB_APP_KEY")
+    tmb = TmbApiService(app_id=app_id, app_key=app_key)
+
+    bus = []
+    for line in await tmb.get_bus_lines():
+        bus.extend(await tmb.get_bus_line_stops(line.code))
+    metro = []
+    for line in await tmb.get_metro_lines():
+        metro.extend(await tmb.get_stations_by_metro_line(line.code))
+    return {"bus_stops": bus, "metro_stations": metro}
+
+
+def synthetic_catalogue(args) -> dict:
+    rng = random.Random(args.seed)
+    return {
+        "bus_stops": [
+            BusStop.create_bus_stop(f)
+            for f in bus_features(rng, args.bus_lines, args.stops_per_line, args.physical_stops)
+        ],
+        "metro_stations": [MetroStation.create_metro_station(f) for f in metro_features(rng, args.metro_stations_per_line)],
+    }
+
+
+_legacy_classes = {}
+
+
+def _copy(value):
+    if type(value) is str:
+        return "".join(list(value)) if value else ""
+    if type(value) is float:
+        return float(repr(value))
+    return value
+
+
+def to_legacy(obj):
+    """Copia `obj` a una dataclass sin slots, sin PhysicalStop y con strings/floats sin compartir."""
+    cls = type(obj)
+    legacy_fields = fields(cls)
+    legacy_cls = _legacy_classes.get(cls)
+    if legacy_cls is None:
+        legacy_cls = make_dataclass(f"Legacy{cls.__name__}", [(f.name, f.type) for f in legacy_fields])
+        _legacy_classes[cls] = legacy_cls
+    return legacy_cls(**{f.name: _copy(getattr(obj, f.name)) for f in legacy_fields})
+
+
+def deep_size(root) -> int:
+    """Bytes de todos los objetos alcanzables desde `root`, contando cada objeto una vez."""
+    seen = set()
+    stack = [root]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, (type, Enum)):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return total
+
+
+def check_bus_stop_keys(bus_stops: list):
+    """El registro compartido no debe aparecer en la serialización ni cambiar la de BusStop."""
+    keys = list(asdict(bus_stops[0]))
+    if keys != BUS_STOP_KEYS:
+        raise SystemExit(f"asdict(BusStop) keys changed: {keys}")
+
+
+def report(label: str, catalogue: dict):
+    print(f"\n{label}")
+    total = 0
+    for name, objects in catalogue.items():
+        size = deep_size(objects)
+        total += size
+        print(f"  {name:<14} {len(objects):>8} objs  {size / 1024 / 1024:8.2f} MiB  {size / max(len(objects), 1):7.0f} B/obj")
+    print(f"  {'total':<14} {'':>8}       {total / 1024 / 1024:8.2f} MiB")
+    return total
+
+
+def main(args):
+    current = asyncio.run(api_catalogue()) if args.from_api else synthetic_catalogue(args)
+    gc.collect()
+    bus = current["bus_stops"]
+    check_bus_stop_keys(bus)
+    print(f"Catalogue: {'TMB API' if args.from_api else 'synthetic'}, {len(bus)} bus stop entries over "
+          f"{len({stop.code for stop in bus})} physical stops, {len(current['metro_stations'])} metro stations")
+
+    legacy = {name: [to_legacy(obj) for obj in objects] for name, objects in current.items()}
+
+    legacy_total = report("Legacy (dict dataclasses, unshared strings and floats)", legacy)
+    current_total = report("Current (slots, interned strings, shared PhysicalStop)", current)
+    print(f"\nSaved {(legacy_total - current_total) / 1024 / 1024:.2f} MiB ({1 - current_total / legacy_total:.0%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from-api", action="store_true", help="load the real catalogue from the TMB API")
+    parser.add_argument("--bus-lines", type=int, default=110)
+    parser.add_argument("--stops-per-line", type=int, default=120)
+    parser.add_argument("--physical-stops", type=int, default=2500)
+    parser.add_argument("--metro-stations-per-line", type=int, default=25)
+    parser.add_argument("--seed", type=int, default=42)
+    main(parser.parse_args())
@@ -0,0 +1,95 @@
+"""
+Event-loop lag with CPU-heavy work inline vs offloaded (providers/helpers/cpu_offload.py).
+
+Runs the work the bot offloads to the process pool (GTFS stop_times CSV parsing and
+LZString map payload encoding) in a loop while LoopLagMonitor samples the event
+loop, and prints the monitor snapshot.
+
+- --inline calls the functions directly on the event loop (the behaviour before
+  run_cpu_bound existed).
+- By default they go through run_cpu_bound, as in the bot.
+
+Usage:
+    python scripts/benchmark_loop_lag.py --inline
+    python scripts/benchmark_loop_lag.py
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from providers.helpers.cpu_offload import LoopLagMonitor, offload_metrics, run_cpu_bound, shutdown_pools
+from providers.helpers.gtfs_store import read_gtfs_csv
+from providers.helpers.payload_codec import encode_payload
+
+
+def stop_times_csv(rng: random.Random, rows: int) -> str:
+    lines = ["trip_id,arrival_time,departure_time,stop_id,stop_sequence"]
+    for i in range(rows):
+        hour, minute = rng.randint(5, 25), rng.randint(0, 59)
+        lines.append(f"T{i // 30},{hour:02d}:{minute:02d}:00,{hour:02d}:{minute:02d}:30,S{rng.randint(1, 300)},{i % 30}")
+    return "\n".join(lines)
+
+
+def map_payload(rng: random.Random, stations: int) -> dict:
+    stops = [
+        {
+            "lat": 41.35 + rng.random() * 0.10,
+            "lon": 2.10 + rng.random() * 0.12,
+            "name": f"{1000 + i} - Parada {i} - Carrer {rng.randint(1, 400)}",
+            "line_name": f"L{rng.randint(1, 11)}",
+            "type": "metro",
+        }
+        for i in range(stations)
+    ]
+    return {"type": "near", "user_location": {"latitude": 41.387, "longitude": 2.17}, "stops": stops}
+
+
+async def workload(args, csv: str, payload: dict):
+    for _ in range(args.rounds):
+        if args.inline:
+            read_gtfs_csv("stop_times", csv)
+            encode_payload(payload, "lzstring")
+            await asyncio.sleep(0)
+        else:
+            await run_cpu_bound(read_gtfs_csv, "stop_times", csv)
+            await run_cpu_bound(encode_payload, payload, "lzstring")
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    csv = stop_times_csv(rng, args.rows)
+    payload = map_payload(rng, args.stations)
+
+    if not args.inline:
+        # Arranque del pool fuera de la medición, como en el bot (ya está caliente)
+        await run_cpu_bound(encode_payload, {"stops": []}, "binary")
+
+    monitor = LoopLagMonitor(interval=args.interval, warn_ms=float("inf"))
+    await monitor.start()
+    start = time.perf_counter()
+    await workload(args, csv, payload)
+    elapsed = time.perf_counter() - start
+    await monitor.stop()
+    shutdown_pools()
+
+    print(f"Mode: {'inline (on the event loop)' if args.inline else 'run_cpu_bound'}, "
+          f"{args.rounds} rounds of {args.rows} stop_times rows + {args.stations}-stop lzstring payload")
+    print(f"Workload time: {elapsed:.2f} s, process pool calls: {offload_metrics.process.calls}")
+    for key, value in monitor.snapshot().items():
+        print(f"{key:<22} {value:.1f}" if isinstance(value, float) else f"{key:<22} {value}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--inline", action="store_true", help="run the work on the event loop")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=200_000, help="rows in the synthetic stop_times.txt")
+    parser.add_argument("--stations", type=int, default=500, help="stops in the map payload")
+    parser.add_argument("--interval", type=float, default=0.05, help="LoopLagMonitor sampling interval (s)")
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
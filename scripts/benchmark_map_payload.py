@@ -0,0 +1,113 @@
+"""
+Benchmark of the web-app map payload codecs (providers/helpers/payload_codec.py).
+
+Builds synthetic payloads shaped like the ones TransportDataCompressor produces
+(a metro line map, a "nearby stations" map and a Bicing map) and reports, for
+every codec, the payload length (what ends up in the map.html URL) and the
+median encode time.
+
+Usage:
+    python scripts/benchmark_map_payload.py
+    python scripts/benchmark_map_payload.py --stations 1000 --repeat 20
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from providers.helpers.payload_codec import CODECS
+
+LINE_NAMES = ["🟥 L1", "🟪 L2", "🟩 L3", "🟨 L4", "🟦 L5", "🔴 V15", "🟦 H12", "🟩 T1", "🟦 R2"]
+TYPES = ["metro", "bus", "tram", "rodalies", "fgc"]
+
+
+def _coordinates(rng: random.Random):
+    return 41.35 + rng.random() * 0.10, 2.10 + rng.random() * 0.12
+
+
+def line_payload(rng: random.Random, stations: int) -> dict:
+    stops = []
+    for i in range(stations):
+        lat, lon = _coordinates(rng)
+        stops.append({
+            "lat": lat,
+            "lon": lon,
+            "name": f"{100 + i} - Estacio {i}",
+            "color": "DC241F",
+            "alert": "⚠️" if i % 9 == 0 else "",
+            "connections": "",
+        })
+    forward = [{**stop, "direction": "Fondo"} for stop in stops]
+    reverse = [{**stop, "direction": "Hospital de Bellvitge"} for stop in reversed(stops)]
+    return {"type": "metro", "line_id": "1", "line_name": "L1", "stops": forward + reverse}
+
+
+def near_payload(rng: random.Random, stations: int) -> dict:
+    stops = []
+    for i in range(stations):
+        lat, lon = _coordinates(rng)
+        stops.append({
+            "lat": lat,
+            "lon": lon,
+            "name": f"{1000 + i} - Parada {i} - Carrer {rng.randint(1, 400)}",
+            "line": rng.randint(1, 200),
+            "line_name": rng.choice(LINE_NAMES),
+            "type": rng.choice(TYPES),
+        })
+    return {"type": "near", "user_location": {"latitude": 41.3870, "longitude": 2.1700}, "stops": stops}
+
+
+def bicing_payload(rng: random.Random, stations: int) -> dict:
+    stops = []
+    for i in range(stations):
+        lat, lon = _coordinates(rng)
+        electrical, mechanical = rng.randint(0, 15), rng.randint(0, 15)
+        stops.append({
+            "lat": lat,
+            "lon": lon,
+            "name": f"{i + 1} - C/ DEL CARRER {rng.randint(1, 400)}, {rng.randint(1, 200)}",
+            "slots": rng.randint(0, 30),
+            "electrical_bikes": electrical,
+            "mechanical_bikes": mechanical,
+            "availability": electrical + mechanical,
+        })
+    return {"type": "bicing", "user_location": {"latitude": 41.3870, "longitude": 2.1700}, "stops": stops}
+
+
+def measure(encode, data: dict, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encoded = encode(data)
+        timings.append((time.perf_counter() - start) * 1000)
+    return len(encoded), statistics.median(timings)
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    payloads = {
+        "line": line_payload(rng, args.line_stations),
+        "near": near_payload(rng, args.stations),
+        "bicing": bicing_payload(rng, args.stations),
+    }
+
+    print(f"{'payload':<8} {'codec':<10} {'json B':>9} {'encoded B':>10} {'ratio':>7} {'encode ms':>10}")
+    for name, data in payloads.items():
+        json_size = len(json.dumps(data))
+        for codec, encode in CODECS.items():
+            size, ms = measure(encode, data, args.repeat)
+            print(f"{name:<8} {codec:<10} {json_size:>9} {size:>10} {size / json_size:>7.1%} {ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, default=500, help="stations in the nearby and Bicing payloads")
+    parser.add_argument("--line-stations", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    main(parser.parse_args())
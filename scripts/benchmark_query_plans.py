@@ -0,0 +1,152 @@
+"""
+Query-plan benchmark for the hot user-data queries.
+
+Creates the tables in a throwaway schema, seeds them with synthetic data and
+prints EXPLAIN ANALYZE for has_favorite / remove_favorite, get_alerts,
+get_search_history and the user_devices join. Everything runs inside a single
+transaction that is rolled back at the end, so nothing is left behind.
+
+Usage (point DATABASE_URL at a local Postgres, same as the bot):
+    python scripts/benchmark_query_plans.py
+    python scripts/benchmark_query_plans.py --users 50000 --without-indexes
+
+--without-indexes drops the indexes added by schema revision
+0001_user_data_indexes before seeding, to compare against the old plans.
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import text
+
+from providers.database.database import Base, engine
+import models  # noqa: F401  (registra las tablas en Base.metadata)
+
+SCHEMA = "bench_user_data"
+
+NEW_INDEXES = [
+    "uq_favorites_user_type_station",
+    "uq_service_incidents_external_type",
+    "ix_service_incidents_end_date",
+    "ix_search_history_user_timestamp",
+    "uq_user_devices_user_token",
+]
+
+SEED = [
+    """
+    INSERT INTO users (external_id, username, language, receive_notifications)
+    SELECT g::text, 'user_' || g, 'es', true FROM generate_series(1, :users) g
+    """,
+    """
+    INSERT INTO user_devices (user_id, token)
+    SELECT id, 'token_' || id FROM users
+    """,
+    """
+    INSERT INTO favorites (user_id, transport_type, station_code, station_name)
+    SELECT u.id, (ARRAY['metro','bus','tram','rodalies','fgc','bicing'])[1 + (f % 6)], (100 + f)::text, 'Station ' || f
+    FROM users u CROSS JOIN generate_series(1, :favorites) f
+    """,
+    """
+    INSERT INTO search_history (user_id, query, timestamp)
+    SELECT u.id, 'query ' || s, now() - (s || ' minutes')::interval
+    FROM users u CROSS JOIN generate_series(1, :searches) s
+    """,
+    """
+    INSERT INTO service_incidents (external_id, transport_type, begin_date, end_date, status, cause)
+    SELECT g::text, (ARRAY['metro','bus','tram','rodalies','fgc'])[1 + (g % 5)],
+           now() - interval '30 days',
+           CASE WHEN g % 20 = 0 THEN NULL ELSE now() - ((g % 30) || ' days')::interval END,
+           'ACTIVE', 'bench'
+    FROM generate_series(1, :alerts) g
+    """,
+]
+
+QUERIES = {
+    "has_favorite / remove_favorite": """
+        SELECT 1 FROM favorites
+        WHERE user_id = :user_pk AND transport_type = 'metro' AND station_code = '106'
+    """,
+    "favorites by user (join)": """
+        SELECT f.* FROM favorites f JOIN users u ON u.id = f.user_id
+        WHERE u.external_id = :user_ext
+    """,
+    "register_alert conflict check": """
+        SELECT id FROM service_incidents
+        WHERE external_id = '42' AND transport_type = 'tram'
+    """,
+    "get_alerts(only_active=True)": """
+        SELECT * FROM service_incidents
+        WHERE end_date IS NULL OR end_date > now()
+    """,
+    "get_search_history": """
+        SELECT query FROM search_history
+        WHERE user_id = :user_pk ORDER BY timestamp DESC LIMIT 10
+    """,
+    "devices join": """
+        SELECT d.token FROM users u LEFT JOIN user_devices d ON u.id = d.user_id
+        WHERE u.id = :user_pk
+    """,
+}
+
+
+async def main(args):
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+            await conn.execute(text(f"SET LOCAL search_path TO {SCHEMA}"))
+            await conn.run_sync(Base.metadata.create_all)
+            # Tablas particionadas: una partición DEFAULT basta para el benchmark
+            for table in ("audit_trail", "search_history"):
+                await conn.execute(text(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT"))
+
+            if args.without_indexes:
+                for index_name in NEW_INDEXES:
+                    await conn.execute(text(f"DROP INDEX IF EXISTS {SCHEMA}.{index_name}"))
+
+            params = {
+                "users": args.users,
+                "favorites": args.favorites,
+                "searches": args.searches,
+                "alerts": args.alerts,
+            }
+            for statement in SEED:
+                await conn.execute(text(statement), params)
+            await conn.execute(text("ANALYZE"))
+
+            user_pk = args.users // 2
+            query_params = {"user_pk": user_pk, "user_ext": str(user_pk)}
+
+            print(f"Indexes: {'old schema (without new indexes)' if args.without_indexes else 'revision 0001'}")
+            print(f"Rows:    {args.users} users, {args.users * args.favorites} favorites, "
+                  f"{args.users * args.searches} searches, {args.alerts} alerts\n")
+
+            for name, query in QUERIES.items():
+                result = await conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {query}"), query_params)
+                plan = [row[0] for row in result]
+                exec_time = next((m.group(1) for line in plan if (m := re.search(r"Execution Time: ([\d.]+)", line))), "?")
+                print(f"=== {name} ({exec_time} ms)")
+                if args.verbose:
+                    print("\n".join(plan))
+                else:
+                    print(plan[0])
+                print()
+        finally:
+            await trans.rollback()
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE for the hot user-data queries")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--favorites", type=int, default=8, help="favorites per user")
+    parser.add_argument("--searches", type=int, default=20, help="searches per user")
+    parser.add_argument("--alerts", type=int, default=5000)
+    parser.add_argument("--without-indexes", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="print full plans")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,142 @@
+"""
+Load test for the UserDataManager favorites cache.
+
+Simulates N users watching a station (the update loop calls `has_favorite`
+every UPDATE_INTERVAL seconds) and reports latency percentiles. Watchers start
+at a random offset within the interval, like the real update loops, and the
+first call of each watcher (which always loads from the database) is reported
+apart from the steady state.
+
+Usage (needs DATABASE_URL, same as the bot):
+    python scripts/load_test_favorites.py --watchers 1000 --duration 30 --seed-users
+    python scripts/load_test_favorites.py --watchers 1000 --duration 30 --seed-users --cold
+
+--seed-users inserts one user per watcher (USER_PREFIX<i>) with
+FAVORITES_PER_USER metro favorites, one of them the watched station, and
+deletes them when the run ends. Without it the users must already exist;
+unknown users have no favorites and skew the numbers.
+
+--cold invalidates the cache before every call, so every tick hits the
+database (one favorites-by-user query per call).
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import delete, insert, select
+
+from providers.manager.user_data_manager import UserDataManager
+from providers.database.database import AsyncSessionLocal
+from models import Favorite, User
+
+FAVORITES_PER_USER = 5
+STATION_CODES = 50
+
+
+def station_for(i: int) -> str:
+    return str(100 + i % STATION_CODES)
+
+
+async def seed_users(prefix: str, count: int) -> list:
+    """Crea los usuarios del test y devuelve sus external_id, los únicos que borra delete_users."""
+    external_ids = [f"{prefix}{i}" for i in range(count)]
+    async with AsyncSessionLocal() as session:
+        await session.execute(insert(User), [
+            {"external_id": external_id, "username": external_id, "language": "es", "receive_notifications": True}
+            for external_id in external_ids
+        ])
+        rows = await session.execute(select(User.id, User.external_id).where(User.external_id.in_(external_ids)))
+        internal_ids = {external_id: user_id for user_id, external_id in rows}
+        await session.execute(insert(Favorite), [
+            {
+                "user_id": internal_ids[external_ids[i]],
+                "transport_type": "metro",
+                "station_code": station_for(i + k),
+                "station_name": f"Estacio {station_for(i + k)}",
+            }
+            for i in range(count) for k in range(FAVORITES_PER_USER)
+        ])
+        await session.commit()
+    print(f"Seeded {count} users x {FAVORITES_PER_USER} favorites")
+    return external_ids
+
+
+async def delete_users(external_ids: list):
+    # Por external_id exacto: un LIKE con el prefijo ("_" es comodín) podría borrar usuarios reales
+    async with AsyncSessionLocal() as session:
+        user_ids = select(User.id).where(User.external_id.in_(external_ids)).scalar_subquery()
+        await session.execute(delete(Favorite).where(Favorite.user_id.in_(user_ids)))
+        await session.execute(delete(User).where(User.external_id.in_(external_ids)))
+        await session.commit()
+
+
+async def watcher(manager: UserDataManager, user_id: str, station_code: str, interval: float, offset: float,
+                  deadline: float, cold: bool, first_calls: list, latencies: list):
+    await asyncio.sleep(offset)
+    samples = first_calls
+    while time.monotonic() < deadline:
+        if cold:
+            manager.invalidate_favorites(user_id)
+        start = time.perf_counter()
+        await manager.has_favorite(user_id, "metro", station_code)
+        samples.append((time.perf_counter() - start) * 1000)
+        samples = latencies
+        await asyncio.sleep(interval)
+
+
+def report(label: str, latencies: list):
+    if not latencies:
+        print(f"{label:<12} no calls")
+        return
+    latencies.sort()
+    percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+    print(
+        f"{label:<12} calls={len(latencies)} mean={statistics.mean(latencies):.3f} ms "
+        f"p50={percentile(0.50):.3f} ms p95={percentile(0.95):.3f} ms "
+        f"p99={percentile(0.99):.3f} ms max={latencies[-1]:.3f} ms"
+    )
+
+
+async def main(args):
+    seeded = await seed_users(args.user_prefix, args.watchers) if args.seed_users else []
+    try:
+        await run(args)
+    finally:
+        if seeded:
+            await delete_users(seeded)
+
+
+async def run(args):
+    manager = UserDataManager()
+    rng = random.Random(args.rng_seed)
+    first_calls, latencies = [], []
+    deadline = time.monotonic() + args.duration
+
+    tasks = [
+        watcher(manager, f"{args.user_prefix}{i}", station_for(i), args.interval, rng.uniform(0, args.interval),
+                deadline, args.cold, first_calls, latencies)
+        for i in range(args.watchers)
+    ]
+    await asyncio.gather(*tasks)
+
+    print(f"Mode: {'cold (DB every tick)' if args.cold else 'cached'}, watchers: {args.watchers}")
+    report("First call", first_calls)
+    report("Steady", latencies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Favorites cache load test")
+    parser.add_argument("--watchers", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--interval", type=float, default=5)
+    parser.add_argument("--user-prefix", default="loadtest_")
+    parser.add_argument("--rng-seed", type=int, default=42)
+    parser.add_argument("--seed-users", action="store_true", help="create the watcher users and delete them afterwards")
+    parser.add_argument("--cold", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -7,7 +7,10 @@ from typing import List
 from telegram import Update
 from telegram.ext import CallbackContext
 from telegram.constants import ParseMode
+from providers.database.database import get_pool_metrics
 from providers.helpers import logger
+from providers.helpers.cpu_offload import get_offload_metrics
+from providers.helpers.resilience import get_provider_metrics
 
 
 class AdminHandler:
@@ -132,6 +135,59 @@ class AdminHandler:
         logger.info(f"Admin {user_id} requested uptime: {msg}")
         await update.message.reply_text(msg)
 
+    async def db_stats_command(self, update: Update, context: CallbackContext):
+        user_id = update.effective_user.id
+        if user_id not in self.admin_ids:
+            logger.warning(f"Unauthorized user {user_id} tried to access /dbstats")
+            return
+
+        metrics = get_pool_metrics()
+        lines = [
+            f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}"
+            for key, value in metrics.items()
+        ]
+
+        stats_text = html.escape("\n".join(lines))
+
+        logger.info(f"Admin {user_id} requested database pool metrics")
+        await update.message.reply_text(f"<pre>{stats_text}</pre>", parse_mode="HTML")
+
+    async def loop_stats_command(self, update: Update, context: CallbackContext):
+        user_id = update.effective_user.id
+        if user_id not in self.admin_ids:
+            logger.warning(f"Unauthorized user {user_id} tried to access /loopstats")
+            return
+
+        metrics = get_offload_metrics()
+        lines = [
+            f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}"
+            for key, value in metrics.items()
+        ]
+
+        stats_text = html.escape("\n".join(lines))
+
+        logger.info(f"Admin {user_id} requested event loop metrics")
+        await update.message.reply_text(f"<pre>{stats_text}</pre>", parse_mode="HTML")
+
+    async def providers_command(self, update: Update, context: CallbackContext):
+        user_id = update.effective_user.id
+        if user_id not in self.admin_ids:
+            logger.warning(f"Unauthorized user {user_id} tried to access /providers")
+            return
+
+        lines = []
+        for provider, metrics in get_provider_metrics().items():
+            lines.append(f"[{provider}]")
+            lines.extend(
+                f"  {key}: {value:.2f}" if isinstance(value, float) else f"  {key}: {value}"
+                for key, value in metrics.items()
+            )
+
+        stats_text = html.escape("\n".join(lines) or "No provider calls yet")
+
+        logger.info(f"Admin {user_id} requested provider health metrics")
+        await update.message.reply_text(f"<pre>{stats_text}</pre>", parse_mode="HTML")
+
     async def deploy(self, update: Update, context: CallbackContext):
         user_id = update.effective_user.id
         if user_id not in self.admin_ids:
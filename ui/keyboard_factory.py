@@ -1,6 +1,9 @@
-import re
+import os
+from collections import OrderedDict
+from urllib.parse import quote
+from functools import wraps
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton, WebAppInfo
-from typing import List
+from typing import Any, Callable, Hashable, List
 
 from domain.api.favorite_model import FavoriteItem
 from domain.metro import MetroLine, MetroStation, MetroAccess
@@ -11,37 +14,101 @@ from domain.transport_type import TransportType
 from domain.fgc import FgcLine, FgcStation
 from domain.callbacks import Callbacks
 
-from providers.helpers.utils import Utils
 from providers.manager import LanguageManager
 from providers.helpers import DistanceHelper, GoogleMapsHelper
+from providers.helpers.station_tiles import MAP_TILES_URL
+from application.services.transport.service_base import ServiceBase
+
+KEYBOARD_CACHE_SIZE = int(os.getenv("KEYBOARD_CACHE_SIZE", 512))
+
+
+class MarkupCache:
+    """
+    LRU de teclados ya construidos. Los objetos de telegram son inmutables (PTB >= 20),
+    así que el mismo markup se puede enviar a cualquier usuario.
+    """
+
+    def __init__(self, max_entries: int = KEYBOARD_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # clave -> (markup, elementos). Los elementos se guardan para que sus id() no se reutilicen
+        self._entries: OrderedDict = OrderedDict()
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Any], items: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        markup = build()
+        self._entries[key] = (markup, items)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return markup
+
+    def clear(self):
+        self._entries.clear()
+
+
+_NO_ITEMS = object()
+
+
+def _items_version(items) -> tuple:
+    """
+    Versión de los elementos que pinta el menú sin recorrer sus campos: la identidad de cada
+    objeto (los servicios crean objetos nuevos al refrescar su caché) y
+    ServiceBase.alerts_version, que cambia cuando se reescriben las alertas de objetos ya cacheados.
+    """
+    if isinstance(items, dict):
+        return tuple(items.items())
+    return ServiceBase.alerts_version, tuple(map(id, items))
+
+
+def cached_markup(track_items: bool = False):
+    """
+    Cachea el teclado por (menú, idioma, argumentos) y, con `track_items`, por la versión
+    de los elementos del primer argumento. Cuando el servicio refresca su caché (nuevas
+    alertas, estaciones...) cambia la versión y el teclado se reconstruye; mientras tanto
+    se reutiliza el mismo objeto.
+    Solo para menús que se repiten entre usuarios: un teclado que depende de la ubicación o
+    de datos en tiempo real no se cachea, porque solo expulsaría entradas útiles del LRU.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, items=_NO_ITEMS, *args):
+            if items is _NO_ITEMS:
+                call_args, version = args, ()
+            else:
+                call_args, version = (items, *args), _items_version(items) if track_items else ()
+            key = (method.__name__, self.language_manager.current_language(), args, version)
+            return self.markup_cache.get_or_build(key, lambda: method(self, *call_args), items if track_items else None)
+        return wrapper
+    return decorator
+
 
 class KeyboardFactory:
 
     BACK_TO_MENU_CALLBACK = "back_to_menu"
 
+    @cached_markup()
     def location_keyboard(self):
         keyboard = [[KeyboardButton(self.language_manager.t('results.location.btn'), request_location=True)], [KeyboardButton(self.language_manager.t('keyboard.back'))]]
         return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
 
     def __init__(self, language_manager: LanguageManager):
         self.language_manager = language_manager
+        self.markup_cache = MarkupCache()
     
     def _chunk_buttons(self, buttons, n=2):
         return [buttons[i:i + n] for i in range(0, len(buttons), n)]
     
     def _custom_sort_key(self, line: str):
-        # Buscar número y sufijo opcional
-        match = re.match(r"L(\d+)([A-Z]?)", line.name)
-        if not match:
-            return (999, "")  # Los que no encajan van al final
-
-        num = int(match.group(1))          # Número principal
-        suffix = match.group(2) or ""      # Sufijo opcional
-
-        # Queremos que los que no tienen sufijo vayan después de N/S
-        suffix_order = {"N": 0, "S": 1, "": 2}
-        return (num, suffix_order.get(suffix, 3))
+        return line.sort_key
     
+    @cached_markup()
     def create_main_menu_replykeyboard(self):
         """Teclado principal como ReplyKeyboard."""
         keyboard = [
@@ -64,6 +131,7 @@ class KeyboardFactory:
             one_time_keyboard=False
         )
     
+    @cached_markup()
     def settings_replykeyboard(self):
         keyboard = [
             [KeyboardButton(self.language_manager.t('settings.notifications')),
@@ -82,16 +150,18 @@ class KeyboardFactory:
     
     # === LINES ===
     
+    @cached_markup(track_items=True)
     def metro_lines_menu(self, metro_lines: List[MetroLine]) -> InlineKeyboardMarkup:
-        sorted_lines = sorted(metro_lines, key=Utils.sort_lines)
+        # MetroService ya devuelve las líneas ordenadas
         buttons = [
             InlineKeyboardButton(f"{line.name_with_emoji} {'⚠️' if line.has_alerts else ''}  ", callback_data=Callbacks.METRO_LINE.format(line_code=line.code, line_name=line.name))
-            for line in sorted_lines
+            for line in metro_lines
         ]
 
         rows = self._chunk_buttons(buttons, 3)
         return InlineKeyboardMarkup(rows)
     
+    @cached_markup()
     def bus_category_menu(self, lines): #Do not delete lines, it's used for compliance at handler base
         keyboard = [
             InlineKeyboardButton('🟣 D', callback_data=Callbacks.BUS_CATEGORY_D.value),
@@ -108,6 +178,7 @@ class KeyboardFactory:
         rows = self._chunk_buttons(keyboard, 2)
         return InlineKeyboardMarkup(rows)
     
+    @cached_markup(track_items=True)
     def bus_lines_menu(self, bus_lines: List[BusLine]):
         buttons = [
             InlineKeyboardButton(f"{line.name} {'⚠️' if line.has_alerts else ''}  ", callback_data=Callbacks.BUS_LINE.format(line_code=line.code, line_name=line.name))
@@ -117,6 +188,7 @@ class KeyboardFactory:
         rows = self._chunk_buttons(buttons, 3)
         return InlineKeyboardMarkup(rows)
     
+    @cached_markup(track_items=True)
     def tram_lines_menu(self, tram_lines: List[TramLine]) -> InlineKeyboardMarkup:
         buttons = [
             InlineKeyboardButton(f"{line.name_with_emoji} {'⚠️' if line.has_alerts else ''}  ", callback_data=Callbacks.TRAM_LINE.format(line_code=line.id, line_name=line.name))
@@ -125,6 +197,7 @@ class KeyboardFactory:
         rows = self._chunk_buttons(buttons, 3)
         return InlineKeyboardMarkup(rows)
     
+    @cached_markup(track_items=True)
     def rodalies_lines_menu(self, rodalies_lines: List[RodaliesLine])-> InlineKeyboardMarkup:
         buttons = [
             InlineKeyboardButton(f" {'⚠️ ' if line.has_alerts else ''}{line.name_with_emoji}  ", callback_data=Callbacks.RODALIES_LINE.format(line_code=line.id))
@@ -133,6 +206,7 @@ class KeyboardFactory:
         rows = self._chunk_buttons(buttons, 3)
         return InlineKeyboardMarkup(rows)
     
+    @cached_markup(track_items=True)
     def fgc_lines_menu(self, fgc_lines: List[FgcLine])-> InlineKeyboardMarkup:
         buttons = [
             InlineKeyboardButton(f" {'⚠️ ' if line.has_alerts else ''}{line.name_with_emoji}  ", callback_data=Callbacks.FGC_LINE.format(line_code=line.id, line_name=line.name))
@@ -143,6 +217,7 @@ class KeyboardFactory:
 
     # === STATIONS / STOPS ===
 
+    @cached_markup(track_items=True)
     def metro_stations_menu(self, metro_stations: List[MetroStation], line_id):
         buttons = [
             InlineKeyboardButton(f"{metro_station.order}. {metro_station.name} {'⚠️' if metro_station.has_alerts else ''}  ", callback_data=Callbacks.METRO_STATION.format(line_code=line_id, station_code=metro_station.code))
@@ -151,6 +226,7 @@ class KeyboardFactory:
         rows = self._chunk_buttons(buttons, 2)
         return InlineKeyboardMarkup(rows)
     
+    @cached_markup(track_items=True)
     def tram_stops_menu(self, tram_stops: List[TramStation], line_id):
         buttons = [
             InlineKeyboardButton(f"{tram_stop.order}. {tram_stop.name}  ", callback_data=Callbacks.TRAM_STATION.format(line_code=line_id, station_code=tram_stop.id))
@@ -159,6 +235,7 @@ class KeyboardFactory:
         rows = self._chunk_buttons(buttons, 2)
         return InlineKeyboardMarkup(rows)
     
+    @cached_markup(track_items=True)
     def fgc_stations_menu(self, fgc_stations: List[FgcStation], line_id):
         buttons = [
             InlineKeyboardButton(f"{fgc_station.order}. {fgc_station.name} {'⚠️' if fgc_station.has_alerts else ''}  ", callback_data=Callbacks.FGC_STATION.format(line_code=line_id, station_code=fgc_station.id))
@@ -167,6 +244,7 @@ class KeyboardFactory:
         rows = self._chunk_buttons(buttons, 2)
         return InlineKeyboardMarkup(rows)
     
+    @cached_markup(track_items=True)
     def metro_station_access_menu(self, station_accesses: List[MetroAccess]):
         buttons = [
             InlineKeyboardButton(
@@ -178,11 +256,15 @@ class KeyboardFactory:
         rows = self._chunk_buttons(buttons, 2)
         return InlineKeyboardMarkup(rows)    
     
-    def map_reply_menu(self, encoded):
+    def map_reply_menu(self, encoded, tile_layers: List[str] = None):
+        """`tile_layers`: capas que map.html carga por teselas según el área visible (si MAP_TILES_URL está configurada)."""
+        url = f"https://mg-diego.github.io/BCN-Transit-Bot/map.html?data={encoded}"
+        if tile_layers and MAP_TILES_URL:
+            url += f"&tiles={quote(MAP_TILES_URL, safe='')}&layers={','.join(tile_layers)}"
         keyboard = [
             [KeyboardButton(
                 text=self.language_manager.t('keyboard.map'),
-                web_app=WebAppInfo(url=f"https://mg-diego.github.io/BCN-Transit-Bot/map.html?data={encoded}"),
+                web_app=WebAppInfo(url=url),
             )],
             [KeyboardButton(self.language_manager.t('keyboard.back'))]
         ]
@@ -193,6 +275,7 @@ class KeyboardFactory:
             one_time_keyboard=False
         )
     
+    @cached_markup()
     def help_menu(self):
         return InlineKeyboardMarkup([self._back_button(self.BACK_TO_MENU_CALLBACK)])
     
@@ -313,6 +396,7 @@ class KeyboardFactory:
     def restart_search_button(self, callback):
         return InlineKeyboardMarkup([[InlineKeyboardButton(self.language_manager.t('common.reload.btn'), callback_data=callback)]])
     
+    @cached_markup()
     def _back_reply_button(self):
         """Teclado principal como ReplyKeyboard."""
         keyboard = [
@@ -329,6 +413,7 @@ class KeyboardFactory:
         locale_key, bool_value = ('disable', False) if enabled_notifications else ('enable', True)
         return InlineKeyboardMarkup([[InlineKeyboardButton(self.language_manager.t(f'keyboard.notifications.{locale_key}'), callback_data=Callbacks.SET_RECEIVE_NOTIFICATIONS.format(value=bool_value))]])
     
+    @cached_markup(track_items=True)
     def language_menu(self, available_languages: dict):
         buttons = [
             InlineKeyboardButton(name, callback_data=Callbacks.SET_LANGUAGE.format(language_code=code))
@@ -31,8 +31,8 @@ class MenuHandler:
             await self.update_manager.start_loading(update, context, base_text=self.language_manager.t('main.menu.loading'))
             user_id = self.message_service.get_user_id(update)
             await self.user_data_manager.register_user(ClientType.TELEGRAM.value, user_id, self.message_service.get_username(update))
-            user_language = await self.user_data_manager.get_user_language(user_id)
-            self.language_manager.set_language(user_language)
+            # Usuario recién registrado: el pre-handler aún no conocía su idioma
+            self.language_manager.set_language(await self.user_data_manager.get_user_language(user_id))
             await self.update_manager.stop_loading(update, context)
 
         await self.message_service.send_message_direct(self.message_service.get_chat_id(update), context, self.language_manager.t('main.menu.message'), reply_markup=self.keyboard_factory.create_main_menu_replykeyboard())
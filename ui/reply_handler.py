@@ -3,6 +3,8 @@ from domain.bicing import BicingStation
 from domain.common.location import Location
 from domain.transport_type import TransportType
 from providers.helpers.distance_helper import DistanceHelper
+from providers.helpers.station_catalogue import STATION_CATALOGUE_ENABLED, get_station_catalogue
+from providers.helpers.station_tiles import MAP_TILES_URL, TILE_LAYER_BICING, TILE_LAYER_STATIONS
 from providers.manager import audit_action
 from telegram import Update
 from telegram.ext import (
@@ -94,11 +96,30 @@ class ReplyHandler:
             self.current_search = None
         else:
             await message_service.send_new_message(update, language_manager.t('results.location.received'))
-            metro_stations, bus_stops, tram_stops, rodalies_stations, bicing_stations, fgc_stations = await self._search_stations('', only_bicing=False)
-            near_stops = DistanceHelper.build_stops_list(metro_stations, bus_stops, tram_stops, rodalies_stations, bicing_stations, fgc_stations, user_location, results_to_return=999999, max_distance_km=0.5)
-            encoded = self.mapper.map_near_stations(near_stops, user_location)
-            
-            await message_service.send_new_message(update, language_manager.t('common.map.open'), keyboard_factory.map_reply_menu(encoded))
+            if MAP_TILES_URL:
+                # El mapa carga las estaciones por teselas: la URL solo lleva la ubicación
+                encoded = await self.mapper.map_near_stations([], user_location)
+                tile_layers = [TILE_LAYER_STATIONS, TILE_LAYER_BICING]
+            else:
+                if STATION_CATALOGUE_ENABLED:
+                    catalogue, bicing_stations = await asyncio.gather(
+                        get_station_catalogue(
+                            self.metro_handler.metro_service,
+                            self.bus_handler.bus_service,
+                            self.tram_handler.tram_service,
+                            self.rodalies_handler.rodalies_service,
+                            self.fgc_handler.fgc_service
+                        ),
+                        self.bicing_handler.bicing_service.get_all_stations()
+                    )
+                    near_stops = DistanceHelper.build_nearby_stops_list(catalogue, bicing_stations, user_location, results_to_return=999999, max_distance_km=0.5)
+                else:
+                    metro_stations, bus_stops, tram_stops, rodalies_stations, bicing_stations, fgc_stations = await self._search_stations('', only_bicing=False)
+                    near_stops = DistanceHelper.build_stops_list(metro_stations, bus_stops, tram_stops, rodalies_stations, bicing_stations, fgc_stations, user_location, results_to_return=999999, max_distance_km=0.5)
+                encoded = await self.mapper.map_near_stations(near_stops, user_location)
+                tile_layers = None
+
+            await message_service.send_new_message(update, language_manager.t('common.map.open'), keyboard_factory.map_reply_menu(encoded, tile_layers))
 
 
     @audit_action(action_type="REPLY_ROUTER", params_args=["user_location", "only_bicing"])
@@ -168,8 +189,13 @@ class ReplyHandler:
                 )
                 for stop in stops_with_distance
             ]
-            encoded = self.mapper.map_bicing_stations(near_bicing_stations, user_location)
-            await message_service.send_new_message(update, language_manager.t('results.location.received'), keyboard_factory.map_reply_menu(encoded))
+            if MAP_TILES_URL:
+                encoded = await self.mapper.map_bicing_stations([], user_location)
+                tile_layers = [TILE_LAYER_BICING]
+            else:
+                encoded = await self.mapper.map_bicing_stations(near_bicing_stations, user_location)
+                tile_layers = None
+            await message_service.send_new_message(update, language_manager.t('results.location.received'), keyboard_factory.map_reply_menu(encoded, tile_layers))
             self.current_search = self.previous_search
             msg = language_manager.t('bicing.station.near')
 
@@ -18,13 +18,20 @@ class LanguageHandler:
         self.language_manager = language_manager
         self.update_manager = update_manager
 
+    async def apply_user_language(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Pre-handler (grupo -1): fija el idioma del usuario para todo el update en curso."""
+        if update.effective_user is None:
+            # Sin concurrent_updates todos los updates comparten contexto: no heredar el idioma del anterior
+            self.language_manager.set_language(None)
+            return
+        self.language_manager.set_language(await self.user_data_manager.get_user_language(update.effective_user.id))
+
     @audit_action(action_type="SHOW_LANGUAGES")
     async def show_languages(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_id, chat_id, line_id, stop_id = self.message_service.extract_context(update, context)
 
         await self.update_manager.start_loading(update, context, self.language_manager.t('main.menu.loading'), self.keyboard_factory._back_reply_button())
-        user_id = self.message_service.get_user_id(update)
-        current_language = await self.user_data_manager.get_user_language(user_id)
+        current_language = self.language_manager.current_language()
         available_languages = self.language_manager.get_available_languages()
 
         user_available_new_languages = {}
@@ -11,6 +11,7 @@ from providers.manager import LanguageManager, UserDataManager, audit_action
 
 
 class BicingHandler(HandlerBase):
+    PROVIDERS = ("bicing",)
 
     def __init__(
         self,
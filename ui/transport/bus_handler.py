@@ -15,6 +15,8 @@ from domain.transport_type import TransportType
 from .handler_base import HandlerBase
 
 class BusHandler(HandlerBase):
+    PROVIDERS = ("tmb",)
+
     def __init__(
         self,
         keyboard_factory: KeyboardFactory,
@@ -57,7 +59,7 @@ class BusHandler(HandlerBase):
 
         line = await self.bus_service.get_line_by_id(line_id)
         stops = await self.bus_service.get_stops_by_line(line_id)
-        encoded = self.mapper.map_bus_stops(stops, line_id, line.name)
+        encoded = await self.mapper.map_bus_stops(stops, line_id, line.name)
 
         if any(line.alerts):
             line_alerts_url = self.telegraph_service.create_page(f'Bus {line.name}: Alerts', line.alerts)
@@ -77,7 +79,7 @@ class BusHandler(HandlerBase):
         default_callback = Callbacks.BUS_STATION.format(line_code=line_id, station_code=bus_stop_code)
 
         bus_stop = await self.bus_service.get_stop_by_code(bus_stop_code)
-        station_alerts = BusStop.get_alert_by_language(bus_stop, await self.user_data_manager.get_user_language(user_id))
+        station_alerts = BusStop.get_alert_by_language(bus_stop, self.language_manager.current_language())
         alerts_message = f"{self.language_manager.t("common.alerts")}\n{station_alerts}\n\n" if any(station_alerts) else ""
         
         message = await self.show_stop_intro(update, context, TransportType.BUS.value, line_id, bus_stop_code, bus_stop.name)
@@ -85,19 +87,20 @@ class BusHandler(HandlerBase):
         await self.bus_service.get_stop_routes(bus_stop.code)
         await self.update_manager.stop_loading(update, context)
 
+        screen = self.arrival_screen(
+            f"{self.language_manager.t(f'{TransportType.BUS.value}.stop.name', name=bus_stop.name.upper())}\n\n"
+            f"{alerts_message}"
+            f"<a href='{GoogleMapsHelper.build_directions_url(latitude=bus_stop.latitude, longitude=bus_stop.longitude)}'>{self.language_manager.t('common.map.view.location')}</a>\n\n"
+            f"{self.language_manager.t(f'{TransportType.BUS.value}.stop.next')}\n"
+        )
+
         async def update_text():
             next_buses = "\n\n".join(
-                    LineRoute.simple_list(route, arriving_threshold=60,default_msg=self.language_manager.t('no.departures.found'))
+                    LineRoute.simple_list(route, arriving_threshold=60, default_msg=screen.no_departures)
                     for route in await self.bus_service.get_stop_routes(bus_stop.code)
                 )
             is_fav = await self.user_data_manager.has_favorite(user_id, TransportType.BUS.value, bus_stop_code)
-            text = (
-                f"{self.language_manager.t(f'{TransportType.BUS.value}.stop.name', name=bus_stop.name.upper())}\n\n"
-                f"{alerts_message}"
-                f"<a href='{GoogleMapsHelper.build_directions_url(latitude=bus_stop.latitude, longitude=bus_stop.longitude)}'>{self.language_manager.t('common.map.view.location')}</a>\n\n"
-                f"{self.language_manager.t(f'{TransportType.BUS.value}.stop.next')}\n{next_buses.replace('🔜', self.language_manager.t('common.arriving'))}\n\n"
-                f"{self.language_manager.t('common.updates.every_x_seconds', seconds=self.UPDATE_INTERVAL)}"
-            )
+            text = screen.render(next_buses)
             keyboard = self.keyboard_factory.update_menu(is_fav, TransportType.BUS.value, bus_stop_code, line_id, default_callback, has_connections=False)
             return text, keyboard
 
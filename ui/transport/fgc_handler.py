@@ -18,6 +18,8 @@ class FgcHandler(HandlerBase):
     Handles metro-related user interactions in the bot.
     """
 
+    PROVIDERS = ("fgc", "moute")
+
     def __init__(
         self,
         keyboard_factory: KeyboardFactory,
@@ -53,7 +55,7 @@ class FgcHandler(HandlerBase):
 
         line = await self.fgc_service.get_line_by_id(line_id)
         stations = await self.fgc_service.get_stations_by_line(line_id)
-        encoded = self.mapper.map_fgc_stations(stations, line)
+        encoded = await self.mapper.map_fgc_stations(stations, line)
 
         await self.message_service.send_new_message_from_callback(
             update=update,
@@ -81,16 +83,17 @@ class FgcHandler(HandlerBase):
         await self.fgc_service.get_station_routes(fgc_station.code)
         await self.update_manager.stop_loading(update, context)
         
+        screen = self.arrival_screen(
+            f"{self.language_manager.t(f'{TransportType.FGC.value}.station.name', name=fgc_station.name.upper())}\n\n"
+            f"<a href='{GoogleMapsHelper.build_directions_url(latitude=fgc_station.latitude, longitude=fgc_station.longitude, travel_mode='transit')}'>{self.language_manager.t('common.map.view.location')}</a>\n\n"
+            f"{self.language_manager.t(f'{TransportType.FGC.value}.station.next')}\n"
+        )
+
         async def update_text():
             next_fgc = "\n\n".join(LineRoute.scheduled_list(route) for route in await self.fgc_service.get_station_routes(fgc_station.code) if route.line_id == line_id)
-            next_fgc = next_fgc if next_fgc != '' else self.language_manager.t('no.departures.found')
+            next_fgc = next_fgc if next_fgc != '' else screen.no_departures
             is_fav = await self.user_data_manager.has_favorite(user_id, TransportType.FGC.value, fgc_station_id)
-            text = (
-                f"{self.language_manager.t(f'{TransportType.FGC.value}.station.name', name=fgc_station.name.upper())}\n\n"
-                f"<a href='{GoogleMapsHelper.build_directions_url(latitude=fgc_station.latitude, longitude=fgc_station.longitude, travel_mode='transit')}'>{self.language_manager.t('common.map.view.location')}</a>\n\n"
-                f"{self.language_manager.t(f'{TransportType.FGC.value}.station.next')}\n{next_fgc.replace('🔜', self.language_manager.t('common.arriving'))}\n\n"
-                f"{self.language_manager.t('common.updates.every_x_seconds', seconds=self.UPDATE_INTERVAL)}"
-            ) 
+            text = screen.render(next_fgc)
             keyboard = self.keyboard_factory.update_menu(is_fav, TransportType.FGC.value, fgc_station_id, line_id, default_callback, has_connections=False)
             return text, keyboard
 
@@ -10,13 +10,38 @@ from telegram.error import RetryAfter
 from application import MessageService, UpdateManager, TelegraphService
 from providers.manager import LanguageManager, UserDataManager, audit_action
 from providers.helpers import logger
+from providers.helpers.resilience import is_degraded
 from ui.keyboard_factory import KeyboardFactory
 
+
+class ArrivalScreen:
+    """
+    Pantalla de llegadas de una estación. La cabecera (nombre, alertas, mapa, título) y el pie
+    se renderizan una vez al abrir la estación; en cada tick solo se pintan las rutas.
+    """
+
+    __slots__ = ("header", "footer", "arriving", "no_departures")
+
+    def __init__(self, header: str, footer: str, arriving: str, no_departures: str):
+        self.header = header
+        self.footer = footer
+        self.arriving = arriving
+        self.no_departures = no_departures
+
+    def render(self, routes: str) -> str:
+        return f"{self.header}{routes.replace('🔜', self.arriving)}{self.footer}"
+
+
 class HandlerBase:
     """
     Base class for all transport handlers (Bus, Metro, Tram) with common logic.
     """
 
+    # Proveedores de los que depende el handler (ver providers/helpers/resilience.py)
+    PROVIDERS: tuple = ()
+    # Con el circuito de un proveedor abierto el bucle de actualización espera más
+    DEGRADED_UPDATE_INTERVAL = 30
+
     def __init__(self, message_service: MessageService, update_manager: UpdateManager, language_manager: LanguageManager, user_data_manager: UserDataManager, keyboard_factory: KeyboardFactory, telegraph_service: TelegraphService):
         self.message_service = message_service
         self.update_manager = update_manager
@@ -32,6 +57,17 @@ class HandlerBase:
 
         self.UPDATE_INTERVAL = 5
 
+    def arrival_screen(self, header: str, footer: str = None) -> ArrivalScreen:
+        """Precalcula las partes fijas de la pantalla de llegadas para todo el bucle de actualización."""
+        if footer is None:
+            footer = f"\n\n{self.language_manager.t('common.updates.every_x_seconds', seconds=self.UPDATE_INTERVAL)}"
+        return ArrivalScreen(
+            header=header,
+            footer=footer,
+            arriving=self.language_manager.t('common.arriving'),
+            no_departures=self.language_manager.t('no.departures.found'),
+        )
+
     @audit_action(action_type="SHOW_LINES", params_args=["transport_type"])
     async def show_transport_lines(
         self,
@@ -132,7 +168,7 @@ class HandlerBase:
         context: ContextTypes.DEFAULT_TYPE,
         transport_type: TransportType,
         service_get_stations_by_line: Callable[[str], Awaitable[List]],
-        mapper_method: Callable[[List, str, str], str],
+        mapper_method: Callable[[List, str, str], Awaitable[str]],
         keyboard_menu_builder: Callable[[str], any]
     ):
         """
@@ -147,7 +183,7 @@ class HandlerBase:
         logger.info(f"Showing map for {transport_type.value.lower()} line {line_name} (ID: {line_id})")
 
         stations = await service_get_stations_by_line(line_id)
-        encoded_map = mapper_method(stations, line_id, line_name)
+        encoded_map = await mapper_method(stations, line_id, line_name)
 
         await self.message_service.send_new_message_from_callback(
             update=update,
@@ -195,7 +231,7 @@ class HandlerBase:
                         current_text = text
                         current_reply_markup = reply_markup
                         
-                        await asyncio.sleep(5)
+                        await asyncio.sleep(self._next_update_delay())
                         
                     if send_alert:
                         await self.message_service.edit_message_by_id(chat_id, message_id, self.language_manager.t('common.reload.message'), reply_markup=self.keyboard_factory.restart_search_button(previous_callback))
@@ -212,6 +248,11 @@ class HandlerBase:
 
         self.update_manager.start_task(user_id, loop)
 
+    def _next_update_delay(self) -> float:
+        if is_degraded(self.PROVIDERS):
+            return self.DEGRADED_UPDATE_INTERVAL
+        return self.UPDATE_INTERVAL
+
     def should_send_update(self, user_id):
         counter = self.update_counters[user_id]
         now = time.time()
@@ -18,6 +18,8 @@ class MetroHandler(HandlerBase):
     Handles metro-related user interactions in the bot.
     """
 
+    PROVIDERS = ("tmb",)
+
     def __init__(
         self,
         keyboard_factory: KeyboardFactory,
@@ -79,24 +81,25 @@ class MetroHandler(HandlerBase):
         message = await self.show_stop_intro(update, context, TransportType.METRO.value, line_id, station_code, station.name)
 
         await self.metro_service.get_station_routes(station_code)
-        station_alerts = MetroStation.get_alert_by_language(station, await self.user_data_manager.get_user_language(user_id))
+        station_alerts = MetroStation.get_alert_by_language(station, self.language_manager.current_language())
         station_connections = await self.metro_service.get_station_connections(station.code)
         alerts_message = f"{self.language_manager.t("common.alerts")}\n{station_alerts}\n\n" if any(station_alerts) else ""
 
         await self.update_manager.stop_loading(update, context)
 
+        screen = self.arrival_screen(
+            f"{self.language_manager.t(f'{TransportType.METRO.value}.station.name', name=station.name.upper())}\n\n"
+            f"{alerts_message}"
+            f"<a href='{GoogleMapsHelper.build_directions_url(latitude=station.latitude, longitude=station.longitude)}'>{self.language_manager.t('common.map.view.location')}</a>\n\n"
+            f"{self.language_manager.t(f'{TransportType.METRO.value}.station.next')}\n"
+        )
+
         async def update_text():
             routes = "\n\n".join(
-                LineRoute.simple_list(route, default_msg=self.language_manager.t('no.departures.found'))
+                LineRoute.simple_list(route, default_msg=screen.no_departures)
                 for route in await self.metro_service.get_station_routes(station_code)
-            )            
-            text = (
-                f"{self.language_manager.t(f'{TransportType.METRO.value}.station.name', name=station.name.upper())}\n\n"
-                f"{alerts_message}"
-                f"<a href='{GoogleMapsHelper.build_directions_url(latitude=station.latitude, longitude=station.longitude)}'>{self.language_manager.t('common.map.view.location')}</a>\n\n"
-                f"{self.language_manager.t(f'{TransportType.METRO.value}.station.next')}\n{routes.replace('🔜', self.language_manager.t('common.arriving'))}\n\n"
-                f"{self.language_manager.t('common.updates.every_x_seconds', seconds=self.UPDATE_INTERVAL)}"
             )
+            text = screen.render(routes)
             is_fav = await self.user_data_manager.has_favorite(user_id, TransportType.METRO.value, station_code)
             keyboard = self.keyboard_factory.update_menu(is_fav, TransportType.METRO.value, station_code, line_id, callback, has_connections=any(station_connections))
             return text, keyboard
@@ -117,7 +120,7 @@ class MetroHandler(HandlerBase):
         _, line_id, station_code = self.message_service.get_callback_data(update)
         station = await self.metro_service.get_station_by_code(station_code)        
         station_accesses = await self.metro_service.get_station_accesses(station.CODI_GRUP_ESTACIO)
-        station_alerts = MetroStation.get_alert_by_language(station, await self.user_data_manager.get_user_language(user_id))
+        station_alerts = MetroStation.get_alert_by_language(station, self.language_manager.current_language())
         station_connections = await self.metro_service.get_station_connections(station.code)
         alerts_message = f"{self.language_manager.t("common.alerts")}\n{station_alerts}\n\n" if any(station_alerts) else ""
         logger.info(f"[MetroHandler] Showing accesses for station ID: {station_code}")
@@ -155,7 +158,7 @@ class MetroHandler(HandlerBase):
         _, line_id, station_code = self.message_service.get_callback_data(update)
         station = await self.metro_service.get_station_by_code(station_code)        
         station_connections = ''#format_metro_connections(station.connections) #TODO: Fix this
-        station_alerts = MetroStation.get_alert_by_language(station, await self.user_data_manager.get_user_language(user_id))
+        station_alerts = MetroStation.get_alert_by_language(station, self.language_manager.current_language())
         alerts_message = f"{self.language_manager.t("common.alerts")}\n{station_alerts}\n\n" if any(station_alerts) else ""
         logger.info(f"[MetroHandler] Showing connections for station ID: {station_code}")
 
@@ -17,6 +17,8 @@ class RodaliesHandler(HandlerBase):
     Handles rodalies-related user interactions in the bot.
     """
 
+    PROVIDERS = ("rodalies",)
+
     def __init__(
         self,
         keyboard_factory: KeyboardFactory,
@@ -50,7 +52,7 @@ class RodaliesHandler(HandlerBase):
 
         line = await self.rodalies_service.get_line_by_id(line_id)
         stops = await self.rodalies_service.get_stations_by_line(line_id)
-        encoded = self.mapper.map_rodalies_stations(stops, line)
+        encoded = await self.mapper.map_rodalies_stations(stops, line)
 
         if line.alerts is not None and any(line.alerts):
             line_alerts_url = self.telegraph_service.create_page(f'{TransportType.RODALIES.value.capitalize()} {line.name}: Alerts', line.alerts)
@@ -75,16 +77,17 @@ class RodaliesHandler(HandlerBase):
         await self.rodalies_service.get_station_routes(rodalies_station.code)
         await self.update_manager.stop_loading(update, context)
         
+        screen = self.arrival_screen(
+            f"{self.language_manager.t(f'{TransportType.RODALIES.value}.station.name', name=rodalies_station.name.upper())}\n\n"
+            f"<a href='{GoogleMapsHelper.build_directions_url(latitude=rodalies_station.latitude, longitude=rodalies_station.longitude, travel_mode='transit')}'>{self.language_manager.t('common.map.view.location')}</a>\n\n"
+            f"{self.language_manager.t(f'{TransportType.RODALIES.value}.station.next')}\n"
+        )
+
         async def update_text():
             next_rodalies = "\n\n".join(LineRoute.scheduled_list(route, with_arrival_date=False) for route in await self.rodalies_service.get_station_routes(rodalies_station.code) if route.line_id == line_id)
-            next_rodalies = next_rodalies if next_rodalies != '' else self.language_manager.t('no.departures.found')
+            next_rodalies = next_rodalies if next_rodalies != '' else screen.no_departures
             is_fav = await self.user_data_manager.has_favorite(user_id, TransportType.RODALIES.value, rodalies_station_id)
-            text = (
-                f"{self.language_manager.t(f'{TransportType.RODALIES.value}.station.name', name=rodalies_station.name.upper())}\n\n"
-                f"<a href='{GoogleMapsHelper.build_directions_url(latitude=rodalies_station.latitude, longitude=rodalies_station.longitude, travel_mode='transit')}'>{self.language_manager.t('common.map.view.location')}</a>\n\n"
-                f"{self.language_manager.t(f'{TransportType.RODALIES.value}.station.next')}\n{next_rodalies.replace('🔜', self.language_manager.t('common.arriving'))}\n\n"
-                f"{self.language_manager.t('common.updates.every_x_seconds', seconds=self.UPDATE_INTERVAL)}"
-            ) 
+            text = screen.render(next_rodalies)
             keyboard = self.keyboard_factory.update_menu(is_fav, TransportType.RODALIES.value, rodalies_station_id, line_id, default_callback, has_connections=False)
             return text, keyboard
 
@@ -19,6 +19,8 @@ class TramHandler(HandlerBase):
     Handles tram-related user interactions in the bot.
     """
 
+    PROVIDERS = ("tram",)
+
     def __init__(
         self,
         keyboard_factory: KeyboardFactory,
@@ -80,15 +82,17 @@ class TramHandler(HandlerBase):
         await self.tram_service.get_stop_routes(stop.code)
         await self.update_manager.stop_loading(update, context)
 
+        screen = self.arrival_screen(
+            f"{self.language_manager.t(f'{TransportType.TRAM.value}.stop.name', name=stop.name.upper())}\n\n"
+            f"<a href='{GoogleMapsHelper.build_directions_url(latitude=stop.latitude, longitude=stop.longitude)}'>{self.language_manager.t('common.map.view.location')}</a>\n\n"
+            f"{self.language_manager.t(f'{TransportType.TRAM.value}.stop.next')}\n",
+            footer=f"{self.language_manager.t('common.updates.every_x_seconds', seconds=self.UPDATE_INTERVAL)}\n\n"
+        )
+
         async def update_text():
             routes = await self.tram_service.get_stop_routes(stop.code)
-            grouped_routes = LineRoute.grouped_list(routes, self.language_manager.t('no.departures.found'))
-            text = (
-                f"{self.language_manager.t(f'{TransportType.TRAM.value}.stop.name', name=stop.name.upper())}\n\n"
-                f"<a href='{GoogleMapsHelper.build_directions_url(latitude=stop.latitude, longitude=stop.longitude)}'>{self.language_manager.t('common.map.view.location')}</a>\n\n"
-                f"{self.language_manager.t(f'{TransportType.TRAM.value}.stop.next')}\n{grouped_routes.replace('🔜', self.language_manager.t('common.arriving'))}"
-                f"{self.language_manager.t('common.updates.every_x_seconds', seconds=self.UPDATE_INTERVAL)}\n\n"
-            )
+            grouped_routes = LineRoute.grouped_list(routes, screen.no_departures)
+            text = screen.render(grouped_routes)
             is_fav = await self.user_data_manager.has_favorite(user_id, TransportType.TRAM.value, stop_id)
             keyboard = self.keyboard_factory.update_menu(is_fav, TransportType.TRAM.value, stop_id, line_id, default_callback, has_connections=False)
             return text, keyboard